@@ -0,0 +1,52 @@
+"""Benchmarks for martapy's parsing, filtering and grouping hot paths.
+
+``python -m benchmarks`` runs the parse/filter/group suite; the other
+modules run on their own, e.g. ``python -m benchmarks.bench_memory``.
+"""
+import gc
+import time
+import tracemalloc
+
+
+def measure(op, setup=None, min_time=0.2, max_runs=1000):
+    """Time *op* and measure its peak memory.
+
+    :param op: Callable taking the value returned by *setup* (or nothing)
+    :param setup: Optional callable run before every call of *op*, outside
+        the timing
+    :param min_time: Keep running until this many seconds have been timed
+    :param max_runs: ... or until this many runs
+    :return: (ops per second, peak bytes allocated during one run)
+    """
+    # Peak memory from a separate, traced run so tracing doesn't skew
+    # the timings
+    state = setup() if setup is not None else None
+    gc.collect()
+    tracemalloc.start()
+    if setup is None:
+        op()
+    else:
+        op(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del state
+
+    timed = 0.0
+    runs = 0
+    while timed < min_time and runs < max_runs:
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is None:
+            op()
+        else:
+            op(state)
+        timed += time.perf_counter() - start
+        runs += 1
+    return runs / timed, peak
+
+
+def report(name, size, ops, peak):
+    """Print one benchmark result line"""
+    print("{:<28} {:>9,}  {:>12,.1f} ops/s  {:>12,.0f} rec/s  "
+          "{:>9.2f} MiB peak".format(name, size, ops, ops * size,
+                                     peak / 2.0 ** 20))
@@ -0,0 +1,3 @@
+from benchmarks.bench_parse import main
+
+main()
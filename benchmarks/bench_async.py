@@ -0,0 +1,64 @@
+"""Wall time to refresh many routes: ``BusClient`` vs ``AsyncBusClient``,
+and ``BusClient.buses(routes=...)`` with each batch strategy.
+
+Fetches every route from the local stub server, which adds *latency*
+seconds to each response to stand in for the real API's round trip.
+
+    python -m benchmarks.bench_async [routes] [latency]
+"""
+import asyncio
+import sys
+import time
+
+from martapy.aio import AsyncBusClient
+from martapy.batch import FLEET, ROUTES, RouteCache
+from martapy.bus import BusClient
+from martapy.simulator import BUS_ROUTES, StubServer, bus_feed
+from martapy.transport import HTTPTransport
+
+
+def main(routes=40, latency=0.05):
+    routes = BUS_ROUTES[:routes]
+    with StubServer(buses=bus_feed(len(routes) * 10), latency=latency,
+                    validators=False) as server:
+        transport = HTTPTransport(pool_maxsize=32)
+        client = BusClient(transport, host=server.host)
+        start = time.perf_counter()
+        for r in routes:
+            client.buses(route=r)
+        sync = time.perf_counter() - start
+        print("{} routes, {:.0f} ms latency".format(len(routes),
+                                                    latency * 1000))
+        print("  BusClient (serial)          {:7.3f} s".format(sync))
+
+        for concurrency in (4, 8, 16, 32):
+            async def fetch():
+                cache = RouteCache(concurrency=concurrency, strategy=ROUTES)
+                async with AsyncBusClient(transport, server.host, cache,
+                                          concurrency=concurrency) as c:
+                    start = time.perf_counter()
+                    await c.buses(routes=routes)
+                    return time.perf_counter() - start
+
+            elapsed = asyncio.run(fetch())
+            print("  AsyncBusClient ({:>2} at once) {:7.3f} s  ({:.1f}x)"
+                  .format(concurrency, elapsed, sync / elapsed))
+
+        for strategy in (ROUTES, FLEET, None):
+            cache = RouteCache(strategy=strategy)
+            client = BusClient(transport, host=server.host,
+                               route_cache=cache)
+            start = time.perf_counter()
+            client.buses(routes=routes)
+            elapsed = time.perf_counter() - start
+            print("  buses(routes=...) {:<10} {:7.3f} s  ({:.1f}x)".format(
+                strategy or 'by cost', elapsed, sync / elapsed))
+        start = time.perf_counter()
+        client.buses(routes=routes)
+        elapsed = time.perf_counter() - start
+        print("  buses(routes=...) cached     {:7.3f} s".format(elapsed))
+        transport.close()
+
+
+if __name__ == '__main__':
+    main(*[t(a) for (t, a) in zip((int, float), sys.argv[1:3])])
@@ -0,0 +1,106 @@
+"""Throughput and latency of the full fetch-decode-parse path, offline.
+
+Each run starts a ``martapy.simulator.Simulator`` with the given fleet,
+then has *concurrency* threads call one client method back to back for a
+few seconds over a shared ``HTTPTransport``. Validators are off, so every
+call downloads and parses a whole feed.
+
+    python -m benchmarks.bench_fetch --buses 300 3000 --concurrency 1 4 16
+"""
+import argparse
+import threading
+import time
+from math import ceil
+
+from martapy.bus import BusClient
+from martapy.rail import RailClient
+from martapy.simulator import Simulator
+from martapy.transport import HTTPTransport
+
+
+def cases(rail_client, bus_client):
+    """``(name, operation)`` pairs"""
+    return [
+        ('RailClient.arrivals', rail_client.arrivals),
+        ('RailClient.arrivals lazy', lambda: rail_client.arrivals(lazy=True)),
+        ('BusClient.buses', bus_client.buses),
+        ('BusClient.buses lazy', lambda: bus_client.buses(lazy=True)),
+        ('BusClient.buses route', lambda: bus_client.buses(route='1')),
+    ]
+
+
+def _percentile(ordered, q):
+    return ordered[max(0, ceil(q / 100.0 * len(ordered)) - 1)]
+
+
+def run(op, concurrency, seconds):
+    """Call *op* from *concurrency* threads for *seconds*
+
+    :return: (calls per second, sorted latencies in seconds)
+    """
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        mine = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            op()
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--trains', type=int, default=32,
+                        help="trains in service (default: %(default)s)")
+    parser.add_argument('--buses', type=int, nargs='+', default=[300, 3000],
+                        help="bus fleet sizes (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 4, 16],
+                        help="client threads (default: %(default)s)")
+    parser.add_argument('--latency', type=float, default=0,
+                        help="seconds the server adds to each response")
+    parser.add_argument('--seconds', type=float, default=2,
+                        help="seconds to run each case for")
+    parser.add_argument('--only', nargs='+', default=None,
+                        help="only run cases whose name contains one of "
+                             "these")
+    args = parser.parse_args(argv)
+    for buses in args.buses:
+        with Simulator(trains=args.trains, buses=buses, speed=60,
+                       latency=args.latency, validators=False) as sim:
+            transport = HTTPTransport(pool_maxsize=max(args.concurrency))
+            rail_client = RailClient('unused', transport, host=sim.host)
+            bus_client = BusClient(transport, host=sim.host)
+            print("{} trains, {} buses, {:.0f} ms latency".format(
+                args.trains, buses, args.latency * 1000))
+            for name, op in cases(rail_client, bus_client):
+                if args.only and not any(o in name for o in args.only):
+                    continue
+                op()    # warm up the connection and the feed
+                for concurrency in args.concurrency:
+                    rate, latencies = run(op, concurrency, args.seconds)
+                    print("  {:<26} x{:<3} {:8.1f} calls/s   p50 {:7.2f} ms"
+                          "   p95 {:7.2f} ms   p99 {:7.2f} ms".format(
+                              name, concurrency, rate,
+                              _percentile(latencies, 50) * 1000,
+                              _percentile(latencies, 95) * 1000,
+                              _percentile(latencies, 99) * 1000))
+            transport.close()
+
+
+if __name__ == '__main__':
+    main()
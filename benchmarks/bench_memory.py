@@ -0,0 +1,68 @@
+"""Memory retained per record by ``Arrivals`` / ``Buses`` snapshots.
+
+Compares the slotted, interned records against the previous layout: a
+plain ``__dict__`` object holding the same values plus its own JSON
+string. Both sides start from the same JSON text, so the decoded dicts
+(and their strings) are freed once parsing is done.
+
+    python -m benchmarks.bench_memory [size]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+
+from martapy.bus import Buses
+from martapy.rail import Arrivals
+from martapy.simulator import bus_feed, rail_feed
+
+
+class LegacyRecord:
+    """Mimics the pre-slots records: every value in ``__dict__`` and the
+    full payload kept as a JSON string."""
+    def __init__(self, json_obj, time_keys):
+        for k, v in json_obj.items():
+            if k in time_keys:
+                v = datetime.strptime(v, time_keys[k])
+            setattr(self, k.lower(), v)
+        self.json = json.dumps(json_obj)
+
+
+RAIL_TIMES = {'EVENT_TIME': "%m/%d/%Y %I:%M:%S %p",
+              'NEXT_ARR': "%I:%M:%S %p"}
+BUS_TIMES = {'MSGTIME': "%m/%d/%Y %I:%M:%S %p"}
+
+
+def retained(text, build):
+    """Bytes still allocated after building from *text* and dropping the
+    decoded payload"""
+    gc.collect()
+    tracemalloc.start()
+    payload = json.loads(text)
+    result = build(payload)
+    del payload
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def compare(name, feed, build, legacy_times):
+    text = json.dumps(feed)
+    new = retained(text, build)
+    old = retained(text, lambda p: [LegacyRecord(d, legacy_times) for d in p])
+    n = len(feed)
+    print("{:<6} {:>8} records  legacy {:>7.0f} B/rec  slotted {:>7.0f} B/rec"
+          "  ({:.0%} smaller)".format(name, n, old / n, new / n,
+                                      1 - float(new) / old))
+
+
+def main(size=20000):
+    compare('rail', rail_feed(size), Arrivals, RAIL_TIMES)
+    compare('bus', bus_feed(size), Buses, BUS_TIMES)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,48 @@
+"""Parsing many route payloads: serial ``Buses`` vs ``BusBatchParser``.
+
+Each route payload is a raw JSON body, as it would come off the wire.
+
+    python -m benchmarks.bench_parallel [routes] [buses per route]
+"""
+import json
+import os
+import sys
+import time
+
+from martapy import columnar
+from martapy.bus import Buses
+from martapy.parallel import BusBatchParser
+from martapy.simulator import bus_feed
+
+
+def main(routes=200, size=250):
+    bodies = [json.dumps(bus_feed(size, seed=i)).encode()
+              for i in range(routes)]
+    start = time.perf_counter()
+    Buses(b for body in bodies for b in json.loads(body))
+    serial = time.perf_counter() - start
+    print("{} routes x {} buses, {} CPUs".format(routes, size,
+                                                 os.cpu_count()))
+    print("  serial                     {:7.3f} s".format(serial))
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        with BusBatchParser(processes) as parser:
+            # Start the workers outside the timing
+            parser.parse(bodies[:processes])
+            start = time.perf_counter()
+            parser.parse(bodies)
+            elapsed = time.perf_counter() - start
+            print("  parse()   {:>3} processes   {:7.3f} s  ({:.1f}x)"
+                  .format(processes, elapsed, serial / elapsed))
+            if columnar.np is not None:
+                start = time.perf_counter()
+                parser.columns(bodies)
+                elapsed = time.perf_counter() - start
+                print("  columns() {:>3} processes   {:7.3f} s  ({:.1f}x)"
+                      .format(processes, elapsed, serial / elapsed))
+        processes *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
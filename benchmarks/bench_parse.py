@@ -0,0 +1,99 @@
+"""Parse, filter and grouping hot paths over synthetic feeds.
+
+    python -m benchmarks [--sizes 1000 10000 100000] [--only NAME ...]
+
+Reports operations per second, records per second and peak memory
+allocated during one operation.
+"""
+import argparse
+
+from benchmarks import measure, report
+from martapy.bus import Bus, Buses
+from martapy.lazy import LazyArrivals, LazyBuses
+from martapy.rail import Arrivals
+from martapy.simulator import bus_feed, rail_feed
+
+
+def _fresh(arrivals):
+    """A new view of the same arrivals, so per-snapshot caches start cold"""
+    return lambda: Arrivals._view(list(arrivals))
+
+
+def _fresh_buses(buses):
+    """A new view of the same buses, without cached query indexes"""
+    return lambda: Buses._view(buses)
+
+
+def _chained(buses):
+    """Range + set + equality filter as three list comprehensions"""
+    late = [b for b in buses if int(b.adherence) < -5]
+    routes = [b for b in late if b.route in ('1', '4', '7')]
+    return [b for b in routes if b.direction == 'Westbound']
+
+
+def cases(size):
+    """(name, op, setup) for each benchmark at *size* records"""
+    rail = rail_feed(size)
+    buses_raw = bus_feed(size)
+    arrivals = Arrivals(rail)
+    buses = Buses(buses_raw)
+    # Build the sorted indexes the indexed range query uses
+    for _ in range(2):
+        buses.where(adherence__range=(-2, 2), latitude__gt=33.8)
+    return [
+        ('Arrivals.__init__', lambda: Arrivals(rail), None),
+        ('Arrivals._filter', lambda a: a.red_line, _fresh(arrivals)),
+        ('chained _filter x3', lambda a: a.red_line.northbound.arriving,
+         _fresh(arrivals)),
+        ('Arrivals.query x3',
+         lambda a: a.query(line='RED', direction='N',
+                           waiting_time='Arriving'), _fresh(arrivals)),
+        ('Arrivals.trains (cold)', lambda a: a.trains, _fresh(arrivals)),
+        ('Arrivals.trains (cached)', lambda: arrivals.trains, None),
+        ('Arrivals.stations (cold)', lambda a: a.stations,
+         _fresh(arrivals)),
+        ('Arrivals.by_station', lambda a: a.by_station('five points'),
+         _fresh(arrivals)),
+        ('parse + by_station', lambda: list(
+            Arrivals(rail).by_station('five points')), None),
+        ('LazyArrivals + by_station', lambda: list(
+            LazyArrivals(rail).by_station('five points')), None),
+        ('Bus.from_json', lambda: [Bus.from_json(b) for b in buses_raw],
+         None),
+        ('Buses.__init__', lambda: Buses(buses_raw), None),
+        ('Buses.filter', lambda b: b.filter(direction='Westbound'),
+         _fresh_buses(buses)),
+        ('chained comprehensions x3', _chained, _fresh_buses(buses)),
+        ('Buses.where x3',
+         lambda b: b.where(adherence__lt=-5, route__in=('1', '4', '7'),
+                           direction='Westbound'), _fresh_buses(buses)),
+        ('Buses.where range (indexed)',
+         lambda: buses.where(adherence__range=(-2, 2), latitude__gt=33.8),
+         None),
+        ('LazyBuses + filter', lambda: list(
+            LazyBuses(buses_raw).filter(direction='Westbound')), None),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help="records per feed (default: %(default)s)")
+    parser.add_argument('--only', nargs='+', default=None,
+                        help="only run benchmarks whose name contains one "
+                             "of these")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="seconds to time each benchmark for")
+    args = parser.parse_args(argv)
+    for size in args.sizes:
+        for name, op, setup in cases(size):
+            if args.only and not any(o in name for o in args.only):
+                continue
+            ops, peak = measure(op, setup, min_time=args.min_time)
+            report(name, size, ops, peak)
+        print()
+
+
+if __name__ == '__main__':
+    main()
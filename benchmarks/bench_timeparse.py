@@ -0,0 +1,55 @@
+"""Timestamp parsing: ``datetime.strptime`` vs ``martapy._util``.
+
+Parses every ``MSGTIME`` of a synthetic GetAllBus feed, and every
+``EVENT_TIME``/``NEXT_ARR`` of a rail feed, three ways: with strptime,
+with the fast path alone (memo cache bypassed) and with the memo cache.
+
+    python -m benchmarks.bench_timeparse [size]
+"""
+import sys
+import timeit
+from datetime import datetime
+
+from martapy._util import (CLOCK_FORMAT, TIMESTAMP_FORMAT, parse_clock,
+                           parse_timestamp)
+from martapy.simulator import bus_feed, rail_feed
+
+
+def run(name, values, strptime, fast):
+    def cached():
+        for v in values:
+            fast(v)
+
+    def uncached():
+        for v in values:
+            fast.__wrapped__(v)
+
+    def baseline():
+        for v in values:
+            strptime(v)
+
+    print(name)
+    base = None
+    for label, fn in (('strptime', baseline), ('fast path', uncached),
+                      ('fast path + memo', cached)):
+        # Start each run with a cold memo cache
+        best = min(timeit.repeat(fn, setup=fast.cache_clear, number=1,
+                                 repeat=5))
+        base = base or best
+        print("  {:<18} {:>12,.0f} values/s  ({:.1f}x)".format(
+            label, len(values) / best, base / best))
+
+
+def main(size=20000):
+    buses = bus_feed(size)
+    run('MSGTIME', [b['MSGTIME'] for b in buses],
+        lambda v: datetime.strptime(v, TIMESTAMP_FORMAT), parse_timestamp)
+    arrivals = rail_feed(size)
+    run('EVENT_TIME', [a['EVENT_TIME'] for a in arrivals],
+        lambda v: datetime.strptime(v, TIMESTAMP_FORMAT), parse_timestamp)
+    run('NEXT_ARR', [a['NEXT_ARR'] for a in arrivals],
+        lambda v: datetime.strptime(v, CLOCK_FORMAT).time(), parse_clock)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
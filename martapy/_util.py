@@ -0,0 +1,147 @@
+"""Internal helpers shared by the rail and bus modules"""
+from datetime import datetime, time
+from functools import lru_cache
+from sys import intern
+from urllib.parse import urlsplit, urlunsplit
+
+#: ``EVENT_TIME`` / ``MSGTIME`` format, ex: *12/31/2017 4:09:10 PM*
+TIMESTAMP_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+#: ``NEXT_ARR`` format, ex: *04:12:10 PM*
+CLOCK_FORMAT = "%I:%M:%S %p"
+
+
+def intern_str(value):
+    """Intern *value* if it's a string, so records repeating the same
+    line, station, route... share a single string object.
+
+    :param value: Any value from an API response
+    :return: The interned string, or *value* unchanged if it isn't a ``str``
+    """
+    if type(value) is str:
+        return intern(value)
+    return value
+
+
+def rehost(url, host):
+    """*url* with its scheme and host taken from *host*
+
+    :param url: API URL, ex: *http://developer.itsmarta.com/...*
+    :param host: Scheme and host (and port), ex: *http://localhost:8000*
+    :return: str
+    """
+    scheme, netloc = urlsplit(host)[:2]
+    if not scheme or not netloc:
+        raise ValueError("Expected a host like 'http://localhost:8000', "
+                         "got '{}'".format(host))
+    return urlunsplit((scheme, netloc) + urlsplit(url)[2:])
+
+
+class FrozenList(list):
+    """``list`` whose contents are fixed once built. Mutating methods raise
+    ``TypeError``; subclasses fill it with ``list.__init__``."""
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("'{}' is immutable".format(type(self).__name__))
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _frozen
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+
+
+class FrozenRecord:
+    """Base for ``__slots__`` records whose values are fixed once built.
+    Assigning or deleting an attribute raises ``AttributeError``;
+    subclasses set their slots with ``object.__setattr__``."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'{}' is read-only".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("'{}' is read-only".format(type(self).__name__))
+
+    def __setstate__(self, state):
+        # Used by pickle and copy for __slots__ classes: (None, slots)
+        for name, value in state[1].items():
+            object.__setattr__(self, name, value)
+
+
+def _number(digits, low, high):
+    """int of *digits* (one or two ASCII digits) within *low*..*high*, or
+    ``None`` if it doesn't look like a field strptime would accept"""
+    if not 0 < len(digits) < 3 or not digits.isdigit() or \
+            not digits.isascii():
+        return None
+    value = int(digits)
+    if not low <= value <= high:
+        return None
+    return value
+
+
+def _clock(clock, meridiem):
+    """(hour, minute, second) on a 24 hour clock from *H:MM:SS* and
+    *AM*/*PM*, or ``None`` if either doesn't match"""
+    meridiem = meridiem.upper()
+    if meridiem not in ('AM', 'PM'):
+        return None
+    parts = clock.split(':')
+    if len(parts) != 3:
+        return None
+    hour = _number(parts[0], 1, 12)
+    minute = _number(parts[1], 0, 59)
+    second = _number(parts[2], 0, 59)
+    if hour is None or minute is None or second is None:
+        return None
+    hour %= 12
+    if meridiem == 'PM':
+        hour += 12
+    return hour, minute, second
+
+
+@lru_cache(maxsize=8192)
+def parse_timestamp(value):
+    """Parse an ``EVENT_TIME``/``MSGTIME`` string like
+    ``datetime.strptime(value, TIMESTAMP_FORMAT)``, only faster.
+
+    Results are memoized on the raw string since many records in a feed
+    share the same second. Anything off the fast path is handed to
+    ``strptime``, so results and errors are identical.
+
+    :param value: Timestamp as *MM/DD/YYYY H:MM:SS AM/PM*
+    :type value: str
+    :return: ``datetime.datetime``
+    :raises ValueError: If *value* doesn't match the format
+    """
+    parts = value.split(' ')
+    if len(parts) == 3:
+        date = parts[0].split('/')
+        clock = _clock(parts[1], parts[2])
+        if len(date) == 3 and clock is not None and len(date[2]) == 4 \
+                and date[2].isdigit() and date[2].isascii():
+            month = _number(date[0], 1, 12)
+            day = _number(date[1], 1, 31)
+            if month is not None and day is not None:
+                try:
+                    return datetime(int(date[2]), month, day, *clock)
+                except ValueError:
+                    pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+@lru_cache(maxsize=8192)
+def parse_clock(value):
+    """Parse a ``NEXT_ARR`` string like
+    ``datetime.strptime(value, CLOCK_FORMAT).time()``, only faster.
+
+    Memoized and backed by ``strptime`` the same way as
+    ``parse_timestamp``.
+
+    :param value: Time as *HH:MM:SS AM/PM*
+    :type value: str
+    :return: ``datetime.time``
+    :raises ValueError: If *value* doesn't match the format
+    """
+    parts = value.split(' ')
+    if len(parts) == 2:
+        clock = _clock(parts[0], parts[1])
+        if clock is not None:
+            return time(*clock)
+    return datetime.strptime(value, CLOCK_FORMAT).time()
@@ -0,0 +1,111 @@
+"""asyncio versions of ``RailClient`` and ``BusClient``
+
+Requests run on a thread pool over the same pooled ``HTTPTransport`` as
+the blocking clients, so no extra dependencies are needed and results are
+the same ``Arrivals``/``Buses`` types.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from martapy.batch import RouteCache
+from martapy.bus import BusClient
+from martapy.rail import RailClient
+
+
+class _AsyncMixin:
+    def _init_executor(self, concurrency):
+        #: Maximum number of requests in flight at once
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._semaphore = None
+
+    async def _call(self, fn, *args):
+        """Run blocking *fn* on this client's thread pool, bounded by
+        ``concurrency``"""
+        # Created lazily so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    def close(self):
+        """Shut down the client's thread pool"""
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class AsyncRailClient(_AsyncMixin, RailClient):
+    """``RailClient`` with a coroutine ``arrivals()``"""
+    def __init__(self, api_key, transport=None, host=None, *,
+                 concurrency=4):
+        """
+        :param api_key: MARTA API key
+        :param transport: ``martapy.transport.HTTPTransport`` to fetch with
+        :param host: Scheme and host to send requests to instead of
+            developer.itsmarta.com
+        :param concurrency: Maximum number of requests in flight at once
+        """
+        super().__init__(api_key, transport=transport, host=host)
+        self._init_executor(concurrency)
+
+    async def arrivals(self, lazy=False):
+        """Retrieves and returns current arrivals
+
+        :param lazy: Return a ``martapy.lazy.LazyArrivals``
+        :rtype: ``martapy.rail.Arrivals(list)``
+        """
+        return await self._call(RailClient.arrivals, self, lazy)
+
+
+class AsyncBusClient(_AsyncMixin, BusClient):
+    """``BusClient`` with a coroutine ``buses()`` that can fetch many
+    routes concurrently
+
+    ``buses(routes=...)`` fetches through the client's ``RouteCache``,
+    whose own threads make the route requests. The client and its cache
+    therefore share one *concurrency*: at most that many ``buses()`` calls
+    run at once, and at most that many route requests.
+    """
+    def __init__(self, transport=None, host=None, route_cache=None, *,
+                 concurrency=None):
+        """
+        :param transport: ``martapy.transport.HTTPTransport`` to fetch with
+        :param host: Scheme and host to send requests to instead of
+            developer.itsmarta.com
+        :param route_cache: ``martapy.batch.RouteCache`` for *routes*
+            (defaults to a new one making *concurrency* requests at once)
+        :param concurrency: Maximum number of requests in flight at once
+            (defaults to 8, or to *route_cache*'s ``concurrency``)
+        :raises ValueError: If *concurrency* isn't *route_cache*'s
+        """
+        if route_cache is None:
+            route_cache = RouteCache(concurrency=concurrency or 8)
+        elif concurrency is None:
+            concurrency = route_cache.concurrency
+        elif concurrency != route_cache.concurrency:
+            raise ValueError("concurrency={} doesn't match the route_cache's "
+                             "concurrency={}".format(
+                                 concurrency, route_cache.concurrency))
+        super().__init__(transport=transport, host=host,
+                         route_cache=route_cache)
+        self._init_executor(route_cache.concurrency)
+
+    async def buses(self, route=None, lazy=False, routes=None):
+        """Get active buses
+
+        :param route: When supplied, only returns active buses for *route*
+        :param lazy: Return ``martapy.lazy.LazyBuses``
+        :param routes: When supplied, returns the buses on each route in
+            *routes*, fetched route by route on the ``RouteCache``'s
+            threads or from the all-bus feed, whichever is cheaper (see
+            ``BusClient.buses``)
+        :return: ``Buses(list)``, or for *routes* an *OrderedDict* of
+            route to ``Buses`` in the order given
+        """
+        return await self._call(BusClient.buses, self, route, lazy, routes)
@@ -0,0 +1,212 @@
+"""Rolling per-route adherence statistics and bus bunching detection over
+successive ``Buses`` snapshots.
+
+Each vehicle report (one ``msg_time`` per vehicle) enters its route's
+time window once, however many polls it stays in the feed, and leaves it
+when it's older than the window. Adherence is kept as a count per value,
+so adding or expiring a report is O(1) and memory is bounded by the number
+of reports in the window::
+
+    analytics = BusAnalytics(window=900)
+    poller = Poller.buses(BusClient())
+    poller.subscribe(analytics.update)
+
+    analytics.mean('110'), analytics.percentile('110', 90)
+    analytics.bunching('110')
+"""
+from collections import deque
+from datetime import timedelta
+from math import ceil
+
+from martapy.spatial import haversine
+
+#: Position along the direction of travel, per ``Bus.direction``
+_PROGRESS = {
+    'Northbound': lambda lat, lon: lat,
+    'Southbound': lambda lat, lon: -lat,
+    'Eastbound': lambda lat, lon: lon,
+    'Westbound': lambda lat, lon: -lon,
+}
+
+
+def _adherence(bus):
+    try:
+        return int(bus.adherence)
+    except (TypeError, ValueError):
+        return None
+
+
+class RouteWindow:
+    """Adherence reports for one route within a sliding time window"""
+    __slots__ = ('reports', 'counts', 'total')
+
+    def __init__(self):
+        #: ``(msg_time, vehicle, adherence)``, oldest first
+        self.reports = deque()
+        #: Adherence value to number of reports with it
+        self.counts = {}
+        self.total = 0
+
+    def __len__(self):
+        return len(self.reports)
+
+    def add(self, msg_time, vehicle, adherence):
+        self.reports.append((msg_time, vehicle, adherence))
+        self.counts[adherence] = self.counts.get(adherence, 0) + 1
+        self.total += adherence
+
+    def expire(self, oldest):
+        """Drop reports from before *oldest*
+
+        :return: The dropped reports
+        """
+        reports = self.reports
+        dropped = []
+        while reports and reports[0][0] < oldest:
+            report = reports.popleft()
+            adherence = report[2]
+            self.counts[adherence] -= 1
+            if not self.counts[adherence]:
+                del self.counts[adherence]
+            self.total -= adherence
+            dropped.append(report)
+        return dropped
+
+    def mean(self):
+        """Mean adherence, or ``None`` if the window is empty"""
+        if not self.reports:
+            return None
+        return self.total / len(self.reports)
+
+    def percentile(self, q):
+        """Adherence at percentile *q* (0-100, nearest rank), or ``None``
+        if the window is empty"""
+        n = len(self.reports)
+        if not n:
+            return None
+        rank = max(1, ceil(q / 100.0 * n))
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= rank:
+                return value
+
+
+class BusAnalytics:
+    """Sliding-window adherence and bunching per route"""
+    def __init__(self, window=900, bunching_meters=400):
+        """
+        :param window: Window length in seconds, measured back from the
+            latest ``msg_time`` seen
+        :param bunching_meters: Buses on the same route and direction
+            closer than this are reported as bunched
+        """
+        self.window = timedelta(seconds=window)
+        self.bunching_meters = bunching_meters
+        #: Latest ``msg_time`` seen
+        self.now = None
+        self._windows = {}
+        self._seen = {}
+        self._routes = {}
+        self._bunching = {}
+
+    def update(self, buses):
+        """Apply one ``Buses`` snapshot
+
+        :return: Set of routes whose statistics or bunching changed
+        """
+        changed = set()
+        current = {}
+        for bus in buses:
+            msg_time = bus.msg_time
+            if msg_time is None:
+                continue
+            vehicle = bus.vehicle
+            current.setdefault(bus.route, {})[vehicle] = bus
+            last = self._seen.get(vehicle)
+            if last is not None and msg_time <= last:
+                continue
+            self._seen[vehicle] = msg_time
+            changed.add(bus.route)
+            if self.now is None or msg_time > self.now:
+                self.now = msg_time
+            adherence = _adherence(bus)
+            if adherence is not None:
+                window = self._windows.get(bus.route)
+                if window is None:
+                    window = self._windows[bus.route] = RouteWindow()
+                window.add(msg_time, vehicle, adherence)
+        if self.now is not None:
+            oldest = self.now - self.window
+            for route, window in list(self._windows.items()):
+                for msg_time, vehicle, _ in window.expire(oldest):
+                    changed.add(route)
+                    if self._seen.get(vehicle) == msg_time:
+                        del self._seen[vehicle]
+                if not window:
+                    del self._windows[route]
+        # Routes that lost vehicles need their bunching redone too
+        for route, vehicles in self._routes.items():
+            if vehicles.keys() != current.get(route, {}).keys():
+                changed.add(route)
+        self._routes = current
+        for route in changed:
+            self._bunching[route] = self._bunched(current.get(route, {}))
+            if not self._bunching[route]:
+                del self._bunching[route]
+        return changed
+
+    def _bunched(self, vehicles):
+        """Consecutive buses closer than ``bunching_meters`` along each
+        direction of one route"""
+        by_direction = {}
+        for bus in vehicles.values():
+            progress = _PROGRESS.get(bus.direction)
+            try:
+                lat, lon = float(bus.latitude), float(bus.longitude)
+            except (TypeError, ValueError):
+                continue
+            if progress is not None:
+                by_direction.setdefault(bus.direction, []).append(
+                    (progress(lat, lon), lat, lon, bus))
+        pairs = []
+        for ordered in by_direction.values():
+            ordered.sort(key=lambda p: p[0])
+            for behind, ahead in zip(ordered, ordered[1:]):
+                meters = haversine(behind[1], behind[2], ahead[1], ahead[2])
+                if meters < self.bunching_meters:
+                    pairs.append((ahead[3], behind[3], meters))
+        return pairs
+
+    # Queries
+
+    @property
+    def routes(self):
+        """Routes with reports in the window"""
+        return list(self._windows)
+
+    def count(self, route):
+        """Number of adherence reports for *route* in the window"""
+        window = self._windows.get(route)
+        return len(window) if window is not None else 0
+
+    def mean(self, route):
+        """Mean adherence of *route* over the window, or ``None``"""
+        window = self._windows.get(route)
+        return window.mean() if window is not None else None
+
+    def percentile(self, route, q):
+        """Adherence of *route* at percentile *q* (0-100) over the window,
+        or ``None``"""
+        window = self._windows.get(route)
+        return window.percentile(q) if window is not None else None
+
+    def bunching(self, route=None):
+        """Bunched buses in the latest snapshot
+
+        :param route: Only this route's pairs
+        :return: list of ``(leading bus, following bus, meters apart)``
+        """
+        if route is not None:
+            return list(self._bunching.get(route, ()))
+        return [pair for pairs in self._bunching.values() for pair in pairs]
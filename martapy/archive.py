@@ -0,0 +1,425 @@
+"""Append-only archive of ``Arrivals``/``Buses`` snapshots in a compact
+columnar binary format.
+
+Each snapshot is written as one segment: a header, a dictionary of the
+distinct strings in the snapshot (stations, lines, routes...) and one
+fixed-width array per field, with timestamps stored as epoch seconds.
+Numeric fields also get one flag byte per row recording whether the value
+was missing (``None``) or an empty string, so every number, including NaN
+and the stand-ins ``column()`` shows in those slots, round-trips as is.
+``ArchiveReader`` memory-maps the file and exposes each column as a
+``memoryview`` straight over the mapped bytes, so scanning history doesn't
+copy or re-parse anything::
+
+    with ArchiveWriter('rail.arc') as archive:
+        archive.write(rail_client.arrivals())
+
+    with ArchiveReader('rail.arc') as archive:
+        for segment in archive:
+            waits = segment.column('waiting_seconds')
+
+Restored snapshots aren't always byte-for-byte the originals: numbers are
+re-rendered (*33.70* comes back as *33.7*), text that isn't a number in a
+numeric field comes back as ``None``, and timestamps are re-rendered in
+MARTA's formats.
+"""
+import mmap
+import os
+import struct
+from calendar import timegm
+from datetime import datetime, timedelta
+from time import time
+
+from martapy._util import CLOCK_FORMAT, TIMESTAMP_FORMAT
+from martapy.bus import Bus, Buses
+from martapy.rail import Arrival, Arrivals
+
+MAGIC = b'MARTAARC'
+VERSION = 2
+_FILE_HEADER = struct.Struct('<8sH6x')
+# tag, kind, captured_at, rows, payload bytes
+_SEGMENT_HEADER = struct.Struct('<4sB3xdIIxxxxxxxx')
+_SEGMENT_TAG = b'SNAP'
+_U32 = struct.Struct('<I')
+
+RAIL = 1
+BUS = 2
+
+#: Per-row flags of numeric fields (see ``Segment.flags``)
+VALUE = 0
+NULL = 1
+EMPTY = 2
+
+#: What ``Segment.column`` holds where a number was missing; only the
+#: flags tell these apart from real values
+NULL_INT32 = -2 ** 31
+NULL_INT64 = -2 ** 63
+#: What ``Segment.column`` holds where a number was an empty string (an
+#: empty timestamp is ``NULL_INT64``); missing floats are NaN
+EMPTY_INT32 = NULL_INT32 + 1
+EMPTY_FLOAT = float('-inf')
+
+#: (field, array typecode) per kind; 'I' columns are string codes
+COLUMNS = {
+    RAIL: (('station', 'I'), ('line', 'I'), ('destination', 'I'),
+           ('direction', 'I'), ('train_id', 'I'), ('waiting_time', 'I'),
+           ('waiting_seconds', 'i'), ('event_time', 'q'),
+           ('next_arr', 'i')),
+    BUS: (('adherence', 'i'), ('block_id', 'I'), ('block_abbr', 'I'),
+          ('direction', 'I'), ('latitude', 'd'), ('longitude', 'd'),
+          ('msg_time', 'q'), ('route', 'I'), ('stop_id', 'I'),
+          ('timepoint', 'I'), ('trip_id', 'I'), ('vehicle', 'I'))
+}
+_NULLS = {'i': NULL_INT32, 'q': NULL_INT64, 'd': float('nan')}
+_EMPTIES = {'i': EMPTY_INT32, 'q': NULL_INT64, 'd': EMPTY_FLOAT}
+_SIZES = {'I': 4, 'i': 4, 'q': 8, 'd': 8}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+
+def _int(value):
+    if value == '':
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    if value == '':
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _flag(value):
+    if value is None:
+        return NULL
+    if type(value) is str:
+        return EMPTY
+    return VALUE
+
+
+def _nullable(values, flags):
+    """*values* with those flagged ``NULL`` as ``None`` and ``EMPTY`` as
+    ``''``"""
+    for v, flag in zip(values, flags):
+        if flag == VALUE:
+            yield v
+        elif flag == NULL:
+            yield None
+        else:
+            yield ''
+
+
+def _text(value):
+    """A restored number as the API's string (``None``/``''`` as they
+    were)"""
+    if value is None or value == '':
+        return value
+    return repr(value)
+
+
+def _epoch(dt):
+    if dt is None:
+        return None
+    return timegm(dt.timetuple())
+
+
+def _seconds(t):
+    if t is None:
+        return None
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _rail_values(a):
+    return (a.station, a.line, a.destination, a.direction, a.train_id,
+            a.waiting_time, _int(a.waiting_seconds), _epoch(a.event_time),
+            _seconds(a.next_arr))
+
+
+def _bus_values(b):
+    return (_int(b.adherence), b.block_id, b.block_abbr, b.direction,
+            _float(b.latitude), _float(b.longitude), _epoch(b.msg_time),
+            b.route, b.stop_id, b.timepoint, b.trip_id, b.vehicle)
+
+
+def encode(kind, rows, captured_at=None):
+    """Encode rows of field values as one segment.
+
+    :param kind: ``RAIL`` or ``BUS``
+    :param rows: Sequence of tuples ordered like ``COLUMNS[kind]``, with
+        string fields as ``str`` (or ``None``) and the rest already
+        converted to ints/floats, or ``None``/``''`` where missing/empty
+    :param captured_at: Epoch seconds the snapshot was taken
+    :return: ``bytes``
+    """
+    columns = COLUMNS[kind]
+    n = len(rows)
+    # Code 0 is reserved for None
+    codes = {None: 0}
+    encoded = []
+    for i, (name, typecode) in enumerate(columns):
+        values = [r[i] for r in rows]
+        flags = None
+        if typecode == 'I':
+            values = [codes.setdefault(v, len(codes)) for v in values]
+        else:
+            flags = bytes(_flag(v) for v in values)
+            if any(flags):
+                stand_ins = (None, _NULLS[typecode], _EMPTIES[typecode])
+                values = [v if f == VALUE else stand_ins[f]
+                          for v, f in zip(values, flags)]
+        data = struct.pack('<{}{}'.format(n, typecode), *values)
+        encoded.append(data + b'\0' * _pad(len(data)))
+        if flags is not None:
+            encoded.append(flags + b'\0' * _pad(n))
+    strings = [str(s).encode('utf-8') for s in list(codes)[1:]]
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    table = _U32.pack(len(strings)) + \
+        struct.pack('<{}I'.format(len(offsets)), *offsets) + b''.join(strings)
+    table += b'\0' * _pad(len(table))
+    payload = table + b''.join(encoded)
+    header = _SEGMENT_HEADER.pack(_SEGMENT_TAG, kind,
+                                  time() if captured_at is None
+                                  else captured_at, n, len(payload))
+    return header + payload
+
+
+def encode_snapshot(snapshot, captured_at=None):
+    """Encode an ``Arrivals`` or ``Buses`` (or list of ``Arrival``/``Bus``)
+    as one segment
+
+    :return: ``bytes``
+    """
+    rail = isinstance(snapshot, Arrivals)
+    snapshot = list(snapshot)
+    if rail or (snapshot and isinstance(snapshot[0], Arrival)):
+        return encode(RAIL, [_rail_values(a) for a in snapshot], captured_at)
+    return encode(BUS, [_bus_values(b) for b in snapshot], captured_at)
+
+
+class Segment:
+    """One archived snapshot, read in place from a buffer"""
+    def __init__(self, buffer, offset):
+        """
+        :param buffer: ``memoryview`` (or bytes) holding the segment
+        :param offset: Position of the segment header in *buffer*
+        """
+        tag, kind, captured_at, rows, length = \
+            _SEGMENT_HEADER.unpack_from(buffer, offset)
+        if tag != _SEGMENT_TAG or kind not in COLUMNS:
+            raise ValueError("No archive segment at offset {}"
+                             .format(offset))
+        #: ``RAIL`` or ``BUS``
+        self.kind = kind
+        #: Epoch seconds the snapshot was taken
+        self.captured_at = captured_at
+        self.rows = rows
+        start = offset + _SEGMENT_HEADER.size
+        #: Offset just past this segment
+        self.end = start + length
+        self._buffer = buffer
+        count = _U32.unpack_from(buffer, start)[0]
+        self._offsets = start + 4
+        self._blob = self._offsets + (count + 1) * 4
+        offsets = memoryview(buffer)[self._offsets:self._blob].cast('I')
+        table_end = self._blob + offsets[-1]
+        self._string_count = count
+        self._strings = None
+        self._columns = {}
+        self._flags = {}
+        position = table_end + _pad(table_end - start)
+        for name, typecode in COLUMNS[kind]:
+            size = rows * _SIZES[typecode]
+            self._columns[name] = (position, size, typecode)
+            position += size + _pad(size)
+            if typecode != 'I':
+                self._flags[name] = position
+                position += rows + _pad(rows)
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def fields(self):
+        """Field names, in ``records()`` order"""
+        return tuple(name for (name, _) in COLUMNS[self.kind])
+
+    @property
+    def strings(self):
+        """Decoded string dictionary; index 0 is ``None``"""
+        if self._strings is None:
+            view = memoryview(self._buffer)
+            offsets = view[self._offsets:self._blob].cast('I')
+            blob = self._blob
+            self._strings = [None] + [
+                str(view[blob + offsets[i]:blob + offsets[i + 1]], 'utf-8')
+                for i in range(self._string_count)
+            ]
+        return self._strings
+
+    def column(self, name):
+        """Raw values of *name* as a ``memoryview`` over the archive.
+
+        String fields are codes into ``Segment.strings``; timestamps are
+        epoch seconds (``next_arr`` is seconds since midnight). Rows
+        ``Segment.flags`` marks missing or empty hold ``NULL_INT32``/
+        ``NULL_INT64``/NaN or ``EMPTY_INT32``/``EMPTY_FLOAT``.
+        """
+        position, size, typecode = self._columns[name]
+        return memoryview(self._buffer)[position:position + size] \
+            .cast(typecode)
+
+    def flags(self, name):
+        """``VALUE``, ``NULL`` or ``EMPTY`` for each row of the numeric
+        field *name*, as a ``memoryview`` over the archive
+
+        :raises KeyError: If *name* is a string field
+        """
+        position = self._flags[name]
+        return memoryview(self._buffer)[position:position + self.rows]
+
+    def records(self):
+        """Yield each row as a tuple ordered like ``Segment.fields``, with
+        strings decoded, missing values as ``None`` and empty numbers as
+        ``''``"""
+        strings = self.strings
+        columns = []
+        for name, typecode in COLUMNS[self.kind]:
+            column = self.column(name)
+            if typecode == 'I':
+                column = map(strings.__getitem__, column)
+            else:
+                column = _nullable(column, self.flags(name))
+            columns.append(column)
+        return zip(*columns)
+
+    def snapshot(self):
+        """Rebuild the archived ``Arrivals`` or ``Buses``.
+
+        Timestamps are re-rendered in MARTA's formats, so ``.json`` may
+        differ from the original in zero-padding.
+        """
+        if self.kind == RAIL:
+            return Arrivals(self._arrival(r) for r in self.records())
+        return Buses(self._bus(r) for r in self.records())
+
+    @staticmethod
+    def _arrival(r):
+        (station, line, destination, direction, train_id, waiting_time,
+         waiting_seconds, event_time, next_arr) = r
+        return Arrival(
+            station=station, line=line, destination=destination,
+            direction=direction, train_id=train_id,
+            waiting_time=waiting_time,
+            waiting_seconds=_text(waiting_seconds),
+            event_time=(_EPOCH + timedelta(seconds=event_time))
+            .strftime(TIMESTAMP_FORMAT) if event_time is not None else None,
+            next_arr=(_EPOCH + timedelta(seconds=next_arr))
+            .strftime(CLOCK_FORMAT) if next_arr is not None else None)
+
+    @staticmethod
+    def _bus(r):
+        (adherence, block_id, block_abbr, direction, latitude, longitude,
+         msg_time, route, stop_id, timepoint, trip_id, vehicle) = r
+        return Bus(
+            adherence=_text(adherence),
+            block_id=block_id, block_abbr=block_abbr, direction=direction,
+            latitude=_text(latitude), longitude=_text(longitude),
+            msg_time=(_EPOCH + timedelta(seconds=msg_time))
+            .strftime(TIMESTAMP_FORMAT) if msg_time is not None else None,
+            route=route, stop_id=stop_id, timepoint=timepoint,
+            trip_id=trip_id, vehicle=vehicle)
+
+
+class ArchiveWriter:
+    """Appends snapshots to an archive file"""
+    def __init__(self, path):
+        """
+        :param path: Archive file, created if it doesn't exist
+        """
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new:
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+
+    def write(self, snapshot, captured_at=None):
+        """Append an ``Arrivals`` or ``Buses`` snapshot
+
+        :param captured_at: Epoch seconds (defaults to now)
+        """
+        self._file.write(encode_snapshot(snapshot, captured_at))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    """Memory-maps an archive and iterates its segments in place"""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ) if size else b''
+        if size < _FILE_HEADER.size or \
+                _FILE_HEADER.unpack_from(self._mmap)[0] != MAGIC:
+            self.close()
+            raise ValueError("'{}' isn't a martapy archive".format(path))
+        version = _FILE_HEADER.unpack_from(self._mmap)[1]
+        if version != VERSION:
+            self.close()
+            raise ValueError("'{}' is a version {} archive; expected {}"
+                             .format(path, version, VERSION))
+
+    def __iter__(self):
+        """Yield each ``Segment`` in the order written"""
+        offset = _FILE_HEADER.size
+        size = len(self._mmap)
+        while offset + _SEGMENT_HEADER.size <= size:
+            length = _SEGMENT_HEADER.unpack_from(self._mmap, offset)[4]
+            if offset + _SEGMENT_HEADER.size + length > size:
+                # A partially written segment at the end of the file
+                break
+            segment = Segment(self._mmap, offset)
+            yield segment
+            offset = segment.end
+
+    def snapshots(self, kind=None):
+        """Yield ``(captured_at, Arrivals/Buses)`` for each segment,
+        optionally only of *kind* (``RAIL`` or ``BUS``)"""
+        for segment in self:
+            if kind is None or segment.kind == kind:
+                yield segment.captured_at, segment.snapshot()
+
+    def close(self):
+        """Unmap the archive. Views from ``Segment.column`` must be
+        released first."""
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,212 @@
+"""Batched bus lookups for a set of routes, cached per route.
+
+``BusClient.buses(routes=[...])`` goes through a ``RouteCache``. Routes
+fetched in the last *ttl* seconds come from the cache; the rest are
+fetched whichever way is expected to finish sooner:
+
+- ``ROUTES``: one GetBusByRoute request per route, *concurrency* at a time
+- ``FLEET``: one GetAllBus request, split by route (``Buses.routes``).
+  Every route in the feed is cached, not just the ones asked for.
+
+The estimate compares ``ceil(missing routes / concurrency)`` rounds of
+route requests with one fleet request, using the average time each has
+taken so far (before that, a fleet request counts as *fleet_cost* route
+requests). A route being fetched for one caller is waited on, not fetched
+again, by every other caller, and clients can share a ``RouteCache``::
+
+    cache = RouteCache(ttl=15)
+    a = BusClient(route_cache=cache)
+    b = BusClient(route_cache=cache)
+    a.buses(routes=['110', '39'])
+    b.buses(routes=['39', '2'])     # only fetches route 2
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from time import perf_counter
+
+from martapy import instrument
+from martapy.cache import TTLCache, _Call
+
+ROUTES = 'routes'
+FLEET = 'fleet'
+
+#: Weight of the latest timing in the running averages
+_SMOOTHING = 0.3
+
+
+def _average(average, seconds):
+    if average is None:
+        return seconds
+    return average + _SMOOTHING * (seconds - average)
+
+
+class RouteCache:
+    """Per-route bus snapshots shared by every caller of ``get()``"""
+    def __init__(self, ttl=10, maxsize=1024, concurrency=8, fleet_cost=4,
+                 strategy=None):
+        """
+        :param ttl: Seconds a route's buses are served without refetching
+        :param maxsize: Most route snapshots kept
+        :param concurrency: Route requests in flight at once
+        :param fleet_cost: How many route requests one GetAllBus request
+            is assumed to cost until both have been timed
+        :param strategy: Always use ``ROUTES`` or ``FLEET`` instead of
+            choosing by cost
+        """
+        if strategy not in (None, ROUTES, FLEET):
+            raise ValueError("Unknown strategy '{}'. Expected '{}' or '{}'"
+                             .format(strategy, ROUTES, FLEET))
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.fleet_cost = fleet_cost
+        self.fixed_strategy = strategy
+        self.cache = TTLCache(maxsize, max_age=ttl)
+        #: Average seconds per round of route requests, and per fleet
+        #: request (``None`` until timed)
+        self.route_seconds = None
+        self.fleet_seconds = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get(self, client, routes, parse):
+        """Buses on each of *routes*
+
+        :param client: ``martapy.bus.BusClient`` to fetch with
+        :param routes: Iterable of routes
+        :param parse: ``Buses`` or ``LazyBuses``
+        :return: *OrderedDict* of route (as given) to buses, in the order
+            given
+        :raises requests.HTTPError: If a fetch fails
+        """
+        routes = list(routes)
+        names = [str(r) for r in routes]
+        found, owned, waiting = self._claim(client, names, parse)
+        hook = instrument.hook
+        if hook is not None:
+            hook.count('route_cache', len(found), kind='bus', result='hit')
+            hook.count('route_cache', len(owned) + len(waiting), kind='bus',
+                       result='miss')
+        if owned:
+            self._fetch(client, owned, parse)
+        for name, call in list(owned.items()) + list(waiting.items()):
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            found[name] = call.result
+        return OrderedDict((r, found[n]) for (r, n) in zip(routes, names))
+
+    def strategy(self, missing):
+        """``ROUTES`` or ``FLEET``, whichever should fetch *missing* routes
+        sooner"""
+        if self.fixed_strategy is not None:
+            return self.fixed_strategy
+        route, fleet = self.route_seconds, self.fleet_seconds
+        if route is None and fleet is None:
+            route, fleet = 1, self.fleet_cost
+        elif route is None:
+            route = fleet / self.fleet_cost
+        elif fleet is None:
+            fleet = route * self.fleet_cost
+        if ceil(missing / self.concurrency) * route > fleet:
+            return FLEET
+        return ROUTES
+
+    @staticmethod
+    def _key(client, name, parse):
+        return client.route_url.format(name), parse
+
+    def _claim(self, client, names, parse):
+        """Split *names* into cached routes, routes this caller fetches and
+        routes already being fetched
+
+        :return: ``(found, owned, waiting)``: dicts of route to its buses,
+            and of route to the ``_Call`` to wait on
+        """
+        found, owned, waiting = {}, {}, {}
+        with self._lock:
+            for name in names:
+                if name in found or name in owned or name in waiting:
+                    continue
+                key = self._key(client, name, parse)
+                call = self._inflight.get(key)
+                if call is not None:
+                    waiting[name] = call
+                    continue
+                # Checked under the lock: a fetch caches its routes before
+                # leaving _inflight
+                entry = self.cache.get(key)
+                if entry is not None:
+                    found[name] = entry[1]
+                else:
+                    owned[name] = self._inflight[key] = _Call()
+        return found, owned, waiting
+
+    def _fetch(self, client, owned, parse):
+        strategy = self.strategy(len(owned))
+        hook = instrument.hook
+        if hook is not None:
+            hook.count('batch', kind='bus', strategy=strategy)
+        try:
+            if strategy == FLEET:
+                results = self._fetch_fleet(client, parse)
+            else:
+                results = self._fetch_routes(client, list(owned), parse)
+            for name in owned:
+                if name not in results:
+                    # No buses on the route right now
+                    results[name] = parse([])
+            for name, buses in results.items():
+                self.cache.set(self._key(client, name, parse), buses)
+            for name, call in owned.items():
+                call.result = results[name]
+        except Exception as e:
+            for call in owned.values():
+                call.error = e
+        finally:
+            with self._lock:
+                for name in owned:
+                    self._inflight.pop(self._key(client, name, parse), None)
+            for call in owned.values():
+                call.done.set()
+
+    def _fetch_routes(self, client, names, parse):
+        start = perf_counter()
+        if len(names) == 1:
+            fetched = [client._route(names[0], parse)]
+        else:
+            fetched = list(self._pool().map(
+                lambda name: client._route(name, parse), names))
+        rounds = ceil(len(names) / self.concurrency)
+        self.route_seconds = _average(self.route_seconds,
+                                      (perf_counter() - start) / rounds)
+        return dict(zip(names, fetched))
+
+    def _fetch_fleet(self, client, parse):
+        start = perf_counter()
+        results = dict((str(route), buses) for (route, buses)
+                       in client._all(parse).routes.items())
+        self.fleet_seconds = _average(self.fleet_seconds,
+                                      perf_counter() - start)
+        return results
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency)
+            return self._executor
+
+    def clear(self):
+        """Forget every cached route"""
+        self.cache.clear()
+
+    def close(self):
+        """Forget every cached route and stop the request threads"""
+        self.clear()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
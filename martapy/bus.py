@@ -1,7 +1,12 @@
 """Wrapper for MARTA Bus Realtime RESTful API"""
 import json as json_
-import requests
-from datetime import datetime
+from collections import OrderedDict
+from time import perf_counter
+from martapy import instrument
+from martapy._util import (FrozenList, FrozenRecord, intern_str,
+                           parse_timestamp, rehost)
+from martapy.batch import RouteCache
+from martapy.transport import default_transport
 
 
 class BusClient:
@@ -11,78 +16,211 @@ class BusClient:
     route_url = ("http://developer.itsmarta.com/BRDRestService"
                  "/RestBusRealTimeService/GetBusByRoute/{}")
 
-    def __init__(self):
-        pass
+    def __init__(self, transport=None, host=None, route_cache=None):
+        """Initialize client
 
-    def buses(self, route=None):
+        :param transport: ``martapy.transport.HTTPTransport`` to fetch
+            with. Defaults to one shared by all clients.
+        :param host: Send requests to this scheme and host (ex:
+            *http://localhost:8000*, a ``martapy.simulator.Simulator``)
+            instead of developer.itsmarta.com
+        :param route_cache: ``martapy.batch.RouteCache`` used by
+            ``buses(routes=...)``, which can be shared between clients.
+            Defaults to a new one for this client.
+        """
+        self.route_cache = route_cache or RouteCache()
+        if host:
+            self.url = rehost(self.url, host)
+            self.route_url = rehost(self.route_url, host)
+        self.transport = transport or default_transport()
+
+    def buses(self, route=None, lazy=False, routes=None):
         """Get all active buses
         
         :param route: When supplied, only returns active buses for *route*
-        :return: ``Buses(list)``
+        :param lazy: Return a ``martapy.lazy.LazyBuses`` that only builds
+            the buses that are read
+        :param routes: When supplied, returns the active buses on each
+            route in *routes*, fetched route by route or from the all-bus
+            feed, whichever is cheaper, and cached per route (see
+            ``martapy.batch``)
+        :return: ``Buses(list)``, or for *routes* an *OrderedDict* of
+            route to ``Buses`` in the order given
         """
+        parse = self._parser(lazy)
+        if routes is not None:
+            return self.route_cache.get(self, routes, parse)
         if route:
-            return self._route(route)
-        return self._all()
+            return self._route(route, parse)
+        return self._all(parse)
 
     @staticmethod
-    def _all():
+    def _parser(lazy):
+        """``LazyBuses`` if *lazy*, otherwise ``Buses``"""
+        if lazy:
+            from martapy.lazy import LazyBuses
+            return LazyBuses
+        return Buses
+
+    def iter_buses(self, route=None):
+        """Stream active buses, yielding each ``Bus`` as soon as it has been
+        downloaded and decoded, without holding the whole feed in memory.
+
+        ``Buses(client.iter_buses())`` collects them into a ``Buses``.
+
+        :param route: When supplied, only yields active buses for *route*
+        :return: Generator of ``Bus``
+        """
+        url = self.route_url.format(str(route)) if route else self.url
+        for b in self.transport.stream(url):
+            yield Bus.from_json(b)
+
+    def _all(self, parse=None):
         """Returns all active buses"""
-        return Buses(requests.get(BusClient.url).json())
+        return self.transport.get(self.url, parse or Buses)
 
-    @staticmethod
-    def _route(route):
+    def _route(self, route, parse=None):
         """Returns active buses for *route*"""
-        return Buses(requests.get(BusClient.route_url.format(str(route)))
-                     .json())
+        return self.transport.get(self.route_url.format(str(route)),
+                                  parse or Buses)
 
 
-class Buses(list):
-    """List of active buses"""
+class Buses(FrozenList):
+    """Immutable snapshot of active buses
+
+    List methods that would change the snapshot raise ``TypeError``, so a
+    ``Buses`` can be shared between threads without locking.
+    """
     def __init__(self, buses):
-        self._buses = None
-        self.buses = buses
-        super().__init__(self.buses)
+        """
+        :param buses: Iterable (or iterator) of bus dicts from the API, or
+            of already-built ``Bus`` objects (which are reused as-is)
+        """
+        hook = instrument.hook
+        if hook is None:
+            super().__init__(self._build(buses))
+            return
+        cache_before = instrument.timestamp_cache_stats()
+        start = perf_counter()
+        super().__init__(self._build(buses))
+        hook.timing('parse', perf_counter() - start, kind='bus')
+        hook.count('records', len(self), kind='bus')
+        instrument.count_timestamp_cache(cache_before, 'bus')
+
+    def __reduce__(self):
+        return Buses, (list(self),)
 
     @property
     def buses(self):
-        return self._buses
+        """All ``Bus`` objects (this snapshot itself)"""
+        return self
+
+    @property
+    def routes(self):
+        """Buses grouped by route
 
-    @buses.setter
-    def buses(self, buses):
-        self._buses = [Bus.from_json(b) for b in buses]
+        Built once per ``Buses`` instance and cached, so treat the result
+        as read-only.
+
+        :return: *OrderedDict* of route to ``Buses``, sorted by route
+        """
+        routes = self.__dict__.get('_routes')
+        if routes is None:
+            groups = {}
+            for b in self:
+                groups.setdefault(b.route, []).append(b)
+            routes = self.__dict__.setdefault('_routes', OrderedDict(
+                (r, Buses._view(groups[r])) for r in sorted(groups, key=str)))
+        return routes
+
+    @staticmethod
+    def _build(buses):
+        return (b if isinstance(b, Bus) else Bus.from_json(b) for b in buses)
+
+    def spatial_index(self, cell_size=500):
+        """Grid index of these buses' positions for ``nearest()`` and
+        ``within()`` queries. Built once per cell size and then reused.
+
+        :param cell_size: Grid cell size in meters
+        :return: ``martapy.spatial.SpatialIndex``
+        """
+        from martapy.spatial import SpatialIndex
+        indexes = self.__dict__.setdefault('_spatial_indexes', {})
+        if cell_size not in indexes:
+            indexes[cell_size] = SpatialIndex(self, cell_size)
+        return indexes[cell_size]
+
+    def to_columns(self):
+        """Columnar (NumPy) copy of these buses for vectorized filtering
+        and aggregates. Requires NumPy.
+
+        :return: ``martapy.columnar.BusColumns``
+        """
+        from martapy.columnar import BusColumns
+        return BusColumns.from_buses(self)
+
+    @classmethod
+    def _view(cls, buses):
+        """``Buses`` around already-built ``Bus`` objects"""
+        view = cls.__new__(cls)
+        list.__init__(view, buses)
+        return view
 
     def filter(self, adherence=None, block_id=None, block_abbr=None,
                direction=None, latitude=None, longitude=None,
                msg_time=None, route=None, stop_id=None, timepoint=None,
-               trip_id=None, vehicle=None):
-        """Returns a list of buses matching supplied criteria"""
-        filter_kws = {
-            'adherence': adherence,
-            'block_id': block_id,
-            'block_abbr': block_abbr,
-            'direction': direction,
-            'latitude': latitude,
-            'longitude': longitude,
-            'msg_time': msg_time,
-            'route': route,
-            'stop_id': stop_id,
-            'timepoint': timepoint,
-            'trip_id': trip_id,
-            'vehicle': vehicle
-        }
-        for k, v in filter_kws.items():
-            if not v:
-                continue
-            self = self._filter(k, v)
-        return self
+               trip_id=None, vehicle=None, **lookups):
+        """Returns buses matching all supplied criteria
+
+        Named criteria must match exactly (``None`` means any value);
+        *lookups* take ``field__lookup`` criteria like ``where()``.
+
+        :return: ``martapy.bus.Buses``
+        """
+        criteria = dict((k, v) for (k, v) in (
+            ('adherence', adherence), ('block_id', block_id),
+            ('block_abbr', block_abbr), ('direction', direction),
+            ('latitude', latitude), ('longitude', longitude),
+            ('msg_time', msg_time), ('route', route), ('stop_id', stop_id),
+            ('timepoint', timepoint), ('trip_id', trip_id),
+            ('vehicle', vehicle)) if v is not None)
+        criteria.update(lookups)
+        return self.where(**criteria)
+
+    def where(self, **criteria):
+        """Buses matching every ``field__lookup=value`` criterion, found in
+        one pass (see ``martapy.query``), e.g.
+        ``where(adherence__lt=-5, route__in={'110', '39'})``
+
+        :return: ``martapy.bus.Buses``
+        :raises KeyError: For an unknown field
+        :raises ValueError: For an unknown lookup
+        """
+        from martapy import query
+        hook = instrument.hook
+        if hook is not None:
+            start = perf_counter()
+        found = query.run(self, query.BUS_FIELDS,
+                          query.parse(query.BUS_FIELDS, criteria),
+                          self.__dict__.setdefault('_query_cache', {}))
+        if hook is not None:
+            hook.timing('filter', perf_counter() - start, kind='bus')
+        return Buses._view(found)
 
-    def _filter(self, attribute_name, value):
-        v = getattr(self[0], attribute_name)
-        print(v)
-        return [bus for bus in self if getattr(bus, attribute_name) == value]
 
+class Bus(FrozenRecord):
+    """An active bus.
+
+    Uses ``__slots__`` and interned strings to keep snapshots small. Unless
+    a *json* string is given explicitly, ``Bus.json`` is rebuilt from the
+    bus's values on request instead of being stored. Buses are read-only
+    once built.
+    """
+    __slots__ = ('_json', '_msg_time', '_msg_time_raw', 'adherence',
+                 'block_abbr', 'block_id', 'direction', 'latitude',
+                 'longitude', 'route', 'stop_id', 'timepoint', 'trip_id',
+                 'vehicle')
 
-class Bus:
     _attr_map = {
         'ADHERENCE': 'adherence',
         'BLOCKID': 'block_id',
@@ -100,41 +238,51 @@ class Bus:
 
     def __init__(self, adherence, block_id, block_abbr, direction,  latitude,
                  longitude, msg_time, route, stop_id, timepoint, trip_id,
-                 vehicle, json):
-        self.adherence = adherence
-        self.block_id = block_id
-        self.block_abbr = block_abbr
-        self.direction = direction
-        self.latitude = latitude
-        self.longitude = longitude
-        self._msg_time = None
-        self.msg_time = msg_time
-        self.route = route
-        self.stop_id = stop_id
-        self.timepoint = timepoint
-        self.trip_id = trip_id
-        self.vehicle = vehicle
-        #: Original JSON response
-        self.json = json
+                 vehicle, json=None):
+        set_ = object.__setattr__
+        set_(self, 'adherence', adherence)
+        set_(self, 'block_id', intern_str(block_id))
+        set_(self, 'block_abbr', intern_str(block_abbr))
+        set_(self, 'direction', intern_str(direction))
+        set_(self, 'latitude', latitude)
+        set_(self, 'longitude', longitude)
+        set_(self, '_msg_time_raw', intern_str(msg_time))
+        set_(self, '_msg_time', parse_timestamp(msg_time) if msg_time
+             else None)
+        set_(self, 'route', intern_str(route))
+        set_(self, 'stop_id', intern_str(stop_id))
+        set_(self, 'timepoint', intern_str(timepoint))
+        set_(self, 'trip_id', trip_id)
+        set_(self, 'vehicle', vehicle)
+        set_(self, '_json', json)
 
     @property
     def msg_time(self):
         return self._msg_time
 
-    @msg_time.setter
-    def msg_time(self, msg_time):
-        if not msg_time:
-            self._msg_time = None
-        self._msg_time = datetime.strptime(msg_time, "%m/%d/%Y %I:%M:%S %p")
+    @property
+    def json(self):
+        """Original JSON response (rebuilt from this bus's values unless it
+        was passed in explicitly)"""
+        if self._json is not None:
+            return self._json
+        return json_.dumps(self.to_dict())
+
+    def to_dict(self):
+        """Bus as a dict shaped like the original API response"""
+        d = {}
+        for k, attr in Bus._attr_map.items():
+            d[k] = getattr(self, attr)
+        d['MSGTIME'] = self._msg_time_raw
+        return d
 
     @staticmethod
     def from_json(json_obj):
         kwargs = {Bus._attr_map[k]: v for (k, v) in json_obj.items()}
-        return Bus(json=json_.dumps(json_obj), **kwargs)
+        return Bus(**kwargs)
 
     def __str__(self):
         return self.json
 
     def __repr__(self):
         return str(self)
-
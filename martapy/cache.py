@@ -0,0 +1,223 @@
+"""Response caching for ``RailClient`` and ``BusClient``.
+
+``CachedTransport`` wraps a transport (by default the shared
+``HTTPTransport``) and can be handed to any number of clients::
+
+    transport = CachedTransport(ttl=10, stale_ttl=20)
+    rail_client = RailClient(api_key, transport=transport)
+
+Within *ttl* seconds every caller gets the same parsed ``Arrivals``/
+``Buses``. Concurrent misses share one in-flight request. For the
+following *stale_ttl* seconds the old result is still served while a
+single background refresh runs; if that refresh fails, a
+``RuntimeWarning`` is issued and the stale result kept. An optional
+``SQLiteStore`` keeps raw payloads on disk so other processes (or a
+restart) can reuse them.
+"""
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+from warnings import warn
+
+from martapy import instrument
+from martapy.transport import _kind, default_transport
+
+
+class TTLCache:
+    """Thread-safe LRU mapping of key to (stored_at, value).
+
+    Entries older than *max_age* seconds are dropped on access; callers
+    decide what's fresh or stale within that.
+    """
+    def __init__(self, maxsize=128, max_age=None):
+        """
+        :param maxsize: Most entries kept before evicting the least
+            recently used
+        :param max_age: Seconds after which entries are discarded
+            (``None`` keeps them until evicted)
+        """
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now=None):
+        """(stored_at, value) for *key*, or ``None``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.max_age is not None and \
+                    (now or time()) - entry[0] > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._entries[key] = (stored_at or time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteStore:
+    """On-disk store of raw payloads keyed by URL, shareable between
+    processes"""
+    def __init__(self, path):
+        """
+        :param path: SQLite database file (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS payloads "
+                         "(url TEXT PRIMARY KEY, stored_at REAL, body TEXT)")
+
+    def get(self, url):
+        """(stored_at, payload) for *url*, or ``None``"""
+        with self._lock:
+            row = self._db.execute("SELECT stored_at, body FROM payloads "
+                                   "WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, url, payload, stored_at=None):
+        body = json.dumps(payload, separators=(',', ':'))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO payloads "
+                             "VALUES (?, ?, ?)",
+                             (url, stored_at or time(), body))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Call:
+    """An in-flight fetch that other callers can wait on"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CachedTransport:
+    """Caching, coalescing wrapper around another transport"""
+    def __init__(self, transport=None, ttl=10, stale_ttl=0, maxsize=128,
+                 store=None):
+        """
+        :param transport: Transport to fetch through (defaults to the
+            shared ``HTTPTransport``)
+        :param ttl: Seconds a result is served without refetching
+        :param stale_ttl: Further seconds an expired result is still
+            served while it's refreshed in the background
+        :param maxsize: Most results kept in memory
+        :param store: Optional ``SQLiteStore`` for raw payloads
+        """
+        self.transport = transport or default_transport()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self.cache = TTLCache(maxsize, max_age=ttl + stale_ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, parse=None):
+        """Cached equivalent of ``HTTPTransport.get``"""
+        key = (url, parse)
+        now = time()
+        hook = instrument.hook
+        entry = self.cache.get(key, now)
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl:
+                if hook is not None:
+                    hook.count('cache', kind=_kind(url), result='hit')
+                return entry[1]
+            # Stale but within stale_ttl: serve it, refresh in background
+            if hook is not None:
+                hook.count('cache', kind=_kind(url), result='stale')
+            self._refresh(key, background=True)
+            return entry[1]
+        if self.store is not None:
+            stored = self.store.get(url)
+            if stored is not None and now - stored[0] < self.ttl:
+                if hook is not None:
+                    hook.count('cache', kind=_kind(url), result='disk')
+                value = parse(stored[1]) if parse is not None else stored[1]
+                self.cache.set(key, value, stored[0])
+                return value
+        if hook is not None:
+            hook.count('cache', kind=_kind(url), result='miss')
+        return self._refresh(key)
+
+    def stream(self, *args, **kwargs):
+        """Streams aren't cached; passed straight to the transport"""
+        return self.transport.stream(*args, **kwargs)
+
+    def _refresh(self, key, background=False):
+        """Fetch *key*, joining an in-flight fetch of it if there is one"""
+        with self._lock:
+            call = self._inflight.get(key)
+            owner = call is None
+            if owner:
+                call = self._inflight[key] = _Call()
+        if owner:
+            if background:
+                threading.Thread(target=self._fetch, args=(key, call, True),
+                                 daemon=True).start()
+            else:
+                self._fetch(key, call)
+        if background:
+            return None
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _fetch(self, key, call, background=False):
+        url, parse = key
+        try:
+            if self.store is None:
+                value = self.transport.get(url, parse)
+            else:
+                payload = self.transport.get(url)
+                self.store.set(url, payload)
+                value = parse(payload) if parse is not None else payload
+            self.cache.set(key, value)
+            call.result = value
+        except Exception as e:
+            call.error = e
+            if background:
+                # Nobody may be waiting on a background refresh to see it
+                hook = instrument.hook
+                if hook is not None:
+                    hook.count('cache', kind=_kind(url), result='error')
+                warn("Background refresh of {} failed: {!r}".format(url, e),
+                     RuntimeWarning)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def clear(self):
+        """Forget every cached result (the store is left as it is)"""
+        self.cache.clear()
+
+    def close(self):
+        self.clear()
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,263 @@
+"""Columnar (NumPy) representation of bus snapshots for vectorized
+filtering, bounding-box selection and per-group aggregates.
+
+Requires NumPy (``pip install martapy[columnar]``).
+"""
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from martapy._util import parse_timestamp
+from martapy.bus import Bus, Buses
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("martapy.columnar requires NumPy: "
+                          "pip install martapy[columnar]")
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class BusColumns:
+    """A bus snapshot (or many concatenated snapshots) stored as columns.
+
+    ``latitude``, ``longitude`` and ``adherence`` are float64 arrays (NaN
+    where missing), ``msg_time`` is a ``datetime64[s]`` array, and each of
+    ``BusColumns.categorical`` is stored as int32 codes into a list of
+    distinct values: ``codes['route']`` / ``categories['route']``.
+    """
+    #: Fields stored as categorical codes
+    categorical = ('route', 'direction', 'block_id')
+
+    def __init__(self, latitude, longitude, adherence, msg_time, codes,
+                 categories, source=None, rows=None):
+        """
+        :param latitude: float64 array
+        :param longitude: float64 array
+        :param adherence: float64 array
+        :param msg_time: datetime64[s] array
+        :param codes: dict of categorical field to int32 code array
+        :param categories: dict of categorical field to list of values
+        :param source: Optional list of ``Bus`` objects or bus dicts the
+            rows came from (used by ``to_buses()``)
+        :param rows: Positions in *source* of each row
+        """
+        _require_numpy()
+        self.latitude = latitude
+        self.longitude = longitude
+        self.adherence = adherence
+        self.msg_time = msg_time
+        self.codes = codes
+        self.categories = categories
+        self._source = source
+        self._rows = rows if rows is not None else np.arange(len(latitude))
+
+    @classmethod
+    def from_buses(cls, buses):
+        """Build columns from ``Bus`` objects (a ``Buses`` list)"""
+        buses = list(buses)
+        return cls._build(
+            buses, lambda b, attr: getattr(b, attr),
+            lambda b: b.msg_time)
+
+    @classmethod
+    def from_json(cls, payload):
+        """Build columns straight from decoded API dicts, without creating
+        ``Bus`` objects"""
+        payload = list(payload)
+        keys = dict((v, k) for (k, v) in Bus._attr_map.items())
+        return cls._build(
+            payload, lambda b, attr: b.get(keys[attr]),
+            lambda b: parse_timestamp(b['MSGTIME'])
+            if b.get('MSGTIME') else None)
+
+    @classmethod
+    def _build(cls, records, value, msg_time):
+        _require_numpy()
+        n = len(records)
+        latitude = np.empty(n)
+        longitude = np.empty(n)
+        adherence = np.empty(n)
+        lookups = dict((f, {}) for f in cls.categorical)
+        codes = dict((f, np.empty(n, dtype=np.int32))
+                     for f in cls.categorical)
+        times = []
+        for i, r in enumerate(records):
+            latitude[i] = _float(value(r, 'latitude'))
+            longitude[i] = _float(value(r, 'longitude'))
+            adherence[i] = _float(value(r, 'adherence'))
+            times.append(msg_time(r))
+            for f in cls.categorical:
+                lookup = lookups[f]
+                v = value(r, f)
+                code = lookup.get(v)
+                if code is None:
+                    code = lookup[v] = len(lookup)
+                codes[f][i] = code
+        categories = dict((f, list(lookup)) for (f, lookup)
+                          in lookups.items())
+        msg_times = np.array(times, dtype='datetime64[s]')
+        return cls(latitude, longitude, adherence, msg_times, codes,
+                   categories, source=records)
+
+    @classmethod
+    def concat(cls, columns):
+        """Concatenate several ``BusColumns`` (e.g. historical snapshots)
+        into one, re-coding categories so codes are shared"""
+        _require_numpy()
+        columns = list(columns)
+        categories = {}
+        codes = {}
+        for f in cls.categorical:
+            lookup = {}
+            parts = []
+            for c in columns:
+                remap = np.array([lookup.setdefault(v, len(lookup))
+                                  for v in c.categories[f]], dtype=np.int32)
+                parts.append(remap[c.codes[f]] if len(remap)
+                             else c.codes[f])
+            categories[f] = list(lookup)
+            codes[f] = np.concatenate(parts) if parts \
+                else np.empty(0, dtype=np.int32)
+        return cls(
+            np.concatenate([c.latitude for c in columns]),
+            np.concatenate([c.longitude for c in columns]),
+            np.concatenate([c.adherence for c in columns]),
+            np.concatenate([c.msg_time for c in columns]),
+            codes, categories)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def take(self, selection):
+        """Subset of rows selected by a boolean mask or array of positions
+
+        :return: ``BusColumns`` sharing this one's categories
+        """
+        codes = dict((f, c[selection]) for (f, c) in self.codes.items())
+        return BusColumns(self.latitude[selection],
+                          self.longitude[selection],
+                          self.adherence[selection],
+                          self.msg_time[selection], codes, self.categories,
+                          source=self._source, rows=self._rows[selection])
+
+    def column(self, field):
+        """Values of *field* as an array (categoricals are decoded)"""
+        if field in self.codes:
+            values = np.array(self.categories[field], dtype=object)
+            return values[self.codes[field]] if len(values) \
+                else np.empty(0, dtype=object)
+        return getattr(self, field)
+
+    def mask(self, **criteria):
+        """Boolean mask of rows matching every criterion.
+
+        Categorical fields take a value or a list/set/tuple of values.
+        ``adherence``, ``latitude``, ``longitude`` and ``msg_time`` take an
+        exact value or a ``(low, high)`` tuple (inclusive, either may be
+        ``None``).
+
+        :raises KeyError: For an unknown field
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for field, value in criteria.items():
+            if field in self.codes:
+                if isinstance(value, (list, set, tuple, frozenset)):
+                    wanted = value
+                else:
+                    wanted = [value]
+                positions = dict((v, i) for (i, v)
+                                 in enumerate(self.categories[field]))
+                wanted = [positions[v] for v in wanted if v in positions]
+                mask &= np.isin(self.codes[field], wanted)
+            elif field in ('adherence', 'latitude', 'longitude', 'msg_time'):
+                column = getattr(self, field)
+                if field == 'msg_time':
+                    value = self._time_bound(value)
+                if isinstance(value, tuple):
+                    low, high = value
+                    if low is not None:
+                        mask &= column >= low
+                    if high is not None:
+                        mask &= column <= high
+                else:
+                    mask &= column == value
+            else:
+                raise KeyError("Can't filter on '{}'".format(field))
+        return mask
+
+    @staticmethod
+    def _time_bound(value):
+        def convert(v):
+            if isinstance(v, datetime):
+                return np.datetime64(v, 's')
+            return v
+        if isinstance(value, tuple):
+            return tuple(convert(v) for v in value)
+        return convert(value)
+
+    def filter(self, **criteria):
+        """Rows matching every criterion (see ``BusColumns.mask``)
+
+        :return: ``BusColumns``
+        """
+        return self.take(self.mask(**criteria))
+
+    def bbox(self, south, west, north, east):
+        """Rows positioned within a latitude/longitude bounding box
+
+        :return: ``BusColumns``
+        """
+        lat = self.latitude
+        lon = self.longitude
+        return self.take((lat >= south) & (lat <= north) &
+                         (lon >= west) & (lon <= east))
+
+    def group_count(self, by='route'):
+        """Number of rows per value of categorical field *by*
+
+        :return: dict of value to count (only values present)
+        """
+        counts = np.bincount(self.codes[by],
+                             minlength=len(self.categories[by]))
+        return dict((v, int(n)) for (v, n)
+                    in zip(self.categories[by], counts) if n)
+
+    def group_mean(self, field='adherence', by='route'):
+        """Mean of numeric *field* per value of categorical field *by*,
+        ignoring NaN
+
+        :return: dict of value to mean (only values with data)
+        """
+        values = getattr(self, field)
+        valid = ~np.isnan(values)
+        codes = self.codes[by][valid]
+        size = len(self.categories[by])
+        sums = np.bincount(codes, weights=values[valid], minlength=size)
+        counts = np.bincount(codes, minlength=size)
+        return dict((v, float(s / n)) for (v, s, n)
+                    in zip(self.categories[by], sums, counts) if n)
+
+    def mean_adherence(self, by='route'):
+        """Mean adherence per route (or other categorical field *by*)"""
+        return self.group_mean('adherence', by)
+
+    def to_buses(self):
+        """Rows as a ``Buses`` list, reusing the source ``Bus`` objects
+
+        :raises ValueError: If the columns weren't built from a snapshot
+            (e.g. they came from ``BusColumns.concat``)
+        """
+        if self._source is None:
+            raise ValueError("These columns have no source rows to "
+                             "rebuild Buses from")
+        return Buses(self._source[i] for i in self._rows)
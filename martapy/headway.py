@@ -0,0 +1,271 @@
+"""Train trajectories, headways and dwell times, maintained incrementally
+from ``ArrivalTracker`` deltas.
+
+Each update only touches the trains and station boards that appear in the
+delta, and every query reads a structure that was brought up to date
+then::
+
+    tracker = ArrivalTracker(RailClient(api_key))
+    engine = HeadwayEngine()
+    while True:
+        engine.update(tracker.poll())
+        engine.next_headway('FIVE POINTS STATION', 'RED', 'N')
+        engine.position('104026')
+
+A *board* is one station's predictions for one line and direction.
+Headways are in seconds: *predicted* ones are the gaps between the trains
+currently predicted at a board, *observed* ones the gaps between trains
+that actually reached it.
+"""
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, timedelta
+
+#: ``Arrival.waiting_time`` values meaning the train is at the station
+AT_STATION = ('Arrived', 'Boarding')
+
+_DAY = timedelta(days=1)
+_HALF_DAY = timedelta(hours=12)
+
+
+def arrival_time(arrival):
+    """``Arrival.next_arr`` as a ``datetime`` on the day of its
+    ``event_time`` (the next or previous day across midnight)"""
+    event = arrival.event_time
+    when = datetime.combine(event.date(), arrival.next_arr)
+    if when - event > _HALF_DAY:
+        when -= _DAY
+    elif event - when > _HALF_DAY:
+        when += _DAY
+    return when
+
+
+class Trajectory:
+    """One train's path along its line"""
+    __slots__ = ('train_id', 'line', 'direction', 'destination', 'visited',
+                 'upcoming')
+
+    def __init__(self, train_id, history):
+        self.train_id = train_id
+        self.line = None
+        self.direction = None
+        self.destination = None
+        #: ``(station, arrived at)`` for stations passed, oldest first
+        self.visited = deque(maxlen=history)
+        #: ``(predicted arrival, station)`` for stations ahead, soonest first
+        self.upcoming = []
+
+    @property
+    def last_station(self):
+        """Station the train was last seen at, or ``None``"""
+        return self.visited[-1][0] if self.visited else None
+
+    @property
+    def next_station(self):
+        """Next station the train is predicted at, or ``None``"""
+        return self.upcoming[0][1] if self.upcoming else None
+
+    @property
+    def stations(self):
+        """Station sequence: visited ones, then upcoming ones"""
+        return [s for (s, _) in self.visited] + \
+            [s for (_, s) in self.upcoming]
+
+    def __repr__(self):
+        return '<Trajectory {} {}-{}: {}>'.format(
+            self.train_id, self.line, self.direction,
+            ' > '.join(self.stations))
+
+
+class HeadwayEngine:
+    """Maintains trajectories, headways and dwell times across polls"""
+    def __init__(self, history=50):
+        """
+        :param history: How many observed headways (per board) and
+            visited stations (per train) to keep
+        """
+        self.history = history
+        self._arrivals = {}
+        self._trains = {}
+        self._boards = {}
+        self._headways = {}
+        self._station_boards = {}
+        self._arrived = {}
+        self._last_arrival = {}
+        self._observed = {}
+        self._dwell = {}
+        self._line_totals = {}
+        #: Latest feed time seen (``datetime``)
+        self.now = None
+
+    def update(self, delta, now=None):
+        """Apply the changes from one poll
+
+        :param delta: ``martapy.tracker.Delta`` of ``Arrival`` records
+        :param now: Feed time of the poll; defaults to the latest
+            ``event_time`` in *delta*
+        :return: Set of ``(station, line, direction)`` boards that changed
+        """
+        changed = set()
+        placed = delta.added + delta.updated
+        if now is None:
+            now = max((a.event_time for a in placed), default=self.now)
+        if now is not None and (self.now is None or now > self.now):
+            self.now = now
+        for arrival in delta.updated:
+            key = (arrival.train_id, arrival.station)
+            if key in self._arrivals:
+                self._unplace(key, changed)
+        for arrival in placed:
+            self._place(arrival, changed)
+        for arrival in delta.removed:
+            key = (arrival.train_id, arrival.station)
+            if key in self._arrivals:
+                self._depart(key, changed)
+        for board in changed:
+            self._refresh(board)
+        return changed
+
+    def _place(self, arrival, changed):
+        key = (arrival.train_id, arrival.station)
+        when = arrival_time(arrival)
+        board = (arrival.station, arrival.line, arrival.direction)
+        self._arrivals[key] = (arrival, when, board)
+        insort(self._boards.setdefault(board, []), (when, arrival.train_id))
+        train = self._trains.get(arrival.train_id)
+        if train is None:
+            train = self._trains[arrival.train_id] = \
+                Trajectory(arrival.train_id, self.history)
+        train.line = arrival.line
+        train.direction = arrival.direction
+        train.destination = arrival.destination
+        insort(train.upcoming, (when, arrival.station))
+        if arrival.waiting_time in AT_STATION and key not in self._arrived:
+            self._arrived[key] = arrival.event_time
+        changed.add(board)
+
+    def _unplace(self, key, changed):
+        arrival, when, board = self._arrivals.pop(key)
+        _discard(self._boards[board], (when, arrival.train_id))
+        train = self._trains[arrival.train_id]
+        _discard(train.upcoming, (when, arrival.station))
+        changed.add(board)
+        return arrival, when, board, train
+
+    def _depart(self, key, changed):
+        """The train is gone from a station's board: record its visit if it
+        got there, then forget the prediction"""
+        arrival, when, board, train = self._unplace(key, changed)
+        arrived = self._arrived.pop(key, None)
+        if arrived is not None or (self.now is not None and when <= self.now):
+            at = arrived or when
+            train.visited.append((arrival.station, at))
+            last = self._last_arrival.get(board)
+            if last is not None and at > last:
+                self._observed.setdefault(
+                    board, deque(maxlen=self.history)).append(
+                        (at - last).total_seconds())
+            if last is None or at > last:
+                self._last_arrival[board] = at
+            if arrived is not None and self.now is not None and \
+                    self.now >= arrived:
+                totals = self._dwell.setdefault(arrival.station, [0, 0.0])
+                totals[0] += 1
+                totals[1] += (self.now - arrived).total_seconds()
+        if not train.upcoming:
+            del self._trains[arrival.train_id]
+
+    def _refresh(self, board):
+        """Recompute the predicted headways of one board"""
+        trains = self._boards.get(board, ())
+        headways = tuple((trains[i + 1][0] - trains[i][0]).total_seconds()
+                         for i in range(len(trains) - 1))
+        old = self._headways.get(board, ())
+        station, line, direction = board
+        totals = self._line_totals.setdefault((line, direction), [0, 0.0])
+        if old:
+            totals[0] -= 1
+            totals[1] -= old[0]
+        if headways:
+            totals[0] += 1
+            totals[1] += headways[0]
+        boards = self._station_boards.setdefault(station, {})
+        if trains:
+            self._headways[board] = headways
+            boards[(line, direction)] = headways
+        else:
+            self._boards.pop(board, None)
+            self._headways.pop(board, None)
+            boards.pop((line, direction), None)
+
+    # Queries
+
+    @property
+    def trains(self):
+        """Train ID to ``Trajectory`` for every train with predictions"""
+        return self._trains
+
+    def trajectory(self, train_id):
+        """``Trajectory`` of *train_id*, or ``None``"""
+        return self._trains.get(train_id)
+
+    def position(self, train_id):
+        """Where *train_id* is between stations
+
+        :return: ``(last station, next station, predicted arrival at the
+            next station)``, or ``None`` for an unknown train
+        """
+        train = self._trains.get(train_id)
+        if train is None:
+            return None
+        when = train.upcoming[0][0] if train.upcoming else None
+        return train.last_station, train.next_station, when
+
+    def headways(self, station, line, direction):
+        """Predicted headways (seconds) between the trains due at a
+        board, soonest first
+
+        :return: tuple (empty if fewer than two trains are predicted)
+        """
+        return self._headways.get((station, line, direction), ())
+
+    def next_headway(self, station, line, direction):
+        """Gap (seconds) between the next two trains at a board, or
+        ``None``"""
+        headways = self._headways.get((station, line, direction))
+        return headways[0] if headways else None
+
+    def board(self, station):
+        """Predicted headways for every line and direction at *station*
+
+        :return: dict of ``(line, direction)`` to headways tuple
+        """
+        return self._station_boards.get(station, {})
+
+    def observed_headways(self, station, line, direction):
+        """Gaps (seconds) between the latest trains to reach a board,
+        oldest first, up to ``history`` of them"""
+        return tuple(self._observed.get((station, line, direction), ()))
+
+    def dwell(self, station):
+        """Mean seconds trains have spent at *station* (from first being
+        reported *Arrived*/*Boarding* to leaving the board), or ``None``"""
+        totals = self._dwell.get(station)
+        if not totals or not totals[0]:
+            return None
+        return totals[1] / totals[0]
+
+    def line_headway(self, line, direction):
+        """Mean next-train headway (seconds) across a line's stations in
+        one direction, or ``None``"""
+        totals = self._line_totals.get((line, direction))
+        if not totals or not totals[0]:
+            return None
+        return totals[1] / totals[0]
+
+
+def _discard(ordered, item):
+    """Remove *item* from the sorted list *ordered*"""
+    i = bisect_left(ordered, item)
+    if i < len(ordered) and ordered[i] == item:
+        del ordered[i]
@@ -0,0 +1,175 @@
+"""Opt-in instrumentation of the fetch/parse/filter hot paths.
+
+Nothing is recorded until a hook is installed; while none is, each
+instrumented call site costs a single ``None`` check::
+
+    registry = MetricsRegistry()
+    instrument.install(registry)
+    rail_client.arrivals()
+    print(registry.render())
+
+Stages timed (``Hook.timing``), all labelled with *kind* (``rail`` or
+``bus``) where it applies:
+
+* ``fetch``: HTTP request and download
+* ``decode``: ``json`` decoding of the response
+* ``parse``: building ``Arrival``/``Bus`` objects from decoded dicts
+* ``validate``: ``Arrival`` key validation (part of ``parse``)
+* ``timestamp``: parsing ``Arrival`` timestamps (part of ``parse``)
+* ``sort``: sorting arrivals by ``next_arr``
+* ``station_check``: looking for unknown station names
+* ``filter``: ``Arrivals._filter``/``Arrivals.query``
+
+Counts (``Hook.count``): ``bytes`` downloaded, ``records`` parsed,
+``not_modified`` responses, ``timestamp_cache`` hits/misses (labelled
+*result*), and ``cache`` lookups in ``CachedTransport`` (labelled
+*result*: ``hit``, ``stale``, ``disk`` or ``miss``, plus ``error`` for a
+failed background refresh).
+"""
+import threading
+from contextlib import contextmanager
+
+#: The installed hook, or ``None`` when instrumentation is disabled
+hook = None
+
+
+class Hook:
+    """Interface for receiving measurements. Subclass and override
+    either method; both do nothing by default."""
+    def timing(self, stage, seconds, **labels):
+        """*stage* took *seconds*"""
+
+    def count(self, name, value=1, **labels):
+        """Add *value* to counter *name*"""
+
+
+class CallbackHook(Hook):
+    """Forwards every measurement to a callable as
+    ``callback(kind, name, value, labels)``, where *kind* is ``'timing'``
+    or ``'count'``"""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def timing(self, stage, seconds, **labels):
+        self.callback('timing', stage, seconds, labels)
+
+    def count(self, name, value=1, **labels):
+        self.callback('count', name, value, labels)
+
+
+class MetricsRegistry(Hook):
+    """Thread-safe, Prometheus-style registry of counters and timing
+    summaries (count, sum and max per stage and label set)"""
+    def __init__(self, prefix='martapy'):
+        self.prefix = prefix
+        self._counters = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def timing(self, stage, seconds, **labels):
+        key = self._key(stage, labels)
+        with self._lock:
+            count, total, largest = self._timings.get(key, (0, 0.0, 0.0))
+            self._timings[key] = (count + 1, total + seconds,
+                                  max(largest, seconds))
+
+    def count(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name, **labels):
+        """Current value of counter *name* with exactly *labels*"""
+        return self._counters.get(self._key(name, labels), 0)
+
+    def timings(self, stage, **labels):
+        """(count, total seconds, max seconds) for *stage* with exactly
+        *labels*"""
+        return self._timings.get(self._key(stage, labels), (0, 0.0, 0.0))
+
+    def snapshot(self):
+        """Copy of everything recorded, as
+        ``{'counters': {(name, labels): value},
+        'timings': {(stage, labels): (count, sum, max)}}``"""
+        with self._lock:
+            return {'counters': dict(self._counters),
+                    'timings': dict(self._timings)}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format"""
+        def labels(pairs, extra=()):
+            pairs = list(pairs) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(k, v)
+                                  for (k, v) in pairs) + '}'
+
+        snapshot = self.snapshot()
+        lines = []
+        for (name, pairs), value in sorted(snapshot['counters'].items()):
+            lines.append('{}_{}_total{} {}'.format(self.prefix, name,
+                                                   labels(pairs), value))
+        for (stage, pairs), (count, total, largest) in \
+                sorted(snapshot['timings'].items()):
+            stage_labels = labels([('stage', stage)], pairs)
+            lines.append('{}_stage_seconds_count{} {}'.format(
+                self.prefix, stage_labels, count))
+            lines.append('{}_stage_seconds_sum{} {!r}'.format(
+                self.prefix, stage_labels, total))
+            lines.append('{}_stage_seconds_max{} {!r}'.format(
+                self.prefix, stage_labels, largest))
+        return '\n'.join(lines) + '\n'
+
+
+def install(new_hook):
+    """Send measurements to *new_hook* (replacing any installed hook)
+
+    :return: The previously installed hook, or ``None``
+    """
+    global hook
+    previous = hook
+    hook = new_hook
+    return previous
+
+
+def uninstall():
+    """Disable instrumentation"""
+    install(None)
+
+
+@contextmanager
+def installed(new_hook):
+    """Install *new_hook* for the duration of a ``with`` block"""
+    previous = install(new_hook)
+    try:
+        yield new_hook
+    finally:
+        install(previous)
+
+
+def timestamp_cache_stats():
+    """(hits, misses) of the memoized timestamp parsers"""
+    from martapy._util import parse_clock, parse_timestamp
+    stamp = parse_timestamp.cache_info()
+    clock = parse_clock.cache_info()
+    return stamp.hits + clock.hits, stamp.misses + clock.misses
+
+
+def count_timestamp_cache(before, kind):
+    """Report timestamp cache hits/misses since *before*
+    (from ``timestamp_cache_stats()``) to the installed hook"""
+    if hook is None:
+        return
+    hits, misses = timestamp_cache_stats()
+    hook.count('timestamp_cache', hits - before[0], kind=kind, result='hit')
+    hook.count('timestamp_cache', misses - before[1], kind=kind,
+               result='miss')
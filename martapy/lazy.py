@@ -0,0 +1,321 @@
+"""Lazy snapshots that keep the decoded API dicts and only build
+``Arrival``/``Bus`` objects (and parse their timestamps) when they're read
+
+Filters, queries and groupings run on the raw fields and return lazy views
+of the same snapshot, so looking up one station's board on a full feed
+only parses that station's arrivals::
+
+    arrivals = rail_client.arrivals(lazy=True)
+    len(arrivals)                       # nothing parsed
+    board = arrivals.by_station('five points').northbound
+    for arrival in board:               # parses these arrivals only
+        print(arrival.next_arr)
+
+``where()`` takes the same ``field__lookup`` criteria as the regular
+collections. Exact and ``in`` criteria on text fields are matched on the
+raw fields; only the records they leave are built to test the rest.
+
+Each raw record is validated when its object is first built, so malformed
+records raise on access rather than when the snapshot is created.
+``materialize()`` builds everything and returns a regular
+``Arrivals``/``Buses``.
+"""
+from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
+
+from martapy import query
+from martapy._util import parse_clock, parse_timestamp
+from martapy.bus import Bus, Buses
+from martapy.rail import Arrival, Arrivals, _ArrivalFilters, check_stations
+
+
+class _LazySnapshot(Sequence):
+    """Immutable sequence of records built on demand from raw dicts"""
+    #: Attribute name to the raw key it's read from unchanged
+    raw_keys = {}
+    #: ``martapy.query.Fields`` of the records
+    fields = None
+    #: Timestamp attribute name to the raw key it's parsed from
+    timestamp_keys = {}
+
+    def __init__(self, payload):
+        """
+        :param payload: Decoded API response (list of dicts)
+        """
+        self._raw = tuple(payload)
+        self._objects = {}
+        self._rows = range(len(self._raw))
+        self._order = None
+        self._index = {}
+
+    def _view(self, rows):
+        """A snapshot of the same kind over *rows* (positions in the raw
+        payload, ascending), sharing this one's raw dicts and objects"""
+        view = self.__class__.__new__(self.__class__)
+        view._raw = self._raw
+        view._objects = self._objects
+        view._rows = rows
+        view._order = None
+        view._index = {}
+        return view
+
+    def _build(self, record):
+        raise NotImplementedError
+
+    def _sorted(self):
+        """Rows in iteration order"""
+        return self._rows
+
+    def _get(self, row):
+        obj = self._objects.get(row)
+        if obj is None:
+            # setdefault so threads racing on one record share the winner
+            obj = self._objects.setdefault(row, self._build(self._raw[row]))
+        return obj
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if self._order is None:
+            self._order = self._sorted()
+        if isinstance(i, slice):
+            return self._view(sorted(self._order[i]))
+        return self._get(self._order[i])
+
+    def __iter__(self):
+        if self._order is None:
+            self._order = self._sorted()
+        return map(self._get, self._order)
+
+    def __repr__(self):
+        return '<{} of {} records>'.format(self.__class__.__name__, len(self))
+
+    @property
+    def raw(self):
+        """The raw dicts of this snapshot, in payload order"""
+        return [self._raw[r] for r in self._rows]
+
+    @property
+    def materialized(self):
+        """How many of this snapshot's records have been built"""
+        objects = self._objects
+        return sum(1 for r in self._rows if r in objects)
+
+    def _attribute_index(self, attribute_name):
+        """Raw value to rows for one attribute, built on first use"""
+        index = self._index.get(attribute_name)
+        if index is None:
+            key = self.raw_keys[attribute_name]
+            rows = defaultdict(list)
+            raw = self._raw
+            for r in self._rows:
+                rows[raw[r].get(key)].append(r)
+            index = dict((v, tuple(r)) for (v, r) in rows.items())
+            self._index[attribute_name] = index
+        return index
+
+    def _filter(self, attribute_name, value):
+        """Records whose *attribute_name* is *value*, as a lazy view.
+
+        Attributes in ``raw_keys`` are matched on the raw field; others
+        build the records to compare them.
+        """
+        if attribute_name in self.raw_keys:
+            return self._view(
+                self._attribute_index(attribute_name).get(value, ()))
+        return self._view(tuple(r for r in self._rows
+                                if getattr(self._get(r), attribute_name)
+                                == value))
+
+    def where(self, **criteria):
+        """Records matching every ``field__lookup=value`` criterion, like
+        ``Arrivals.where``/``Buses.where`` (see ``martapy.query``)
+
+        :return: Lazy view of the same kind
+        :raises KeyError: For an unknown field
+        :raises ValueError: For an unknown lookup
+        """
+        fields = self.fields
+        rows = self._rows
+        rest = []
+        for field, lookup, value in query.parse(fields, criteria):
+            if lookup not in ('exact', 'in') or field not in fields.text \
+                    or field not in self.raw_keys:
+                rest.append((field, lookup, value))
+                continue
+            index = self._attribute_index(field)
+            if lookup == 'exact':
+                matched = index.get(value, ())
+            else:
+                matched = sorted(r for v in value for r in index.get(v, ()))
+            if rows is self._rows:
+                rows = tuple(matched)
+            else:
+                matched = set(matched)
+                rows = tuple(r for r in rows if r in matched)
+        if rest:
+            records = [self._get(r) for r in rows]
+            found = set(map(id, query.run(records, fields, rest,
+                                          newest=self._newest)))
+            rows = tuple(r for (r, record) in zip(rows, records)
+                         if id(record) in found)
+        return self._view(rows)
+
+    def _newest(self, field):
+        """Newest value of timestamp *field* in this snapshot, parsed from
+        the raw fields"""
+        key = self.timestamp_keys[field]
+        raw = self._raw
+        return max((parse_timestamp(raw[r][key]) for r in self._rows
+                    if raw[r].get(key)), default=None)
+
+    def _grouped(self, attribute_name):
+        """*OrderedDict* of raw value to lazy view, sorted by value"""
+        index = self._attribute_index(attribute_name)
+        return OrderedDict((v, self._view(index[v]))
+                           for v in sorted(index, key=_none_first))
+
+
+def _none_first(value):
+    return (value is not None, value)
+
+
+class LazyArrivals(_ArrivalFilters, _LazySnapshot):
+    """Lazy counterpart of ``martapy.rail.Arrivals``
+
+    Has the same filters (``red_line``, ``northbound``, ``by_station()``,
+    ``query()``...), each returning another ``LazyArrivals``. Groupings
+    (``trains``, ``stations``) map to ``LazyArrivals`` too, rather than
+    lists. Iteration is in ``next_arr`` order like ``Arrivals``; only the
+    *NEXT_ARR* field of the records being iterated is parsed to sort them.
+    """
+    indexed_attributes = Arrivals.indexed_attributes
+    raw_keys = dict((attr, attr.upper()) for attr in
+                    indexed_attributes + ('destination',))
+    fields = query.ARRIVAL_FIELDS
+    timestamp_keys = {'event_time': 'EVENT_TIME'}
+
+    def __init__(self, payload):
+        """
+        :param payload: List of arrival dicts from the API
+        """
+        super().__init__(payload)
+        self._trains = None
+        self._stations = None
+        stations = self._attribute_index('station')
+        #: Station names not in ``martapy.stations.station_list``
+        self.new_stations = check_stations(s for s in stations
+                                           if s is not None)
+
+    def _view(self, rows):
+        view = super()._view(rows)
+        view._trains = None
+        view._stations = None
+        view.new_stations = ()
+        return view
+
+    def _build(self, record):
+        return Arrival.from_json(record)
+
+    def _sorted(self):
+        raw = self._raw
+        return sorted(self._rows,
+                      key=lambda r: parse_clock(raw[r].get('NEXT_ARR')))
+
+    @property
+    def arrivals(self):
+        """All arrivals (this snapshot itself)"""
+        return self
+
+    def query(self, **criteria):
+        """Filter on several indexed attributes at once, on the raw fields.
+        See ``Arrivals.query``.
+
+        :return: ``martapy.lazy.LazyArrivals``
+        :raises KeyError: If an attribute isn't indexed
+        """
+        for attr in criteria:
+            if attr not in self.indexed_attributes:
+                raise KeyError("'{}' is not an indexed attribute. Expected "
+                               "one of: {}".format(
+                                   attr, ','.join(self.indexed_attributes)))
+        if not criteria:
+            return self._view(self._rows)
+        matches = sorted(((self._attribute_index(k).get(v, ()), k)
+                          for (k, v) in criteria.items()),
+                         key=lambda m: len(m[0]))
+        rows = matches[0][0]
+        raw = self._raw
+        for _, attr in matches[1:]:
+            key, value = self.raw_keys[attr], criteria[attr]
+            rows = tuple(r for r in rows if raw[r].get(key) == value)
+        return self._view(rows)
+
+    def materialize(self):
+        """Build every arrival
+
+        :return: ``martapy.rail.Arrivals`` sharing the built objects
+        """
+        return Arrivals._view(list(self), self.new_stations)
+
+
+class LazyBuses(_LazySnapshot):
+    """Lazy counterpart of ``martapy.bus.Buses``, in payload order"""
+    raw_keys = dict((attr, key) for (key, attr) in Bus._attr_map.items()
+                    if attr != 'msg_time')
+    fields = query.BUS_FIELDS
+    timestamp_keys = {'msg_time': 'MSGTIME'}
+
+    def _build(self, record):
+        return Bus.from_json(record)
+
+    @property
+    def buses(self):
+        """All buses (this snapshot itself)"""
+        return self
+
+    @property
+    def routes(self):
+        """Buses grouped by route, on the raw *ROUTE* field. See
+        ``Buses.routes``.
+
+        :return: *OrderedDict* of route to ``LazyBuses``
+        """
+        routes = self.__dict__.get('_routes')
+        if routes is None:
+            routes = self.__dict__.setdefault('_routes',
+                                              self._grouped('route'))
+        return routes
+
+    def filter(self, **criteria):
+        """Buses matching all of *criteria*, like ``Buses.filter``: named
+        attributes must match exactly (``None`` means any value), and
+        ``field__lookup`` criteria work as in ``where()``, e.g.
+        ``filter(route=110, adherence__lt=-5)``
+
+        :return: ``martapy.lazy.LazyBuses``
+        :raises KeyError: If an attribute isn't a bus field
+        """
+        return self.where(**dict((k, v) for (k, v) in criteria.items()
+                                 if v is not None or '__' in k))
+
+    def spatial_index(self, cell_size=500):
+        """See ``Buses.spatial_index``; builds every bus"""
+        return self.materialize().spatial_index(cell_size)
+
+    def to_columns(self):
+        """Columns built straight from the raw dicts, without creating
+        ``Bus`` objects. Requires NumPy.
+
+        :return: ``martapy.columnar.BusColumns``
+        """
+        from martapy.columnar import BusColumns
+        return BusColumns.from_json(self.raw)
+
+    def materialize(self):
+        """Build every bus
+
+        :return: ``martapy.bus.Buses`` sharing the built objects
+        """
+        return Buses(list(self))
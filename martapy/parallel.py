@@ -0,0 +1,180 @@
+"""Parse many bus payloads (e.g. one per route) across a process pool
+
+Workers decode the JSON, validate each bus and parse its timestamp, then
+send their chunk back dictionary-encoded: a table of the chunk's distinct
+values plus one ``array('I')`` of codes per chunk. Routes repeat the same
+strings (route, direction, timepoints...) so this is much smaller than
+pickling ``Bus`` objects, and the parent only has to look codes up to
+rebuild the buses::
+
+    bodies = [b''.join(http_body(route)) for route in routes]
+    with BusBatchParser() as parser:
+        buses = parser.parse(bodies)
+
+Give raw response bodies (``bytes``/``str``) where you can; already
+decoded payload lists work too but have to be pickled to the workers.
+
+Rebuilding ``Bus`` objects still happens in the calling process, which
+limits how far ``parse()`` scales with more workers. ``columns()`` builds
+NumPy ``BusColumns`` in the workers instead, so the parent only
+concatenates arrays.
+"""
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from sys import intern
+
+from martapy.bus import Bus, Buses
+
+#: ``Bus`` slots in transfer order; ``_msg_time`` is the parsed timestamp
+FIELDS = ('adherence', 'block_abbr', 'block_id', 'direction', 'latitude',
+          'longitude', 'route', 'stop_id', 'timepoint', 'trip_id', 'vehicle',
+          '_msg_time_raw', '_msg_time')
+
+
+def encode_chunk(payloads):
+    """Parse and validate *payloads* and dictionary-encode the buses.
+
+    Runs in the worker processes.
+
+    :param payloads: List of JSON arrays of bus dicts, each either raw
+        (``bytes``/``str``) or already decoded
+    :return: ``(values, codes)``: distinct field values (``values[0]`` is
+        ``None``) and ``len(FIELDS)`` codes per bus as ``bytes``
+    """
+    codes = {None: 0}
+    values = [None]
+    encoded = array('I')
+    for payload in payloads:
+        if isinstance(payload, (bytes, bytearray, str)):
+            payload = json.loads(payload)
+        for bus in map(Bus.from_json, payload):
+            for field in FIELDS:
+                value = getattr(bus, field)
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(values)
+                    values.append(value)
+                encoded.append(code)
+    return values, encoded.tobytes()
+
+
+def decode_chunk(values, codes):
+    """Rebuild the buses of one ``encode_chunk`` result
+
+    :return: list of ``Bus``
+    """
+    values = [intern(v) if type(v) is str else v for v in values]
+    fields = map(values.__getitem__, array('I', codes))
+    new = Bus.__new__
+    # Buses are read-only, so their slots are filled through the slot
+    # descriptors directly
+    slots = [getattr(Bus, name).__set__ for name in FIELDS]
+    set_json = Bus._json.__set__
+    buses = []
+    append = buses.append
+    for row in zip(*[fields] * len(FIELDS)):
+        bus = new(Bus)
+        for set_, value in zip(slots, row):
+            set_(bus, value)
+        set_json(bus, None)
+        append(bus)
+    return buses
+
+
+def columns_chunk(payloads):
+    """``BusColumns`` of every bus in *payloads* (runs in the workers)"""
+    from martapy.columnar import BusColumns
+    return BusColumns.concat(
+        BusColumns.from_json(json.loads(p) if isinstance(
+            p, (bytes, bytearray, str)) else p)
+        for p in payloads)
+
+
+def _chunks(payloads, count):
+    """Split *payloads* into *count* runs of about equal total size,
+    keeping their order"""
+    sizes = [len(p) for p in payloads]
+    target = sum(sizes) / count
+    chunk, size = [], 0
+    for payload, n in zip(payloads, sizes):
+        chunk.append(payload)
+        size += n
+        if size >= target:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+class BusBatchParser:
+    """Reusable process pool for parsing batches of bus payloads"""
+    def __init__(self, processes=None, chunks_per_process=4):
+        """
+        :param processes: Worker processes (defaults to the CPU count)
+        :param chunks_per_process: How many chunks each batch is split
+            into per worker; more evens out uneven routes, fewer means less
+            overhead per chunk
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.chunks_per_process = chunks_per_process
+        self._executor = None
+
+    def parse(self, payloads):
+        """Parse every payload into one merged ``Buses``, in input order
+
+        :param payloads: Iterable of bus payloads (raw JSON ``bytes``/``str``
+            or decoded lists), e.g. one per route
+        :return: ``martapy.bus.Buses``
+        :raises KeyError: If a bus has an unexpected field
+        :raises ValueError: If a payload isn't valid JSON or a timestamp
+            can't be parsed
+        """
+        buses = []
+        for values, codes in self._map(encode_chunk, payloads):
+            buses.extend(decode_chunk(values, codes))
+        return Buses(buses)
+
+    def columns(self, payloads):
+        """Like ``parse()``, but build columns in the workers and return
+        them concatenated. Requires NumPy.
+
+        :return: ``martapy.columnar.BusColumns``
+        """
+        from martapy.columnar import BusColumns
+        return BusColumns.concat(self._map(columns_chunk, payloads))
+
+    def _map(self, fn, payloads):
+        """Results of *fn* over chunks of *payloads*, in order"""
+        payloads = list(payloads)
+        if not payloads:
+            return [fn([])]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes)
+        count = min(len(payloads), self.processes * self.chunks_per_process)
+        return self._executor.map(fn, _chunks(payloads, count))
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_buses(payloads, processes=None):
+    """Parse *payloads* on a one-off ``BusBatchParser``
+
+    Starting worker processes takes a while, so keep a ``BusBatchParser``
+    around when parsing repeatedly.
+
+    :return: ``martapy.bus.Buses``
+    """
+    with BusBatchParser(processes) as parser:
+        return parser.parse(payloads)
@@ -0,0 +1,199 @@
+"""Background polling with fan-out to many subscribers.
+
+A ``Poller`` owns one fetch loop on a daemon thread. Each result is
+parsed once and handed to every subscriber, either through callbacks or
+through ``async for`` over ``Poller.updates()``::
+
+    poller = Poller.rail(RailClient(api_key), interval=10)
+    poller.subscribe(lambda arrivals: print(len(arrivals)))
+    poller.start()
+"""
+import asyncio
+import random
+import threading
+from warnings import warn
+
+
+class Subscription:
+    """Handle returned by ``Poller.subscribe``"""
+    def __init__(self, poller, callback, on_error):
+        self.poller = poller
+        self.callback = callback
+        self.on_error = on_error
+
+    def cancel(self):
+        """Stop receiving updates"""
+        self.poller._unsubscribe(self)
+
+
+class Poller:
+    """Polls *fetch* on a background thread and publishes results"""
+    def __init__(self, fetch, interval=10, jitter=0.1, max_interval=60,
+                 backoff=2.0, adaptive=True, name=None):
+        """
+        :param fetch: Callable returning a fresh result, such as
+            ``RailClient.arrivals``
+        :param interval: Seconds between polls
+        :param jitter: Random fraction (+/-) applied to every wait so many
+            pollers don't fire in lockstep
+        :param max_interval: Longest wait after errors or unchanged results
+        :param backoff: Wait multiplier for each consecutive error
+        :param adaptive: Stretch the wait while *fetch* keeps returning
+            the same object (e.g. a *304* served by the transport)
+        :param name: Name for the polling thread
+        """
+        self.fetch = fetch
+        self.interval = interval
+        self.jitter = jitter
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self.name = name
+        #: Most recent result (``None`` before the first successful poll)
+        self.latest = None
+        #: Most recent error, cleared by the next successful poll
+        self.error = None
+        #: Number of consecutive failed polls
+        self.errors = 0
+        self._idle = interval
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def rail(cls, client, **kwargs):
+        """Poller for ``RailClient.arrivals()``"""
+        return cls(client.arrivals, name='martapy-rail', **kwargs)
+
+    @classmethod
+    def buses(cls, client, route=None, **kwargs):
+        """Poller for ``BusClient.buses()`` (all buses, or one *route*)"""
+        name = 'martapy-bus-{}'.format(route or 'all')
+        return cls(lambda: client.buses(route=route), name=name, **kwargs)
+
+    def subscribe(self, callback, on_error=None):
+        """Call *callback(result)* after every successful poll, and
+        *on_error(exception)* after every failed one.
+
+        Callbacks run on the polling thread, so they should be quick. An
+        exception raised by a callback is reported as a warning and doesn't
+        affect other subscribers or the polling.
+
+        :return: ``Subscription``
+        """
+        subscription = Subscription(self, callback, on_error)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    async def updates(self):
+        """Async iterator of results, for use on an event loop::
+
+            async for arrivals in poller.updates():
+                ...
+
+        Only the latest result is buffered; a slow consumer skips
+        intermediate ones rather than falling behind.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+
+        def put(result):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(result)
+
+        subscription = self.subscribe(
+            lambda result: loop.call_soon_threadsafe(put, result))
+        try:
+            if self.latest is not None:
+                yield self.latest
+            while True:
+                yield await queue.get()
+        finally:
+            subscription.cancel()
+
+    def poll(self):
+        """Fetch and publish once on the calling thread
+
+        :return: Seconds to wait before the next poll
+        """
+        previous = self.latest
+        try:
+            result = self.fetch()
+        except Exception as e:
+            self.error = e
+            self.errors += 1
+            self._publish(e, error=True)
+            return min(self.max_interval,
+                       self.interval * self.backoff ** self.errors)
+        self.error = None
+        self.errors = 0
+        unchanged = result is previous
+        self.latest = result
+        if unchanged and self.adaptive:
+            self._idle = min(self.max_interval, self._idle * 1.5)
+            return self._idle
+        self._idle = self.interval
+        if not unchanged:
+            self._publish(result)
+        return self.interval
+
+    def _publish(self, value, error=False):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for s in subscriptions:
+            callback = s.on_error if error else s.callback
+            if callback is None:
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                warn("Poller subscriber {!r} raised {!r}".format(callback, e),
+                     RuntimeWarning)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.poll()
+            except Exception as e:
+                # Never let the loop die; retry after the usual backoff
+                self.error = e
+                self.errors += 1
+                delay = min(self.max_interval,
+                            self.interval * self.backoff ** self.errors)
+            if self.jitter:
+                delay *= 1 + random.uniform(-self.jitter, self.jitter)
+            self._stop.wait(delay)
+
+    def start(self):
+        """Start polling on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop polling and wait up to *timeout* seconds for the thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,350 @@
+"""Predicate queries over ``Buses`` and ``Arrivals`` in a single pass
+
+Criteria are keyword arguments in the form ``field__lookup=value``::
+
+    buses.where(adherence__lt=-5, route__in={'110', '39'})
+    buses.where(msg_time__within=60)
+    arrivals.where(line='RED', waiting_seconds__range=(0, 300))
+
+Each distinct combination of fields and lookups is compiled once into a
+Python function that tests every criterion inline and scans the records
+once. Values are passed in when the function is called, so it's reused
+whatever they are. Bus fields the API reports as strings are compared by
+value: ``adherence`` as an ``int``, ``latitude``/``longitude`` as
+``float``.
+
+Range lookups on a field that a snapshot has been queried on before use
+a sorted index of that field, built on the second such query and kept
+with the snapshot, instead of a scan.
+
+Lookups:
+
+- ``exact`` (the default), ``ne``
+- ``lt``, ``lte``, ``gt``, ``gte``, ``range`` (inclusive ``(low, high)``)
+- ``in`` (any iterable of values)
+- ``contains`` (substring; text fields only)
+- ``isnull`` (``True``/``False``; empty strings count as null)
+- ``within`` (seconds, or a ``timedelta``): a timestamp no more than this
+  much older than the newest one in the collection, i.e. "in the last N
+  seconds" of the feed
+"""
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from functools import lru_cache
+
+from martapy._util import parse_clock, parse_timestamp
+
+LOOKUPS = ('exact', 'ne', 'lt', 'lte', 'gt', 'gte', 'range', 'in',
+           'contains', 'isnull', 'within')
+#: Lookups that select a range of sorted values
+RANGE_LOOKUPS = ('lt', 'lte', 'gt', 'gte', 'range')
+
+_TESTS = {
+    'exact': 'x != {v}',
+    'ne': 'x == {v}',
+    'lt': 'x is None or not x < {v}',
+    'lte': 'x is None or not x <= {v}',
+    'gt': 'x is None or not x > {v}',
+    'gte': 'x is None or not x >= {v}',
+    'range': 'x is None or not {v}[0] <= x <= {v}[1]',
+    'in': 'x not in {v}',
+    'contains': 'x is None or {v} not in x',
+    'isnull': '(x is None or x == \'\') is not {v}',
+}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+#: Builtin each record conversion inlines in compiled scans
+_BUILTINS = {'_int': 'int', '_float': 'float'}
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    return value
+
+
+def _clock(value):
+    if isinstance(value, str):
+        return parse_clock(value)
+    return value
+
+
+class Fields:
+    """The queryable fields of one record type"""
+    def __init__(self, name, fields, record=None, value=None,
+                 timestamps=()):
+        """
+        :param name: Record type name, ex: *Bus*
+        :param fields: Attribute names
+        :param record: dict of field to the name of a module-level function
+            converting record values before comparing them
+        :param value: dict of field to a function converting query values
+            (defaults to ``str`` for numbers given for text fields)
+        :param timestamps: Fields ``within`` applies to
+        """
+        self.name = name
+        self.fields = tuple(fields)
+        self.record = record or {}
+        self.value = dict((f, _text) for f in fields)
+        self.value.update(value or {})
+        self.timestamps = tuple(timestamps)
+        #: Fields compared as strings, which ``contains`` applies to
+        self.text = tuple(f for f in self.fields if self.value[f] is _text
+                          and f not in self.record)
+
+
+BUS_FIELDS = Fields(
+    'Bus',
+    ('adherence', 'block_id', 'block_abbr', 'direction', 'latitude',
+     'longitude', 'msg_time', 'route', 'stop_id', 'timepoint', 'trip_id',
+     'vehicle'),
+    record={'adherence': '_int', 'latitude': '_float',
+            'longitude': '_float'},
+    value={'adherence': _int, 'latitude': _float, 'longitude': _float,
+           'msg_time': _timestamp},
+    timestamps=('msg_time',))
+
+ARRIVAL_FIELDS = Fields(
+    'Arrival',
+    ('destination', 'direction', 'event_time', 'line', 'next_arr',
+     'station', 'train_id', 'waiting_seconds', 'waiting_time'),
+    value={'waiting_seconds': _int, 'event_time': _timestamp,
+           'next_arr': _clock},
+    timestamps=('event_time',))
+
+
+def parse(fields, criteria):
+    """Split ``field__lookup`` criteria and convert their values
+
+    :param fields: ``Fields`` of the records being queried
+    :param criteria: dict of ``field__lookup`` (or ``field``) to value
+    :return: list of ``(field, lookup, value)``
+    :raises KeyError: For an unknown field
+    :raises ValueError: For an unknown lookup or a malformed value
+    """
+    parsed = []
+    for key, value in criteria.items():
+        field, _, lookup = key.partition('__')
+        lookup = lookup or 'exact'
+        if field not in fields.fields:
+            raise KeyError("'{}' is not a {} field. Expected one of: {}"
+                           .format(field, fields.name,
+                                   ','.join(fields.fields)))
+        if lookup not in LOOKUPS:
+            raise ValueError("Unknown lookup '{}'. Expected one of: {}"
+                             .format(lookup, ','.join(LOOKUPS)))
+        convert = fields.value[field]
+        if lookup == 'within':
+            if field not in fields.timestamps:
+                raise ValueError("'within' only applies to {}"
+                                 .format(','.join(fields.timestamps)))
+            if not isinstance(value, timedelta):
+                value = timedelta(seconds=value)
+        elif lookup == 'in':
+            value = [convert(v) for v in value]
+            try:
+                value = frozenset(value)
+            except TypeError:
+                value = tuple(value)
+        elif lookup == 'range':
+            low, high = value
+            value = (convert(low), convert(high))
+        elif lookup == 'isnull':
+            value = bool(value)
+        elif lookup == 'contains':
+            if field not in fields.text:
+                raise ValueError("'contains' only applies to {}"
+                                 .format(','.join(fields.text)))
+            value = convert(value)
+        else:
+            value = convert(value)
+        parsed.append((field, lookup, value))
+    return parsed
+
+
+@lru_cache(maxsize=256)
+def compile_scan(fields, spec):
+    """Compile a function that scans records once, testing every criterion
+
+    Criteria on fields that need no conversion are tested first, so the
+    conversions only run for records that pass them.
+
+    :param fields: ``Fields`` of the records
+    :param spec: Tuple of ``(field, lookup)``; ``within`` must already be
+        turned into ``gte``
+    :return: ``scan(records, values)`` returning the matching records as a
+        list, where *values* lines up with *spec*
+    """
+    lines = ['def scan(records, values):',
+             '    found = []',
+             '    append = found.append']
+    lines += ['    v{} = values[{}]'.format(i, i) for i in range(len(spec))]
+    lines.append('    for r in records:')
+    order = sorted(range(len(spec)),
+                   key=lambda i: spec[i][0] in fields.record)
+    for i in order:
+        field, lookup = spec[i]
+        convert = fields.record.get(field)
+        if convert:
+            lines += ['        try:',
+                      '            x = {}(r.{})'.format(
+                          _BUILTINS[convert], field),
+                      '        except (TypeError, ValueError):',
+                      '            x = None']
+        else:
+            lines.append('        x = r.{}'.format(field))
+        lines.append('        if {}:'.format(_TESTS[lookup].format(
+            v='v{}'.format(i))))
+        lines.append('            continue')
+    lines.append('        append(r)')
+    lines.append('    return found')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['scan']
+
+
+def _resolve_within(criteria, newest):
+    """Turn ``within`` criteria into ``gte`` relative to the newest value"""
+    resolved = []
+    for field, lookup, value in criteria:
+        if lookup == 'within':
+            latest = newest(field)
+            if latest is None:
+                # Nothing has a timestamp, so nothing can match
+                lookup, value = 'exact', object()
+            else:
+                lookup, value = 'gte', latest - value
+        resolved.append((field, lookup, value))
+    return resolved
+
+
+def newest_values(records, cache=None):
+    """Function giving the newest value of a timestamp field in *records*,
+    read from a sorted index in *cache* when one has been built"""
+    indexes = (cache or {}).get('indexes', {})
+
+    def newest(field):
+        found = indexes.get(field)
+        if found is not None:
+            return found.newest()
+        return max((t for t in (getattr(r, field) for r in records)
+                    if t is not None), default=None)
+    return newest
+
+
+def scan(records, fields, criteria, newest=None):
+    """Records matching every criterion, in their original order
+
+    :param records: Sequence of ``Bus`` or ``Arrival``
+    :param fields: ``BUS_FIELDS`` or ``ARRIVAL_FIELDS``
+    :param criteria: Output of ``parse()``
+    :param newest: Optional callable giving the newest value of a
+        timestamp field (defaults to scanning *records*)
+    :return: list
+    """
+    if newest is None:
+        newest = newest_values(records)
+    criteria = _resolve_within(criteria, newest)
+    spec = tuple((f, lookup) for (f, lookup, _) in criteria)
+    values = tuple(v for (_, _, v) in criteria)
+    return compile_scan(fields, spec)(records, values)
+
+
+class SortedIndex:
+    """Positions of records sorted by one field's (converted) value;
+    records where it's missing are left out"""
+    def __init__(self, records, fields, field):
+        convert = {'_int': _int, '_float': _float}.get(
+            fields.record.get(field))
+        pairs = []
+        for i, r in enumerate(records):
+            value = getattr(r, field)
+            if convert is not None:
+                value = convert(value)
+            if value is not None:
+                pairs.append((value, i))
+        pairs.sort(key=lambda p: p[0])
+        self.values = [v for (v, _) in pairs]
+        self.positions = [i for (_, i) in pairs]
+
+    def newest(self):
+        return self.values[-1] if self.values else None
+
+    def bounds(self, lookup, value):
+        """Slice of ``positions`` matching a range lookup"""
+        values = self.values
+        if lookup == 'lt':
+            return 0, bisect_left(values, value)
+        if lookup == 'lte':
+            return 0, bisect_right(values, value)
+        if lookup == 'gt':
+            return bisect_right(values, value), len(values)
+        if lookup == 'gte':
+            return bisect_left(values, value), len(values)
+        return bisect_left(values, value[0]), bisect_right(values, value[1])
+
+
+def run(records, fields, criteria, cache=None, newest=None):
+    """Records matching *criteria*, in their original order, using and
+    maintaining the sorted indexes kept in *cache*
+
+    :param records: Sequence of ``Bus`` or ``Arrival`` (a snapshot)
+    :param fields: ``BUS_FIELDS`` or ``ARRIVAL_FIELDS``
+    :param criteria: Output of ``parse()``
+    :param cache: dict kept with the snapshot between queries, or ``None``
+        to always scan
+    :param newest: Optional callable giving the newest value of a
+        timestamp field, for when *records* is only part of the snapshot
+        that ``within`` should be relative to (see ``newest_values()``)
+    :return: list
+    """
+    if cache is None:
+        return scan(records, fields, criteria, newest)
+    indexes = cache.setdefault('indexes', {})
+    queried = cache.setdefault('queried', set())
+
+    def index(field):
+        found = indexes.get(field)
+        if found is None and field in queried:
+            found = indexes[field] = SortedIndex(records, fields, field)
+        return found
+
+    if newest is None:
+        newest = newest_values(records, cache)
+    criteria = _resolve_within(criteria, newest)
+    best = None
+    for i, (field, lookup, value) in enumerate(criteria):
+        if lookup not in RANGE_LOOKUPS:
+            continue
+        found = index(field)
+        queried.add(field)
+        if found is not None:
+            start, stop = found.bounds(lookup, value)
+            if best is None or stop - start < best[0]:
+                best = (stop - start, i, found.positions[start:stop])
+    if best is None:
+        return scan(records, fields, criteria, newest)
+    _, i, positions = best
+    positions.sort()
+    return scan([records[p] for p in positions], fields,
+                criteria[:i] + criteria[i + 1:], newest)
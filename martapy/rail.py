@@ -6,52 +6,14 @@ More info: http://www.itsmarta.com/app-developer-resources.aspx
 """
 
 import json
-import requests
-from datetime import datetime
+from time import perf_counter
 from warnings import warn
 from collections import OrderedDict, defaultdict
-
-
-station_list = [
-    'AIRPORT STATION',
-    'ARTS CENTER STATION',
-    'ASHBY STATION',
-    'AVONDALE STATION',
-    'BANKHEAD STATION',
-    'BROOKHAVEN STATION',
-    'BUCKHEAD STATION',
-    'CHAMBLEE STATION',
-    'CIVIC CENTER STATION',
-    'COLLEGE PARK STATION',
-    'DECATUR STATION',
-    'DORAVILLE STATION',
-    'DUNWOODY STATION',
-    'EAST LAKE STATION',
-    'EAST POINT STATION',
-    'EDGEWOOD CANDLER PARK STATION',
-    'FIVE POINTS STATION',
-    'GARNETT STATION',
-    'GEORGIA STATE STATION',
-    'HAMILTON E HOLMES STATION',
-    'INDIAN CREEK STATION',
-    'INMAN PARK STATION',
-    'KENSINGTON STATION',
-    'KING MEMORIAL STATION',
-    'LAKEWOOD STATION',
-    'LENOX STATION',
-    'LINDBERGH STATION',
-    'MEDICAL CENTER STATION',
-    'MIDTOWN STATION',
-    'NORTH AVE STATION',
-    'NORTH SPRINGS STATION',
-    'OAKLAND CITY STATION',
-    'OMNI DOME STATION',
-    'PEACHTREE CENTER STATION',
-    'SANDY SPRINGS STATION',
-    'VINE CITY STATION',
-    'WEST END STATION',
-    'WEST LAKE STATION'
- ]
+from martapy import instrument
+from martapy._util import (FrozenList, FrozenRecord, intern_str,
+                           parse_clock, parse_timestamp, rehost)
+from martapy.stations import known_stations, resolver, station_list
+from martapy.transport import default_transport
 
 
 class RailClient:
@@ -77,24 +39,35 @@ class RailClient:
     base_url = "http://developer.itsmarta.com/RealtimeTrain" \
                "/RestServiceNextTrain/GetRealtimeArrivals?apikey={api_key}"
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, transport=None, host=None):
         """Initialize client
 
         :param api_key: MARTA API key
         :type api_key: str
+        :param transport: ``martapy.transport.HTTPTransport`` to fetch
+            with. Defaults to one shared by all clients.
+        :param host: Send requests to this scheme and host (ex:
+            *http://localhost:8000*, a ``martapy.simulator.Simulator``)
+            instead of developer.itsmarta.com
         """
         self.api_key = api_key
+        if host:
+            self.base_url = rehost(self.base_url, host)
+        self.transport = transport or default_transport()
         self._trains = None
 
-    def arrivals(self):
+    def arrivals(self, lazy=False):
         """Retrieves and returns current arrivals as ``Arrivals(list)``
-            
+
+        :param lazy: Return a ``martapy.lazy.LazyArrivals`` that only
+            builds the arrivals that are read
         :return: A list of current train arrivals (events)
         :rtype: ``martapy.rail.Arrivals(list)``
         """
-        arrivals = requests.get(self.url).json()
-        # Copy each dict to a new one with lowercase keys to pass to Arrival()
-        return Arrivals(arrivals)
+        if lazy:
+            from martapy.lazy import LazyArrivals
+            return self.transport.get(self.url, LazyArrivals)
+        return self.transport.get(self.url, Arrivals)
 
     @property
     def url(self):
@@ -102,33 +75,29 @@ class RailClient:
         return self.base_url.format(api_key=self.api_key)
 
 
-class Arrivals(list):
-    """A list of ``Arrival`` objects returned from the API"""
-    def __init__(self, arrivals):
-        """
-        :param arrivals: List of ``Arrival`` objects
-        :type arrivals: ``martapy.rail.Arrival``
-        """
-        self._arrivals = None
-        self.arrivals = arrivals
-        super().__init__(self._arrivals)
+def check_stations(station_names):
+    """Check station names against the known stations. Raises a warning
+    the first time any process-wide unknown station is seen and registers
+    it with ``martapy.stations.resolver`` so that ``by_station`` can find it.
+
+    :param station_names: Iterable of (distinct) station names
+    :raises Warning: If a station name is found that isn't in
+        ``martapy.stations.station_list`` (once per station)
+    :return: Sorted tuple of the unknown station names
+    """
+    found = tuple(sorted(s for s in station_names if s not in known_stations))
+    for s in found:
+        if resolver.add(s):
+            msg = ("Received station '{}' which wasn't found in the known "
+                   "stations list. New station?").format(s)
+            warn(msg)
+    return found
 
-    @property
-    def arrivals(self):
-        """All ``Arrival`` objects"""
-        return self._arrivals
-
-    @arrivals.setter
-    def arrivals(self, arrivals):
-        # Transforms JSON objects to a list of ``Arrival`` objects
-        arrival_list = []
-        for arrival in arrivals:
-            a = Arrival(**dict((k.lower(), v) for (k, v) in arrival.items()))
-            a.json = arrival
-            arrival_list.append(a)
-        self._arrivals = arrival_list
-        self._arrivals.sort(key=lambda ar: ar.next_arr)
-        self.__new_station()
+
+class _ArrivalFilters:
+    """Filters and groupings shared by ``Arrivals`` and
+    ``martapy.lazy.LazyArrivals``, built on their ``_filter()`` and
+    ``_grouped()``"""
 
     # Line filters
 
@@ -194,29 +163,30 @@ class Arrivals(list):
     @property
     def trains(self):
         """Arrivals grouped by train ID
+
+        Built once per ``Arrivals`` instance and cached, so treat the
+        result as read-only.
         
         :return: *OrderedDict*, train IDs as keys and each train's 
             associated arrivals as lists
         """
-        trains = defaultdict(list)
-        for a in self._arrivals:
-            trains[a.train_id].append(a)
-        # Sort by arrival time
-        for train_events in trains.values():
-            train_events.sort(key=lambda x: x.next_arr)
-        return OrderedDict(sorted(trains.items()))
+        if self._trains is None:
+            self._trains = self._grouped('train_id')
+        return self._trains
 
     @property
     def stations(self):
         """Arrivals grouped by station name
+
+        Built once per ``Arrivals`` instance and cached, so treat the
+        result as read-only.
         
         :return: *OrderedDict* with station names as keys and associated 
             arrivals as values
         """
-        station_arrivals = defaultdict(list)
-        for a in self._arrivals:
-            station_arrivals[a.station].append(a)
-        return OrderedDict(sorted(station_arrivals.items()))
+        if self._stations is None:
+            self._stations = self._grouped('station')
+        return self._stations
 
     def by_station(self, station_name):
         """Filter arrivals by station.
@@ -225,34 +195,222 @@ class Arrivals(list):
             Ex: *LENOX*
         :type station_name: str
         :return: List of arrivals for this station
+        :raises Warning: If the name matches no station, or more than one
+            (see ``martapy.stations.StationResolver.resolve``)
         """
-        station_name = station_name.upper()
         found_station = None
-        for s in station_list:
-            if station_name in s:
-                found_station = s
-                break
-        if not found_station:
+        try:
+            found_station = resolver.resolve(station_name)
+        except KeyError:
             msg = "'{}' not found in station list.".format(station_name)
             warn(msg)
+        except ValueError as e:
+            warn(str(e))
         return self._filter('station', found_station)
 
+
+class Arrivals(_ArrivalFilters, FrozenList):
+    """An immutable snapshot of ``Arrival`` objects returned from the API
+
+    List methods that would change the snapshot raise ``TypeError``, so an
+    ``Arrivals`` (and the indexes and groupings it caches) can be shared
+    between threads without locking.
+    """
+    #: Attributes covered by ``Arrivals.index``
+    indexed_attributes = ('line', 'direction', 'station', 'train_id',
+                          'waiting_time')
+
+    def __init__(self, arrivals):
+        """
+        :param arrivals: List of arrival dicts from the API, or of
+            already-built ``Arrival`` objects (which are reused as-is)
+        :type arrivals: ``dict`` or ``martapy.rail.Arrival``
+        """
+        hook = instrument.hook
+        if hook is not None:
+            arrival_list = self.__parse_timed(arrivals, hook)
+        else:
+            arrival_list = self.__parse(arrivals)
+            arrival_list.sort(key=lambda ar: ar.next_arr)
+        super().__init__(arrival_list)
+        self._index = {}
+        self._query_cache = {}
+        self._trains = None
+        self._stations = None
+        if hook is not None:
+            start = perf_counter()
+            self.new_stations = self.__new_station()
+            hook.timing('station_check', perf_counter() - start, kind='rail')
+        else:
+            self.new_stations = self.__new_station()
+
+    @classmethod
+    def _view(cls, arrivals, new_stations=()):
+        """Build an ``Arrivals`` around existing, already-sorted ``Arrival``
+        objects without parsing, sorting or checking station names again.
+
+        :param arrivals: List of ``Arrival`` objects, sorted by ``next_arr``
+        :type arrivals: list
+        :param new_stations: ``Arrivals.new_stations`` for the view
+        :return: ``martapy.rail.Arrivals`` sharing the given objects
+        """
+        view = cls.__new__(cls)
+        list.__init__(view, arrivals)
+        view._index = {}
+        view._query_cache = {}
+        view._trains = None
+        view._stations = None
+        view.new_stations = new_stations
+        return view
+
+    def __reduce__(self):
+        return Arrivals._view, (list(self), self.new_stations)
+
+    @property
+    def arrivals(self):
+        """All ``Arrival`` objects (this snapshot itself)"""
+        return self
+
+    @staticmethod
+    def __parse(arrivals, timings=None):
+        """Transforms JSON objects to a list of ``Arrival`` objects"""
+        return [a if isinstance(a, Arrival) else Arrival.from_json(a, timings)
+                for a in arrivals]
+
+    @staticmethod
+    def __parse_timed(arrivals, hook):
+        """Same as the parsing in ``__init__``, reporting each stage to
+        *hook*"""
+        cache_before = instrument.timestamp_cache_stats()
+        timings = {'validate': 0.0, 'timestamp': 0.0}
+        start = perf_counter()
+        arrival_list = Arrivals.__parse(arrivals, timings)
+        hook.timing('parse', perf_counter() - start, kind='rail')
+        for stage, seconds in timings.items():
+            hook.timing(stage, seconds, kind='rail')
+        hook.count('records', len(arrival_list), kind='rail')
+        instrument.count_timestamp_cache(cache_before, 'rail')
+        start = perf_counter()
+        arrival_list.sort(key=lambda ar: ar.next_arr)
+        hook.timing('sort', perf_counter() - start, kind='rail')
+        return arrival_list
+
+    @property
+    def index(self):
+        """Positions of arrivals keyed by attribute, then by value.
+
+        Covers ``Arrivals.indexed_attributes``. Each attribute's index is
+        built on first use, then reused for the lifetime of this snapshot.
+        Positions refer to this snapshot, which is sorted by
+        ``next_arr``, and are in ascending order.
+
+        :return: *dict* like ``{'line': {'RED': (0, 3)}, ...}``
+        """
+        return dict((attr, self._attribute_index(attr))
+                    for attr in self.indexed_attributes)
+
+    def query(self, **criteria):
+        """Filter on several indexed attributes at once, e.g.
+        ``query(line='RED', direction='N', station='FIVE POINTS STATION')``
+
+        The most selective criterion is looked up in ``Arrivals.index`` and
+        only its matches are checked against the others.
+
+        :param criteria: Attribute/value pairs; attributes must be in
+            ``Arrivals.indexed_attributes``
+        :return: ``martapy.rail.Arrivals`` containing matching arrivals
+        :raises KeyError: If an attribute isn't indexed
+        """
+        hook = instrument.hook
+        if hook is not None:
+            start = perf_counter()
+        if not criteria:
+            return Arrivals._view(list(self))
+        matches = sorted((len(p), k) for (k, p) in
+                         ((k, self._positions(k, v))
+                          for (k, v) in criteria.items()))
+        arrivals = self
+        found = [arrivals[i] for i in
+                 self._positions(matches[0][1], criteria[matches[0][1]])]
+        for _, attr in matches[1:]:
+            value = criteria[attr]
+            found = [a for a in found if getattr(a, attr) == value]
+        if hook is not None:
+            hook.timing('filter', perf_counter() - start, kind='rail')
+        return Arrivals._view(found)
+
+    def where(self, **criteria):
+        """Arrivals matching every ``field__lookup=value`` criterion, e.g.
+        ``where(line='RED', waiting_seconds__lte=300)`` (see
+        ``martapy.query``)
+
+        Exact criteria on ``Arrivals.indexed_attributes`` are looked up in
+        ``Arrivals.index`` first; the rest are tested in one pass over the
+        arrivals that leaves.
+
+        :return: ``martapy.rail.Arrivals``
+        :raises KeyError: For an unknown field
+        :raises ValueError: For an unknown lookup
+        """
+        from martapy import query
+        hook = instrument.hook
+        if hook is not None:
+            start = perf_counter()
+        criteria = query.parse(query.ARRIVAL_FIELDS, criteria)
+        indexed = [(len(self._positions(f, v)), i) for (i, (f, lookup, v))
+                   in enumerate(criteria) if lookup == 'exact'
+                   and f in self.indexed_attributes]
+        if indexed:
+            i = min(indexed)[1]
+            field, _, value = criteria.pop(i)
+            candidates = [self[p] for p in self._positions(field, value)]
+            # 'within' is relative to the newest time in the whole
+            # snapshot, not in the candidates the index narrows it to
+            found = query.run(candidates, query.ARRIVAL_FIELDS, criteria,
+                              newest=query.newest_values(
+                                  self, self._query_cache))
+        else:
+            found = query.run(self, query.ARRIVAL_FIELDS, criteria,
+                              self._query_cache)
+        if hook is not None:
+            hook.timing('filter', perf_counter() - start, kind='rail')
+        return Arrivals._view(found)
+
+    def _positions(self, attribute_name, value):
+        """Indexed positions of arrivals whose *attribute_name* is *value*"""
+        if attribute_name not in self.indexed_attributes:
+            raise KeyError("'{}' is not an indexed attribute. Expected one "
+                           "of: {}".format(attribute_name,
+                                           ','.join(self.indexed_attributes)))
+        return self._attribute_index(attribute_name).get(value, ())
+
+    def _attribute_index(self, attribute_name):
+        """Value to positions for one attribute, built on first use"""
+        index = self._index.get(attribute_name)
+        if index is None:
+            positions = defaultdict(list)
+            for i, a in enumerate(self):
+                positions[getattr(a, attribute_name)].append(i)
+            index = dict((v, tuple(p)) for (v, p) in positions.items())
+            self._index[attribute_name] = index
+        return index
+
+    def _grouped(self, attribute_name):
+        """*OrderedDict* of indexed value to arrivals, sorted by value"""
+        values = self._attribute_index(attribute_name)
+        # Positions ascend with next_arr, so each group is already sorted
+        return OrderedDict(
+            (v, [self[i] for i in values[v]])
+            for v in sorted(values)
+        )
+
     def __new_station(self):
-        """Iterate through arrivals, checking for any station names that aren't
-        in the known list. Raises warnings for any that aren't found and
-        adds them to the list.
+        """Check this snapshot's station names against the known stations
+        (see ``check_stations()``)
 
-        :raises Warning: If a station name is found that isn't in
-            ``martapy.rail.station_list``
-        :return:
+        :return: Sorted tuple of this snapshot's unknown station names
         """
-        station_names = list(self.stations.keys())
-        for s in station_names:
-            if s not in station_list:
-                station_list.append(s)
-                msg = ("Received station '{}' which wasn't found in the known "
-                       "stations list. New station?").format(s)
-                warn(msg)
+        return check_stations(set(a.station for a in self))
 
     def _filter(self, attribute_name, value):
         """Filter Arrivals based on a key/value pair.
@@ -263,17 +421,37 @@ class Arrivals(list):
         :param value: Value to look for (such as *RED* for line)
         :type value: str
         :return: ``martapy.rail.Arrivals`` containing matching arrivals
+            (the same ``Arrival`` objects, not copies)
         """
+        if attribute_name in self.indexed_attributes:
+            return self.query(**{attribute_name: value})
+        hook = instrument.hook
+        if hook is not None:
+            start = perf_counter()
         filtered = [
-            json.loads(a.json) for a in self.arrivals
+            a for a in self.arrivals
             if getattr(a, attribute_name) == value
         ]
-        return Arrivals(filtered)
+        if hook is not None:
+            hook.timing('filter', perf_counter() - start, kind='rail')
+        return Arrivals._view(filtered)
 
 
-class Arrival:
+class Arrival(FrozenRecord):
+    """A single arrival event.
+
+    Uses ``__slots__`` and interned strings to keep snapshots small. The
+    original JSON isn't kept; ``Arrival.json`` rebuilds it on request.
+    Arrivals are read-only once built, since snapshots, their views and
+    their indexes share them (across threads, too).
+    """
+    __slots__ = ('_direction', '_event_time', '_event_time_raw', '_next_arr',
+                 '_next_arr_raw', 'destination', 'line', 'station',
+                 'train_id', 'waiting_seconds', 'waiting_time')
+
     def __init__(self, station, line, destination, direction, next_arr,
-                 waiting_time, waiting_seconds, event_time, train_id):
+                 waiting_time, waiting_seconds, event_time, train_id, *,
+                 _parsed=None):
         """Arrival event
 
         :param station: Station name (uppercase)
@@ -286,62 +464,76 @@ class Arrival:
         :param waiting_seconds: Example: '-45'
         :param event_time: Timestamp as MM/DD/YYYY H:MM:SS AM/PM
         :param train_id: Train ID
+        :param _parsed: *event_time* and *next_arr* already parsed, as a
+            tuple (used by ``from_json`` when it times parsing)
+        :raises ValueError: If *direction* isn't one of N, E, W or S
         """
-        self._direction = None
-        self._event_time = None
-        self._json = None
-        self._next_arr = None
-
-        self.direction = direction
-        self.event_time = event_time
-        self.train_id = train_id
-        self.next_arr = next_arr
+        if _parsed is None:
+            _parsed = parse_timestamp(event_time), parse_clock(next_arr)
+        set_ = object.__setattr__
+        choices = ['N', 'E', 'W', 'S']
+        direction = direction.upper()
+        if direction not in choices:
+            raise ValueError("Direction must be one of: {}"
+                             .format(','.join(choices)))
+        set_(self, '_direction', intern_str(direction))
+        set_(self, '_event_time', _parsed[0])
+        set_(self, '_event_time_raw', intern_str(event_time))
+        set_(self, 'train_id', intern_str(train_id))
+        set_(self, '_next_arr', _parsed[1])
+        set_(self, '_next_arr_raw', intern_str(next_arr))
 
         #: Destination (station name sans '*STATION*')
-        self.destination = destination
+        set_(self, 'destination', intern_str(destination))
         #: *RED*, *GREEN*, *BLUE*, or *GOLD* line
-        self.line = line
+        set_(self, 'line', intern_str(line))
         #: Station name (current list: ``martapy.rail.station_list``)
-        self.station = station.upper()
-        #: Positive or negative integer (ex '*-45*' seconds)
-        self.waiting_seconds = waiting_seconds
+        set_(self, 'station', intern_str(station.upper()))
+        #: Positive or negative integer (ex *-45* seconds)
+        try:
+            waiting_seconds = int(waiting_seconds)
+        except (TypeError, ValueError):
+            pass
+        set_(self, 'waiting_seconds', waiting_seconds)
         #: *Arriving*, *Arrived*, *Boarding*, *1 min*, *2 min*...
-        self.waiting_time = waiting_time
+        set_(self, 'waiting_time', intern_str(waiting_time))
+
+    @staticmethod
+    def from_json(json_obj, timings=None):
+        """Build an ``Arrival`` from an API response dict.
+
+        :param json_obj: Arrival JSON from the MARTA API
+        :type json_obj: dict
+        :param timings: Optional dict whose ``'validate'`` and
+            ``'timestamp'`` entries the seconds spent checking keys and
+            parsing timestamps are added to (used by ``martapy.instrument``)
+        :return: ``martapy.rail.Arrival``
+        :raises KeyError: If the dict has unexpected or missing keys
+        """
+        if timings is None:
+            Arrival.__has_keys(json_obj)
+            return Arrival(**dict((k.lower(), v)
+                                  for (k, v) in json_obj.items()))
+        start = perf_counter()
+        Arrival.__has_keys(json_obj)
+        validated = perf_counter()
+        parsed = (parse_timestamp(json_obj['EVENT_TIME']),
+                  parse_clock(json_obj['NEXT_ARR']))
+        timings['timestamp'] += perf_counter() - validated
+        timings['validate'] += validated - start
+        return Arrival(_parsed=parsed, **dict((k.lower(), v)
+                                               for (k, v) in json_obj.items()))
 
     @property
     def direction(self):
         """Direction of travel as one of: *N, E, W, S*"""
         return self._direction
 
-    @direction.setter
-    def direction(self, direction):
-        """Set the direction of travel.
-        
-        :param direction: N, E, W or S
-        :type direction: str
-        :return: 
-        """
-        choices = ['N', 'E', 'W', 'S']
-        direction = direction.upper()
-        if direction not in choices:
-            raise ValueError("Direction must be one of: {}"
-                             .format(','.join(choices)))
-        else:
-            self._direction = direction
-
     @property
     def event_time(self):
         """Event timestamp. (Note: This isn't a timestamp of the API call"""
         return self._event_time
 
-    @event_time.setter
-    def event_time(self, event_time):
-        """Set the event time as *MM/DD/YYYY HH:MM:SS AM/PM*"""
-        self._event_time = datetime.strptime(
-            event_time,
-            "%m/%d/%Y %I:%M:%S %p"
-        )
-
     @property
     def next_arr(self):
         """Time of the train's next arrival as *HH:MM:SS AM/PM*"""
@@ -352,52 +544,31 @@ class Arrival:
         """Time of the train's next arrival. (Same as next_arr() property)"""
         return self.next_arr
 
-    @next_arr.setter
-    def next_arr(self, next_arr):
-        """Sets NEXT_ARR (next arrival time)
-        
-        :param next_arr: Timestamp as HH:MM:SS AM/PM
-        :type next_arr: str
-        :return: 
-        """
-        self._next_arr = datetime.strptime(next_arr, "%I:%M:%S %p").time()
-
     def __str__(self):
         """JSON string of original API response (or one imitating it)"""
         return self.json
 
+    def to_dict(self):
+        """Arrival as a dict shaped like the original API response"""
+        waiting_seconds = self.waiting_seconds
+        if isinstance(waiting_seconds, int):
+            waiting_seconds = str(waiting_seconds)
+        return {
+            'DESTINATION': self.destination,
+            'DIRECTION': self.direction,
+            'EVENT_TIME': self._event_time_raw,
+            'LINE': self.line,
+            'NEXT_ARR': self._next_arr_raw,
+            'STATION': self.station,
+            'TRAIN_ID': self.train_id,
+            'WAITING_SECONDS': waiting_seconds,
+            'WAITING_TIME': self.waiting_time
+        }
+
     @property
     def json(self):
-        """JSON string of the original API response, or one imitating it."""
-        if self._json is not None:
-            return self._json
-        # If it hasn't been set yet, create our own dict, updating keys with
-        # properties and popping keys that don't belong
-        d = dict((k.upper(), v) for (k, v) in self.__dict__.items())
-        replacement_keys = ['_DIRECTION', '_EVENT_TIME', '_NEXT_ARR']
-        for key in replacement_keys:
-            d[key.lstrip('_')] = d.pop(key)
-        if '_JSON' in d:
-            d.pop('_JSON')
-        d['EVENT_TIME'] = d['EVENT_TIME'].strftime("%m/%d/%Y %I:%M:%S %p")
-        d['NEXT_ARR'] = d['NEXT_ARR'].strftime("%I:%M:%S %p")
-        return json.dumps(d)
-
-    @json.setter
-    def json(self, json_obj):
-        """Set JSON dictionary attribute.
-
-        :param json_obj: Arrival JSON
-        :type json_obj: ``str`` or ``dict``
-        :return:
-        """
-        j_dict = None
-        if isinstance(json_obj, str):
-            j_dict = json.loads(json_obj)
-        elif isinstance(json_obj, dict):
-            j_dict = json_obj
-        self.__has_keys(j_dict)
-        self._json = json.dumps(j_dict)
+        """JSON string of the original API response, rebuilt on request."""
+        return json.dumps(self.to_dict())
 
     @staticmethod
     def __has_keys(arrival):
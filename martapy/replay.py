@@ -0,0 +1,206 @@
+"""Record raw feeds and replay them offline in place of the HTTP fetch.
+
+``RecordingTransport`` saves every payload a client fetches to a JSON
+lines file. ``ReplayTransport`` serves those payloads back to
+``RailClient``/``BusClient`` in *EVENT_TIME*/*MSGTIME* order, either one
+per call (deterministic) or on an accelerated clock::
+
+    transport = ReplayTransport('feeds.jsonl', speed=50)
+    rail_client = RailClient('unused', transport=transport)
+    arrivals = rail_client.arrivals()
+"""
+import json
+import threading
+from bisect import bisect_right
+from calendar import timegm
+from time import monotonic, time
+
+from martapy._util import parse_timestamp
+from martapy.transport import default_transport
+
+RAIL = 'rail'
+ALL_BUSES = 'bus'
+_ROUTE_MARKER = 'GetBusByRoute/'
+
+
+def endpoint(url=None, payload=None):
+    """Name of the feed at *url*: ``'rail'``, ``'bus'`` or
+    ``'route:<route>'``. Without a URL, guessed from *payload*'s keys."""
+    if url:
+        if _ROUTE_MARKER in url:
+            route = url.split(_ROUTE_MARKER, 1)[1].split('?', 1)[0]
+            return 'route:' + route.strip('/')
+        if 'GetRealtimeArrivals' in url:
+            return RAIL
+        if 'GetAllBus' in url:
+            return ALL_BUSES
+        raise ValueError("Unrecognized MARTA URL: {}".format(url))
+    for record in payload or ():
+        if 'EVENT_TIME' in record:
+            return RAIL
+        if 'MSGTIME' in record:
+            return ALL_BUSES
+    raise ValueError("Can't tell which feed an empty payload came from")
+
+
+def feed_time(payload):
+    """Latest *EVENT_TIME*/*MSGTIME* in *payload*, as epoch seconds (or
+    ``None`` if it has none)"""
+    latest = None
+    for record in payload:
+        value = record.get('EVENT_TIME') or record.get('MSGTIME')
+        if value:
+            t = parse_timestamp(value)
+            if latest is None or t > latest:
+                latest = t
+    if latest is None:
+        return None
+    return timegm(latest.timetuple())
+
+
+def load(path):
+    """Read recordings written by ``RecordingTransport``"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingTransport:
+    """Fetches through another transport, appending each new payload to a
+    JSON lines file as ``{"url", "fetched_at", "payload"}``"""
+    def __init__(self, path, transport=None):
+        """
+        :param path: File to append recordings to
+        :param transport: Transport to fetch through (defaults to the
+            shared ``HTTPTransport``)
+        """
+        self.path = path
+        self.transport = transport or default_transport()
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, parse=None):
+        payload = self.transport.get(url)
+        with self._lock:
+            # A 304 hands back the same payload; don't record it twice
+            if self._last.get(url) is not payload:
+                self._last[url] = payload
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({'url': url, 'fetched_at': time(),
+                                        'payload': payload}) + '\n')
+        return parse(payload) if parse is not None else payload
+
+    def stream(self, url, *args, **kwargs):
+        return iter(self.get(url))
+
+
+class ReplayTransport:
+    """Serves recorded payloads in place of ``HTTPTransport``"""
+    def __init__(self, recordings, speed=None, loop=False, clock=monotonic):
+        """
+        :param recordings: Path to a ``RecordingTransport`` file, or an
+            iterable of ``{"url": ..., "payload": [...]}`` dicts (*url* is
+            optional) or of bare payload lists
+        :param speed: ``None`` to return the next payload on every call;
+            otherwise a multiple of real time (e.g. ``50``) at which the
+            recorded feed times play back
+        :param loop: Start over after the last payload (deterministic
+            mode only)
+        :param clock: Monotonic clock in seconds, for accelerated mode
+        """
+        if isinstance(recordings, str):
+            recordings = load(recordings)
+        feeds = {}
+        for i, r in enumerate(recordings):
+            if isinstance(r, dict):
+                url, payload = r.get('url'), r['payload']
+            else:
+                url, payload = None, r
+            t = feed_time(payload)
+            if t is None:
+                t = (r.get('fetched_at') if isinstance(r, dict) else None)
+            feeds.setdefault(endpoint(url, payload), []).append(
+                (t if t is not None else float('-inf'), i, payload))
+        self._feeds = {}
+        for name, entries in feeds.items():
+            entries.sort(key=lambda e: (e[0], e[1]))
+            self._feeds[name] = ([e[0] for e in entries],
+                                 [e[2] for e in entries])
+        self.speed = speed
+        self.loop = loop
+        self._clock = clock
+        self._start = clock()
+        self._origin = min([t[0] for (t, _) in self._feeds.values()
+                            if t and t[0] != float('-inf')] or [0])
+        self._positions = {}
+        self._parsed = {}
+        self._lock = threading.Lock()
+
+    @property
+    def now(self):
+        """Current position in recorded feed time (epoch seconds), in
+        accelerated mode"""
+        return self._origin + (self._clock() - self._start) * self.speed
+
+    def endpoints(self):
+        """Names of the recorded feeds"""
+        return sorted(self._feeds)
+
+    def _payload(self, name, source=None):
+        """(position, payload) currently served for feed *name*, taken from
+        the recordings of feed *source* (defaults to *name*)"""
+        times, payloads = self._feeds[source or name]
+        if self.speed is None:
+            with self._lock:
+                position = self._positions.get(name, 0)
+                if position >= len(payloads):
+                    if not self.loop:
+                        raise EOFError(
+                            "No more recorded '{}' payloads".format(name))
+                    position = 0
+                self._positions[name] = position + 1
+        else:
+            position = max(0, bisect_right(times, self.now) - 1)
+        return position, payloads[position]
+
+    def get(self, url, parse=None):
+        """Recorded payload for *url*, passed through *parse*.
+
+        Route URLs without their own recordings are answered from the
+        all-bus feed, filtered by *ROUTE*. In deterministic mode each such
+        route has its own position in the all-bus recordings, so route and
+        all-bus calls don't move each other forward.
+
+        :raises EOFError: When a deterministic replay runs out
+        """
+        name = endpoint(url)
+        source = name
+        if name not in self._feeds and name.startswith('route:'):
+            source = ALL_BUSES
+        if source not in self._feeds:
+            raise KeyError("No recordings for '{}'".format(name))
+        position, payload = self._payload(name, source)
+        if source != name:
+            route = name.split(':', 1)[1]
+            payload = [b for b in payload if str(b.get('ROUTE')) == route]
+        if parse is None:
+            return payload
+        # Many clients replaying the same payload share one parse
+        key = (name, parse)
+        with self._lock:
+            cached = self._parsed.get(key)
+        if cached is not None and cached[0] == position:
+            return cached[1]
+        result = parse(payload)
+        with self._lock:
+            self._parsed[key] = (position, result)
+        return result
+
+    def stream(self, url, *args, **kwargs):
+        return iter(self.get(url))
+
+    def rewind(self):
+        """Start the replay over"""
+        with self._lock:
+            self._positions.clear()
+            self._parsed.clear()
+            self._start = self._clock()
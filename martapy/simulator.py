@@ -0,0 +1,624 @@
+"""Local stand-in for the MARTA API, for load testing and offline runs.
+
+``Simulator`` serves synthetic GetRealtimeArrivals, GetAllBus and
+GetBusByRoute feeds that evolve over time: trains run their lines end to
+end and back, dwelling at each station, and buses shuttle along their
+routes, each reporting its position and adherence every few seconds. Fleet
+sizes, the speed of the simulated clock and the added latency are all
+configurable, and the feeds are deterministic for a given *seed*, *start*
+and simulated time::
+
+    with Simulator(trains=40, buses=2000, latency=0.05) as sim:
+        rail_client = RailClient('unused', host=sim.host)
+        bus_client = BusClient(host=sim.host)
+        arrivals = rail_client.arrivals()
+
+or from the command line::
+
+    $ python -m martapy.simulator --port 8000 --buses 2000 --speed 10
+
+The server uses keep-alive, gzips responses for clients that accept it,
+and sends *ETag*/*Last-Modified* validators. Feeds change once per
+*interval* simulated seconds, so conditional requests in between get a
+*304 Not Modified*, like polling the real API faster than it updates.
+
+For a single fixed snapshot instead, ``rail_feed()``/``bus_feed()``
+generate random feeds and ``StubServer`` serves whichever payloads it's
+given::
+
+    with StubServer(rail=rail_feed(500)) as server:
+        rail_client = RailClient('unused', host=server.host)
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import cos, pi, radians, sin
+
+from martapy._util import CLOCK_FORMAT, TIMESTAMP_FORMAT
+from martapy.stations import station_list
+
+RAIL_PATH = '/RealtimeTrain/RestServiceNextTrain/GetRealtimeArrivals'
+BUS_PATH = '/BRDRestService/RestBusRealTimeService/GetAllBus'
+ROUTE_PATH = '/BRDRestService/RestBusRealTimeService/GetBusByRoute/'
+
+#: (line, direction towards the last station, direction back, stations)
+RAIL_LINES = (
+    ('RED', 'S', 'N', (
+        'NORTH SPRINGS', 'SANDY SPRINGS', 'DUNWOODY', 'MEDICAL CENTER',
+        'BUCKHEAD', 'LINDBERGH', 'ARTS CENTER', 'MIDTOWN', 'NORTH AVE',
+        'CIVIC CENTER', 'PEACHTREE CENTER', 'FIVE POINTS', 'GARNETT',
+        'WEST END', 'OAKLAND CITY', 'LAKEWOOD', 'EAST POINT', 'COLLEGE PARK',
+        'AIRPORT')),
+    ('GOLD', 'S', 'N', (
+        'DORAVILLE', 'CHAMBLEE', 'BROOKHAVEN', 'LENOX', 'LINDBERGH',
+        'ARTS CENTER', 'MIDTOWN', 'NORTH AVE', 'CIVIC CENTER',
+        'PEACHTREE CENTER', 'FIVE POINTS', 'GARNETT', 'WEST END',
+        'OAKLAND CITY', 'LAKEWOOD', 'EAST POINT', 'COLLEGE PARK',
+        'AIRPORT')),
+    ('BLUE', 'E', 'W', (
+        'HAMILTON E HOLMES', 'WEST LAKE', 'ASHBY', 'VINE CITY', 'OMNI DOME',
+        'FIVE POINTS', 'GEORGIA STATE', 'KING MEMORIAL', 'INMAN PARK',
+        'EDGEWOOD CANDLER PARK', 'EAST LAKE', 'DECATUR', 'AVONDALE',
+        'KENSINGTON', 'INDIAN CREEK')),
+    ('GREEN', 'E', 'W', (
+        'BANKHEAD', 'ASHBY', 'VINE CITY', 'OMNI DOME', 'FIVE POINTS',
+        'GEORGIA STATE', 'KING MEMORIAL', 'INMAN PARK',
+        'EDGEWOOD CANDLER PARK')),
+)
+BUS_DIRECTIONS = ['Northbound', 'Southbound', 'Eastbound', 'Westbound']
+BUS_ROUTES = [str(r) for r in range(1, 200, 3)]
+
+#: Center of the simulated bus network (Five Points)
+CENTER = (33.7539, -84.3916)
+_METERS_PER_DEGREE = 111320.0
+#: Meters between bus stops, and stops between timepoints
+_STOP_SPACING = 400
+_STOPS_PER_TIMEPOINT = 5
+#: Period (seconds) of the drift in each bus's adherence
+_DRIFT_PERIOD = 1800.0
+
+
+def waiting_time(seconds):
+    """*WAITING_TIME* shown for a train *seconds* away"""
+    if seconds < -30:
+        return 'Boarding'
+    if seconds < 0:
+        return 'Arrived'
+    if seconds < 60:
+        return 'Arriving'
+    return '{} min'.format(seconds // 60)
+
+
+#: (line, direction pair, destinations by direction) for ``rail_feed()``
+_FEED_LINES = [
+    ('RED', ('N', 'S'), {'N': 'North Springs', 'S': 'Airport'}),
+    ('GOLD', ('N', 'S'), {'N': 'Doraville', 'S': 'Airport'}),
+    ('BLUE', ('E', 'W'), {'E': 'Indian Creek', 'W': 'H.E. Holmes'}),
+    ('GREEN', ('E', 'W'), {'E': 'Edgewood Candler Park', 'W': 'Bankhead'}),
+]
+#: Default *start* of ``rail_feed()``/``bus_feed()``
+FEED_START = datetime(2017, 12, 31, 16, 9, 10)
+
+
+def rail_feed(size, seed=0, start=FEED_START):
+    """List of *size* random arrival dicts as returned by
+    GetRealtimeArrivals (deterministic for a given *seed*)"""
+    rnd = random.Random(seed)
+    feed = []
+    trains = max(1, size // 8)
+    for i in range(size):
+        line, directions, destinations = _FEED_LINES[i % len(_FEED_LINES)]
+        direction = directions[rnd.randrange(2)]
+        # Several events per poll share the same second
+        event = start + timedelta(seconds=rnd.randrange(30))
+        waiting = rnd.randrange(-60, 1800)
+        next_arr = event + timedelta(seconds=waiting)
+        feed.append({
+            'DESTINATION': destinations[direction],
+            'DIRECTION': direction,
+            'EVENT_TIME': event.strftime(TIMESTAMP_FORMAT),
+            'LINE': line,
+            'NEXT_ARR': next_arr.strftime(CLOCK_FORMAT),
+            'STATION': station_list[rnd.randrange(len(station_list))],
+            'TRAIN_ID': str(100000 + rnd.randrange(trains)),
+            'WAITING_SECONDS': str(waiting),
+            'WAITING_TIME': waiting_time(waiting),
+        })
+    return feed
+
+
+def bus_feed(size, seed=0, start=FEED_START, routes=None):
+    """List of *size* random bus dicts as returned by GetAllBus
+    (deterministic for a given *seed*)"""
+    rnd = random.Random(seed)
+    routes = routes or BUS_ROUTES
+    feed = []
+    for i in range(size):
+        route = routes[i % len(routes)]
+        msg_time = start + timedelta(seconds=rnd.randrange(60))
+        block = rnd.randrange(1000)
+        feed.append({
+            'ADHERENCE': str(rnd.randrange(-15, 10)),
+            'BLOCKID': str(block),
+            'BLOCK_ABBR': '{}-{}'.format(route, block % 20),
+            'DIRECTION': BUS_DIRECTIONS[rnd.randrange(4)],
+            'LATITUDE': '{:.7f}'.format(33.75 + rnd.uniform(-0.25, 0.25)),
+            'LONGITUDE': '{:.7f}'.format(-84.39 + rnd.uniform(-0.25, 0.25)),
+            'MSGTIME': msg_time.strftime(TIMESTAMP_FORMAT),
+            'ROUTE': route,
+            'STOPID': str(900000 + rnd.randrange(5000)),
+            'TIMEPOINT': 'Timepoint {}'.format(rnd.randrange(50)),
+            'TRIPID': str(5000000 + i),
+            'VEHICLE': str(1000 + i),
+        })
+    return feed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.feeds
+        path = self.path.split('?', 1)[0]
+        server.requests[path] += 1
+        delay = server.delay()
+        if delay:
+            time.sleep(delay)
+        body = server.body(path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        # bytes cache their hash, so this is cheap for repeated bodies
+        etag = '"{}"'.format(hash(body) & 0xffffffff)
+        if server.validators and \
+                self.headers.get('If-None-Match') == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if server.validators:
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', server.last_modified)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=server.compresslevel)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FeedServer:
+    """Threaded HTTP server answering the three MARTA endpoints with
+    whatever ``body()`` returns for each path"""
+    def __init__(self, latency=0, jitter=0, validators=True,
+                 compresslevel=6, host='127.0.0.1', port=0, seed=0):
+        """
+        :param latency: Seconds to sleep before answering each request
+        :param jitter: Up to this many more seconds, chosen at random per
+            request
+        :param validators: Send *ETag*/*Last-Modified* and honor
+            *If-None-Match*
+        :param compresslevel: gzip level for clients that accept it
+        :param host: Interface to listen on
+        :param port: Port to listen on (0 picks a free one)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.validators = validators
+        self.compresslevel = compresslevel
+        #: Requests received, by path
+        self.requests = Counter()
+        #: Number of *304 Not Modified* responses sent
+        self.not_modified = 0
+        self.last_modified = formatdate(usegmt=True)
+        self._random = random.Random(seed)
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.feeds = self
+        self._thread = None
+
+    def body(self, path):
+        """Response body (``bytes``) for *path*, or ``None`` for a 404"""
+        raise NotImplementedError
+
+    def delay(self):
+        """Seconds to wait before answering the next request"""
+        if self.jitter:
+            return self.latency + self._random.uniform(0, self.jitter)
+        return self.latency
+
+    @property
+    def host(self):
+        """``http://host:port`` of the running server, for the clients'
+        *host* option"""
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def rail_url(self):
+        """Value for ``RailClient.base_url``"""
+        return self.host + RAIL_PATH + '?apikey={api_key}'
+
+    @property
+    def bus_url(self):
+        """Value for ``BusClient.url``"""
+        return self.host + BUS_PATH
+
+    @property
+    def route_url(self):
+        """Value for ``BusClient.route_url``"""
+        return self.host + ROUTE_PATH + '{}'
+
+    def start(self):
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubServer(FeedServer):
+    """``FeedServer`` answering with fixed payloads"""
+    def __init__(self, rail=None, buses=None, latency=0, validators=True,
+                 host='127.0.0.1', port=0):
+        """
+        :param rail: Arrival dicts served for GetRealtimeArrivals
+        :param buses: Bus dicts served for GetAllBus, and filtered by
+            *ROUTE* for GetBusByRoute
+        :param latency: Seconds to sleep before answering each request
+        :param validators: Send *ETag*/*Last-Modified* and honor
+            *If-None-Match*
+        """
+        super().__init__(latency=latency, validators=validators, host=host,
+                         port=port)
+        self._bodies = {}
+        self.set_payloads(rail or [], buses or [])
+
+    def set_payloads(self, rail, buses):
+        """Replace the served payloads (changing ETags for any that differ)"""
+        routes = {}
+        for b in buses:
+            routes.setdefault(str(b['ROUTE']), []).append(b)
+        bodies = {RAIL_PATH: json.dumps(rail).encode(),
+                  BUS_PATH: json.dumps(buses).encode()}
+        for route, route_buses in routes.items():
+            bodies[ROUTE_PATH + route] = json.dumps(route_buses).encode()
+        self._bodies = bodies
+        self.last_modified = formatdate(usegmt=True)
+
+    def body(self, path):
+        if path.startswith(ROUTE_PATH):
+            return self._bodies.get(path, b'[]')
+        return self._bodies.get(path)
+
+
+class _Snapshot:
+    """Feeds at one simulated time, encoded on first request"""
+    def __init__(self, simulator, t):
+        self.simulator = simulator
+        self.t = t
+        self._bodies = {}
+        self._routes = None
+        self._lock = threading.Lock()
+
+    def body(self, path):
+        body = self._bodies.get(path)
+        if body is not None:
+            return body
+        with self._lock:
+            body = self._bodies.get(path)
+            if body is None:
+                payload = self.payload(path)
+                if payload is None:
+                    return None
+                body = self._bodies[path] = json.dumps(payload).encode()
+        return body
+
+    def payload(self, path):
+        sim = self.simulator
+        if path == RAIL_PATH:
+            return sim._rail_feed(self.t)
+        if path == BUS_PATH:
+            return sim._bus_feed(self.t)
+        if path.startswith(ROUTE_PATH):
+            if self._routes is None:
+                routes = {}
+                for bus in sim._bus_feed(self.t):
+                    routes.setdefault(bus['ROUTE'], []).append(bus)
+                self._routes = routes
+            return self._routes.get(path[len(ROUTE_PATH):].strip('/'), [])
+        return None
+
+
+class Simulator(FeedServer):
+    """``FeedServer`` with a simulated fleet of trains and buses"""
+    def __init__(self, trains=32, buses=300, routes=None, start=None,
+                 speed=1.0, interval=10, headway_run=120, dwell=40,
+                 horizon=1800, report_every=30, seed=0, **server):
+        """
+        :param trains: Trains in service, spread over the four lines
+        :param buses: Buses in service, spread over *routes*
+        :param routes: Route names, or how many of ``BUS_ROUTES`` to use
+            (defaults to all of them, or one per bus if fewer)
+        :param start: Simulated time (``datetime``) when the simulator is
+            created; defaults to now
+        :param speed: Simulated seconds per real second; 0 stops the clock
+            so that only ``advance()`` moves it
+        :param interval: Simulated seconds between feed updates
+        :param headway_run: Seconds a train takes between two stations
+        :param dwell: Seconds a train stays at each station
+        :param horizon: Seconds ahead that train arrivals are predicted
+        :param report_every: Seconds between one bus's position reports
+        :param seed: Seed for the fleet's layout and the latency jitter
+        :param server: ``FeedServer`` options (*latency*, *jitter*,
+            *validators*, *compresslevel*, *host*, *port*)
+        """
+        super().__init__(seed=seed, **server)
+        if start is None:
+            start = datetime.now().replace(microsecond=0)
+        self.start_time = start
+        self.speed = speed
+        self.interval = interval
+        self.headway_run = headway_run
+        self.dwell = dwell
+        self.horizon = horizon
+        self.report_every = report_every
+        if routes is None:
+            routes = BUS_ROUTES[:max(1, min(buses, len(BUS_ROUTES)))]
+        elif isinstance(routes, int):
+            routes = BUS_ROUTES[:routes]
+        self.routes = [str(r) for r in routes]
+        rnd = random.Random(seed)
+        self._trains = self._layout_trains(trains)
+        self._buses = self._layout_buses(buses, rnd)
+        self._offset = 0.0
+        self._started = time.monotonic()
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _layout_trains(self, count):
+        """``(train ID, line, offset into its round trip)`` per train"""
+        per_line = [0] * len(RAIL_LINES)
+        for i in range(count):
+            per_line[i % len(RAIL_LINES)] += 1
+        trains = []
+        hop = self.headway_run + self.dwell
+        for n, (line, count) in enumerate(zip(RAIL_LINES, per_line)):
+            cycle = 2 * (len(line[3]) - 1) * hop
+            for i in range(count):
+                trains.append((str(100000 + 1000 * (n + 1) + i), line,
+                               i * cycle // count))
+        return trains
+
+    def _layout_buses(self, count, rnd):
+        """One tuple of fixed properties per bus"""
+        paths = []
+        for _ in self.routes:
+            length = rnd.uniform(4000, 20000)
+            north_south = rnd.random() < 0.5
+            # Start far enough back that the route is centered on downtown
+            lat = CENTER[0] + rnd.uniform(-0.15, 0.15)
+            lon = CENTER[1] + rnd.uniform(-0.15, 0.15)
+            if north_south:
+                lat -= length / 2 / _METERS_PER_DEGREE
+            else:
+                lon -= length / 2 / (_METERS_PER_DEGREE * cos(radians(lat)))
+            paths.append((lat, lon, north_south, length))
+        buses = []
+        for i in range(count):
+            r = i % len(self.routes)
+            lat, lon, north_south, length = paths[r]
+            block = rnd.randrange(1000)
+            buses.append((
+                str(1000 + i), self.routes[r], r, block, lat, lon,
+                north_south, length,
+                rnd.uniform(4, 9),                  # meters per second
+                rnd.uniform(0, 2 * length),         # position at t=0
+                rnd.randrange(self.report_every),   # when it reports
+                rnd.randrange(-8, 4),               # typical adherence
+                rnd.uniform(0, 2 * pi),             # drift phase
+                5000000 + 10000 * i))               # first trip ID
+        return buses
+
+    # Clock
+
+    @property
+    def elapsed(self):
+        """Simulated seconds since ``start_time``"""
+        return self._offset + (time.monotonic() - self._started) * self.speed
+
+    @property
+    def now(self):
+        """Current simulated time (``datetime``)"""
+        return self.start_time + timedelta(seconds=int(self.elapsed))
+
+    def advance(self, seconds):
+        """Move the simulated clock forward by *seconds*"""
+        with self._lock:
+            self._offset += seconds
+
+    # Feeds
+
+    def _current(self):
+        """``_Snapshot`` for the latest feed update"""
+        t = int(self.elapsed // self.interval * self.interval)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.t != t:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.t != t:
+                    snapshot = self._snapshot = _Snapshot(self, t)
+                    self.last_modified = formatdate(usegmt=True)
+        return snapshot
+
+    def body(self, path):
+        return self._current().body(path)
+
+    def arrivals(self):
+        """Current GetRealtimeArrivals payload (list of dicts)"""
+        return self._current().payload(RAIL_PATH)
+
+    def buses(self, route=None):
+        """Current GetAllBus payload, or GetBusByRoute for *route*"""
+        if route is not None:
+            return self._current().payload(ROUTE_PATH + str(route))
+        return self._current().payload(BUS_PATH)
+
+    def _rail_feed(self, t):
+        """Arrival dicts predicted *t* seconds after ``start_time``"""
+        now = self.start_time + timedelta(seconds=t)
+        event_time = now.strftime(TIMESTAMP_FORMAT)
+        hop = self.headway_run + self.dwell
+        feed = []
+        append = feed.append
+        for train_id, (line, forward, back, stations), offset in self._trains:
+            n = len(stations)
+            leg = (n - 1) * hop
+            position = (t + offset) % (2 * leg)
+            if position < leg:
+                order, direction = stations, forward
+            else:
+                order, direction = stations[::-1], back
+                position -= leg
+            stop, into = divmod(position, hop)
+            if into < self.dwell:
+                # Still at the station it last reached
+                wait = -into
+            else:
+                stop += 1
+                wait = hop - into
+            destination = order[-1].title()
+            for station in order[stop:]:
+                if wait > self.horizon:
+                    break
+                append({
+                    'DESTINATION': destination,
+                    'DIRECTION': direction,
+                    'EVENT_TIME': event_time,
+                    'LINE': line,
+                    'NEXT_ARR': (now + timedelta(seconds=wait)).strftime(
+                        CLOCK_FORMAT),
+                    'STATION': station + ' STATION',
+                    'TRAIN_ID': train_id,
+                    'WAITING_SECONDS': str(wait),
+                    'WAITING_TIME': waiting_time(wait),
+                })
+                wait += hop
+        return feed
+
+    def _bus_feed(self, t):
+        """Latest report of every bus *t* seconds after ``start_time``"""
+        feed = []
+        append = feed.append
+        every = self.report_every
+        for (vehicle, route, r, block, lat, lon, north_south, length, speed,
+             offset, phase, adherence, drift, trip) in self._buses:
+            reported = t - (t + phase) % every
+            distance = reported * speed + offset
+            trips, along = divmod(distance, length)
+            outbound = not trips % 2
+            if not outbound:
+                along = length - along
+            if north_south:
+                lat += along / _METERS_PER_DEGREE
+                direction = BUS_DIRECTIONS[0 if outbound else 1]
+            else:
+                lon += along / (_METERS_PER_DEGREE * cos(radians(lat)))
+                direction = BUS_DIRECTIONS[2 if outbound else 3]
+            stop = int(along // _STOP_SPACING)
+            adherence += round(4 * sin(2 * pi * reported / _DRIFT_PERIOD
+                                       + drift))
+            msg_time = self.start_time + timedelta(seconds=reported)
+            append({
+                'ADHERENCE': str(adherence),
+                'BLOCKID': str(block),
+                'BLOCK_ABBR': '{}-{}'.format(route, block % 20),
+                'DIRECTION': direction,
+                'LATITUDE': '{:.7f}'.format(lat),
+                'LONGITUDE': '{:.7f}'.format(lon),
+                'MSGTIME': msg_time.strftime(TIMESTAMP_FORMAT),
+                'ROUTE': route,
+                'STOPID': str(900000 + 100 * r + stop),
+                'TIMEPOINT': 'Timepoint {}'.format(
+                    stop // _STOPS_PER_TIMEPOINT),
+                'TRIPID': str(trip + int(trips) % 10000),
+                'VEHICLE': vehicle,
+            })
+        return feed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m martapy.simulator',
+        description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="interface to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=8000,
+                        help="port to listen on (default: %(default)s)")
+    parser.add_argument('--trains', type=int, default=32,
+                        help="trains in service (default: %(default)s)")
+    parser.add_argument('--buses', type=int, default=300,
+                        help="buses in service (default: %(default)s)")
+    parser.add_argument('--routes', type=int, default=None,
+                        help="bus routes (default: up to %d)"
+                             % len(BUS_ROUTES))
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="simulated seconds per second "
+                             "(default: %(default)s)")
+    parser.add_argument('--interval', type=int, default=10,
+                        help="seconds between feed updates "
+                             "(default: %(default)s)")
+    parser.add_argument('--latency', type=float, default=0,
+                        help="seconds added to each response")
+    parser.add_argument('--jitter', type=float, default=0,
+                        help="up to this many more seconds, at random")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    sim = Simulator(trains=args.trains, buses=args.buses, routes=args.routes,
+                    speed=args.speed, interval=args.interval,
+                    latency=args.latency, jitter=args.jitter, seed=args.seed,
+                    host=args.host, port=args.port)
+    print("Simulating {} trains and {} buses on {} routes at {}".format(
+        args.trains, args.buses, len(sim.routes), sim.host))
+    print("  RailClient('unused', host='{0}'), BusClient(host='{0}')"
+          .format(sim.host))
+    sim.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
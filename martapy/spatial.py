@@ -0,0 +1,126 @@
+"""Grid-hash spatial index for nearest-bus and within-radius queries"""
+from heapq import nsmallest
+from math import asin, ceil, cos, floor, isfinite, radians, sin, sqrt
+
+#: Mean Earth radius in meters
+EARTH_RADIUS = 6371008.8
+#: Meters per degree of latitude
+METERS_PER_DEGREE = radians(1) * EARTH_RADIUS
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two points (degrees)"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + \
+        cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def distance(lat, lon, bus):
+    """Meters from (*lat*, *lon*) to *bus*'s reported position"""
+    return haversine(lat, lon, float(bus.latitude), float(bus.longitude))
+
+
+class SpatialIndex:
+    """Buses bucketed into a grid of roughly *cell_size* meter cells.
+
+    ``nearest()`` and ``within()`` only visit the cells around the query
+    point, so their cost depends on how many buses are nearby rather than
+    on the size of the fleet.
+    """
+    def __init__(self, buses, cell_size=500):
+        """
+        :param buses: Iterable of ``Bus`` (buses without a usable position
+            are left out)
+        :param cell_size: Minimum cell width/height in meters
+        """
+        self.cell_size = cell_size
+        points = []
+        for b in buses:
+            try:
+                lat, lon = float(b.latitude), float(b.longitude)
+            except (TypeError, ValueError):
+                continue
+            # 'nan'/'inf' parse as floats but have no grid cell
+            if isfinite(lat) and isfinite(lon):
+                points.append((lat, lon, b))
+        # Size longitude steps at the highest latitude so cells are never
+        # narrower than cell_size
+        max_lat = max([abs(p[0]) for p in points] or [0])
+        self._lat_step = cell_size / METERS_PER_DEGREE
+        self._lon_step = cell_size / (METERS_PER_DEGREE *
+                                      max(cos(radians(max_lat)), 1e-6))
+        self._cells = {}
+        for p in points:
+            self._cells.setdefault(self._cell(p[0], p[1]), []).append(p)
+        self._size = len(points)
+        if points:
+            cells = list(self._cells)
+            self._bounds = (min(c[0] for c in cells), max(c[0] for c in cells),
+                            min(c[1] for c in cells), max(c[1] for c in cells))
+
+    def __len__(self):
+        return self._size
+
+    def _cell(self, lat, lon):
+        return int(floor(lat / self._lat_step)), \
+            int(floor(lon / self._lon_step))
+
+    def _ring(self, ci, cj, r):
+        """Points in cells at Chebyshev distance *r* from (*ci*, *cj*)"""
+        cells = self._cells
+        if r == 0:
+            return cells.get((ci, cj), [])
+        found = []
+        for i in range(ci - r, ci + r + 1):
+            step = 1 if i in (ci - r, ci + r) else 2 * r
+            for j in range(cj - r, cj + r + 1, step):
+                found.extend(cells.get((i, j), ()))
+        return found
+
+    def _max_ring(self, ci, cj):
+        """Ring beyond which there are no cells at all"""
+        lo_i, hi_i, lo_j, hi_j = self._bounds
+        return max(abs(ci - lo_i), abs(ci - hi_i),
+                   abs(cj - lo_j), abs(cj - hi_j))
+
+    def within(self, lat, lon, meters):
+        """Buses within *meters* of (*lat*, *lon*), nearest first
+
+        :return: ``martapy.bus.Buses``
+        """
+        from martapy.bus import Buses
+        if not self._size:
+            return Buses([])
+        ci, cj = self._cell(lat, lon)
+        rings = min(int(ceil(meters / float(self.cell_size))),
+                    self._max_ring(ci, cj))
+        found = []
+        for r in range(rings + 1):
+            for p_lat, p_lon, b in self._ring(ci, cj, r):
+                d = haversine(lat, lon, p_lat, p_lon)
+                if d <= meters:
+                    found.append((d, id(b), b))
+        found.sort()
+        return Buses(f[2] for f in found)
+
+    def nearest(self, lat, lon, k=1):
+        """The *k* buses closest to (*lat*, *lon*), nearest first
+
+        :return: ``martapy.bus.Buses``
+        """
+        from martapy.bus import Buses
+        if not self._size or k < 1:
+            return Buses([])
+        ci, cj = self._cell(lat, lon)
+        last = self._max_ring(ci, cj)
+        found = []
+        for r in range(last + 1):
+            for p_lat, p_lon, b in self._ring(ci, cj, r):
+                found.append((haversine(lat, lon, p_lat, p_lon), id(b), b))
+            # Anything outside ring r is at least r cells away
+            if len(found) >= k:
+                found = nsmallest(k, found)
+                if found[-1][0] <= r * self.cell_size:
+                    break
+        return Buses(f[2] for f in sorted(found)[:k])
@@ -0,0 +1,195 @@
+"""Known MARTA rail stations and resolution of user-typed station names
+
+``resolver.resolve('5 points')`` returns ``'FIVE POINTS STATION'``. Names
+are normalized (case, punctuation, *STATION*, numbers and common
+abbreviations) and looked up in a hash map of canonical names and
+aliases. Partial input falls back to a sorted prefix index over every
+word-suffix of each name, so ``'peachtree'`` and ``'points'`` resolve too.
+"""
+import re
+import threading
+from bisect import bisect_left
+
+
+station_list = (
+    'AIRPORT STATION',
+    'ARTS CENTER STATION',
+    'ASHBY STATION',
+    'AVONDALE STATION',
+    'BANKHEAD STATION',
+    'BROOKHAVEN STATION',
+    'BUCKHEAD STATION',
+    'CHAMBLEE STATION',
+    'CIVIC CENTER STATION',
+    'COLLEGE PARK STATION',
+    'DECATUR STATION',
+    'DORAVILLE STATION',
+    'DUNWOODY STATION',
+    'EAST LAKE STATION',
+    'EAST POINT STATION',
+    'EDGEWOOD CANDLER PARK STATION',
+    'FIVE POINTS STATION',
+    'GARNETT STATION',
+    'GEORGIA STATE STATION',
+    'HAMILTON E HOLMES STATION',
+    'INDIAN CREEK STATION',
+    'INMAN PARK STATION',
+    'KENSINGTON STATION',
+    'KING MEMORIAL STATION',
+    'LAKEWOOD STATION',
+    'LENOX STATION',
+    'LINDBERGH STATION',
+    'MEDICAL CENTER STATION',
+    'MIDTOWN STATION',
+    'NORTH AVE STATION',
+    'NORTH SPRINGS STATION',
+    'OAKLAND CITY STATION',
+    'OMNI DOME STATION',
+    'PEACHTREE CENTER STATION',
+    'SANDY SPRINGS STATION',
+    'VINE CITY STATION',
+    'WEST END STATION',
+    'WEST LAKE STATION',
+)
+
+#: ``station_list`` as a set, for membership tests
+known_stations = frozenset(station_list)
+
+#: Extra names riders (and the API's *DESTINATION* field) use for stations
+aliases = {
+    'AIRPORT STATION': ['HARTSFIELD', 'HARTSFIELD JACKSON', 'ATL AIRPORT'],
+    'EDGEWOOD CANDLER PARK STATION': ['EDGEWOOD', 'CANDLER PARK'],
+    'GEORGIA STATE STATION': ['GA STATE', 'GSU'],
+    'HAMILTON E HOLMES STATION': ['H E HOLMES', 'HE HOLMES', 'HOLMES'],
+    'KING MEMORIAL STATION': ['MLK', 'MARTIN LUTHER KING'],
+    'OMNI DOME STATION': ['DOME', 'GWCC', 'CNN CENTER', 'PHILIPS ARENA',
+                          'STATE FARM ARENA', 'DOME GWCC'],
+}
+
+_NUMBERS = {
+    '1': 'ONE', '2': 'TWO', '3': 'THREE', '4': 'FOUR', '5': 'FIVE',
+    '6': 'SIX', '7': 'SEVEN', '8': 'EIGHT', '9': 'NINE', '10': 'TEN',
+}
+_ABBREVIATIONS = {
+    'AVENUE': 'AVE', 'AV': 'AVE', 'CTR': 'CENTER', 'CNTR': 'CENTER',
+    'PK': 'PARK', 'MED': 'MEDICAL', 'SPGS': 'SPRINGS', 'PT': 'POINT',
+    'PTS': 'POINTS', 'CTY': 'CITY',
+}
+_separators = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize(name):
+    """Comparable form of a station name: uppercase words without
+    punctuation or *STATION*, numbers spelled out, abbreviations expanded
+
+    ``normalize('5 Points Station')`` is ``'FIVE POINTS'``
+    """
+    words = _separators.split(name.upper().replace('&', ' AND '))
+    words = [_ABBREVIATIONS.get(w, _NUMBERS.get(w, w)) for w in words
+             if w and w != 'STATION']
+    return ' '.join(words)
+
+
+class StationResolver:
+    """Resolves station names in O(1) for exact names and aliases, and
+    O(log n + length) for prefixes of any word in a name
+
+    Lookups don't lock: ``add()`` builds new sets and a new prefix index
+    and swaps them in, so readers always see a complete index.
+    """
+    def __init__(self, stations=(), station_aliases=None):
+        """
+        :param stations: Canonical station names (as the API reports them)
+        :param station_aliases: dict of canonical name to extra names
+        """
+        self._lock = threading.Lock()
+        self._canonical = frozenset()
+        self._names = {}
+        self._prefixes = []
+        names = dict((station, ()) for station in stations)
+        names.update(station_aliases or {})
+        self._update(names)
+
+    def __contains__(self, station):
+        """Whether *station* is a known canonical station name"""
+        return station in self._canonical
+
+    def _update(self, stations):
+        """Swap in indexes extended by *stations*, a dict of canonical name
+        to aliases. Callers other than ``__init__`` hold ``self._lock``."""
+        canonical = set(self._canonical)
+        names = dict(self._names)
+        for station, aliases in stations.items():
+            canonical.add(station)
+            for name in (station,) + tuple(aliases):
+                key = normalize(name)
+                names[key] = names.get(key, frozenset()) | {station}
+        self._prefixes = self._prefix_index(names)
+        self._names = names
+        self._canonical = frozenset(canonical)
+
+    @staticmethod
+    def _prefix_index(names):
+        entries = set()
+        for key, stations in names.items():
+            words = key.split(' ')
+            for i in range(len(words)):
+                suffix = ' '.join(words[i:])
+                for station in stations:
+                    entries.add((suffix, station))
+        return sorted(entries)
+
+    def add(self, station, names=()):
+        """Register a (newly discovered) station and optional aliases.
+        Safe to call from several threads.
+
+        :return: ``True`` if *station* wasn't already known
+        """
+        with self._lock:
+            new = station not in self._canonical
+            if new or names:
+                self._update({station: tuple(names)})
+            return new
+
+    def candidates(self, name):
+        """Every station *name* could refer to, sorted
+
+        :return: list of canonical names (empty if none match)
+        """
+        key = normalize(name)
+        if not key:
+            return []
+        exact = self._names.get(key)
+        if exact:
+            return sorted(exact)
+        prefixes = self._prefixes
+        found = set()
+        i = bisect_left(prefixes, (key,))
+        while i < len(prefixes) and prefixes[i][0].startswith(key):
+            found.add(prefixes[i][1])
+            i += 1
+        return sorted(found)
+
+    def resolve(self, name):
+        """Canonical station name for *name*
+
+        Exact names and aliases win; otherwise *name* must be the start of
+        (a word in) exactly one station's name or alias.
+
+        :param name: User input, ex: *5 points*, *Airport*, *peachtree ctr*
+        :return: Canonical station name, ex: *FIVE POINTS STATION*
+        :raises KeyError: If no station matches
+        :raises ValueError: If more than one station matches
+        """
+        found = self.candidates(name)
+        if not found:
+            raise KeyError(name)
+        if len(found) > 1:
+            raise ValueError("'{}' matches more than one station: {}"
+                             .format(name, ', '.join(found)))
+        return found[0]
+
+
+#: Resolver over ``station_list`` and ``aliases``, shared by
+#: ``Arrivals.by_station``
+resolver = StationResolver(station_list, aliases)
@@ -0,0 +1,152 @@
+"""Track successive snapshots and report what changed between polls.
+
+Each tracker keeps the previous snapshot keyed by *(TRAIN_ID, STATION)*
+for rail and *(VEHICLE, TRIPID)* for buses. A feed can repeat a key, so
+each key also carries its occurrence in the payload (0 for the first
+record with that key, 1 for the next...). Records whose raw values
+haven't changed keep their existing ``Arrival``/``Bus`` object, so only
+new or changed records are parsed.
+"""
+import json
+
+from martapy.bus import Bus, Buses
+from martapy.rail import Arrival, Arrivals
+
+
+class Delta:
+    """Records added, updated and removed between two snapshots"""
+    __slots__ = ('added', 'updated', 'removed')
+
+    def __init__(self, added=None, updated=None, removed=None):
+        #: Records whose key wasn't in the previous snapshot
+        self.added = added or []
+        #: Records whose key was present but whose values changed
+        self.updated = updated or []
+        #: Records from the previous snapshot whose key is gone
+        self.removed = removed or []
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def to_dict(self):
+        """Delta as a dict of API-shaped record dicts"""
+        return {
+            'added': [r.to_dict() for r in self.added],
+            'updated': [r.to_dict() for r in self.updated],
+            'removed': [r.to_dict() for r in self.removed]
+        }
+
+    @property
+    def json(self):
+        """JSON string of ``Delta.to_dict()``"""
+        return json.dumps(self.to_dict())
+
+    def __str__(self):
+        return self.json
+
+
+class _Tracker:
+    """Diffs raw payloads against the previous one"""
+    #: Raw keys identifying a record across polls
+    key_fields = ()
+
+    def __init__(self, client):
+        self.client = client
+        #: Latest snapshot (``None`` until the first update)
+        self.snapshot = None
+        self._previous = {}
+        self._payload = None
+
+    @staticmethod
+    def _parse(raw):
+        raise NotImplementedError
+
+    @staticmethod
+    def _collection(records):
+        raise NotImplementedError
+
+    def _url(self):
+        raise NotImplementedError
+
+    def poll(self):
+        """Fetch the feed with the tracker's client and apply it.
+
+        :return: ``Delta`` of changes since the previous poll
+        """
+        return self.update(self.client.transport.get(self._url()))
+
+    def update(self, payload):
+        """Apply a raw payload (list of dicts, as decoded from the API).
+
+        :param payload: Decoded JSON response
+        :return: ``Delta`` of changes since the previous payload
+        """
+        # The transport hands back the same object for a 304
+        if payload is self._payload:
+            return Delta()
+        key_fields = self.key_fields
+        previous = self._previous
+        current = {}
+        seen = {}
+        records = []
+        added = []
+        updated = []
+        for raw in payload:
+            key = tuple(raw.get(k) for k in key_fields)
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            key += (occurrence,)
+            prev = previous.get(key)
+            if prev is not None and prev[0] == raw:
+                record = prev[1]
+            else:
+                record = self._parse(raw)
+                if prev is None:
+                    added.append(record)
+                else:
+                    updated.append(record)
+            current[key] = (raw, record)
+            records.append(record)
+        removed = [r for (k, (_, r)) in previous.items() if k not in current]
+        self._previous = current
+        self._payload = payload
+        self.snapshot = self._collection(records)
+        return Delta(added, updated, removed)
+
+
+class ArrivalTracker(_Tracker):
+    """Tracks ``RailClient`` arrivals between polls::
+
+        tracker = ArrivalTracker(RailClient(api_key))
+        delta = tracker.poll()
+        arrivals = tracker.snapshot
+    """
+    key_fields = ('TRAIN_ID', 'STATION')
+    _parse = staticmethod(Arrival.from_json)
+    _collection = Arrivals
+
+    def _url(self):
+        return self.client.url
+
+
+class BusTracker(_Tracker):
+    """Tracks ``BusClient`` buses (all, or one *route*) between polls"""
+    key_fields = ('VEHICLE', 'TRIPID')
+    _parse = staticmethod(Bus.from_json)
+    _collection = Buses
+
+    def __init__(self, client, route=None):
+        """
+        :param client: ``martapy.bus.BusClient``
+        :param route: When supplied, only tracks buses for *route*
+        """
+        super().__init__(client)
+        self.route = route
+
+    def _url(self):
+        if self.route:
+            return self.client.route_url.format(str(self.route))
+        return self.client.url
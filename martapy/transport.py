@@ -0,0 +1,207 @@
+"""HTTP transport shared by ``RailClient`` and ``BusClient``"""
+import json
+import re
+import threading
+from time import perf_counter
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from martapy import instrument
+
+#: (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+#: Bytes read at a time when streaming a response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+_default = None
+_default_lock = threading.Lock()
+
+
+class HTTPTransport:
+    """Fetches and decodes API responses over a pooled ``requests.Session``.
+
+    Connections are kept alive and reused across calls (and across every
+    client sharing this transport). Responses are requested gzipped, and
+    when the server sends an *ETag* or *Last-Modified* header, later
+    requests for the same URL are made conditional: a *304 Not Modified*
+    skips both the download and the parse, returning the previous result.
+    """
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT,
+                 pool_connections=4, pool_maxsize=16, conditional=True):
+        """
+        :param session: ``requests.Session`` to use instead of a new one
+            (its adapters and headers are left as they are)
+        :param timeout: Seconds, or a (connect, read) tuple, passed to
+            every request
+        :param pool_connections: Number of hosts to keep connection pools for
+        :param pool_maxsize: Connections kept alive per host
+        :param conditional: Send *If-None-Match*/*If-Modified-Since* when
+            a previous response allows it
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.session = session
+        self.timeout = timeout
+        self.conditional = conditional
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, parse=None):
+        """GET *url* and return its decoded JSON.
+
+        :param url: URL to fetch
+        :param parse: Optional callable applied to the decoded JSON, such
+            as ``Arrivals``. Its result is what's reused on a *304*.
+        :return: Decoded JSON, or ``parse(json)``
+        :raises requests.HTTPError: On an error response
+        """
+        key = (url, parse)
+        cached = self._validators.get(key) if self.conditional else None
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        hook = instrument.hook
+        if hook is not None:
+            start = perf_counter()
+        response = self.session.get(url, headers=headers,
+                                    timeout=self.timeout)
+        if hook is not None:
+            kind = _kind(url)
+            hook.timing('fetch', perf_counter() - start, kind=kind)
+            hook.count('bytes', len(response.content), kind=kind)
+        if response.status_code == 304 and cached is not None:
+            if hook is not None:
+                hook.count('not_modified', kind=kind)
+            return cached[2]
+        response.raise_for_status()
+        if hook is not None:
+            start = perf_counter()
+        result = response.json()
+        if hook is not None:
+            hook.timing('decode', perf_counter() - start, kind=kind)
+        if parse is not None:
+            result = parse(result)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if self.conditional and (etag or last_modified):
+            with self._lock:
+                self._validators[key] = (etag, last_modified, result)
+        return result
+
+    def stream(self, url, chunk_size=STREAM_CHUNK_SIZE):
+        """GET *url* and yield the elements of its JSON array as they're
+        downloaded, instead of decoding the whole response at once.
+
+        Streamed requests are never conditional.
+
+        :param url: URL returning a JSON array
+        :param chunk_size: Bytes to read at a time
+        :return: Generator of decoded elements
+        :raises requests.HTTPError: On an error response
+        """
+        with self.session.get(url, stream=True,
+                              timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.encoding is None:
+                response.encoding = 'utf-8'
+            chunks = response.iter_content(chunk_size, decode_unicode=True)
+            for element in iter_array(chunks):
+                yield element
+
+    def close(self):
+        """Close pooled connections and forget cached validators"""
+        with self._lock:
+            self._validators.clear()
+        self.session.close()
+
+
+def _kind(url):
+    """Instrumentation label for the feed at *url*"""
+    return 'rail' if 'GetRealtimeArrivals' in url else 'bus'
+
+
+def default_transport():
+    """Process-wide ``HTTPTransport`` used by clients created without one"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HTTPTransport()
+        return _default
+
+
+def iter_array(chunks):
+    """Incrementally decode a JSON array, yielding each element as soon as
+    it's complete.
+
+    :param chunks: Iterable of ``str`` pieces of the array's JSON text,
+        split anywhere
+    :return: Generator of decoded elements
+    :raises ValueError: If the text isn't a single JSON array
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    # 'open': expecting '['; 'first': a value or ']'; 'value': a value;
+    # 'next': ',' or ']'; 'done': after the closing ']'
+    state = 'open'
+    for final, chunk in _with_final(chunks):
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            pos = _whitespace.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            c = buf[pos]
+            if state == 'done':
+                raise ValueError("Unexpected data after JSON array at "
+                                 "'{}'".format(buf[pos:pos + 20]))
+            if state == 'open':
+                if c != '[':
+                    raise ValueError("Expected a JSON array")
+                state = 'first'
+                pos += 1
+            elif state == 'next':
+                if c not in ',]':
+                    raise ValueError("Expected ',' or ']' at '{}'"
+                                     .format(buf[pos:pos + 20]))
+                state = 'value' if c == ',' else 'done'
+                pos += 1
+            elif c == ']' and state == 'first':
+                state = 'done'
+                pos += 1
+            else:
+                try:
+                    element, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if final:
+                        raise
+                    break
+                # A number at the end of the buffer may be cut short
+                if end == len(buf) and not final and \
+                        buf[end - 1] not in '}]"':
+                    break
+                yield element
+                state = 'next'
+                pos = end
+    if state != 'done':
+        raise ValueError("Incomplete JSON array")
+
+
+def _with_final(chunks):
+    """Yield (is_last, chunk) pairs, ending with (True, '')"""
+    for chunk in chunks:
+        if chunk:
+            yield False, chunk
+    yield True, ''
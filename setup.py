@@ -18,5 +18,6 @@ setup(
     license="MIT",
     packages=['martapy'],
     install_requires=['requests'],
+    extras_require={'columnar': ['numpy']},
     include_package_data=True
 )
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from unittest import TestCase
+from martapy.aio import AsyncBusClient, AsyncRailClient
+from martapy.batch import ROUTES, RouteCache
+from martapy.bus import Buses
+from martapy.rail import Arrivals
+from martapy.simulator import ROUTE_PATH, StubServer, bus_feed, rail_feed
+from martapy.transport import HTTPTransport
+
+
+class TestAsyncClients(TestCase):
+    def setUp(self):
+        self.server = StubServer(rail=rail_feed(30), buses=bus_feed(60))
+        self.server.start()
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_arrivals(self):
+        async def fetch():
+            async with AsyncRailClient('key', self.transport) as client:
+                client.base_url = self.server.rail_url
+                return await client.arrivals()
+
+        arrivals = asyncio.run(fetch())
+        self.assertIsInstance(arrivals, Arrivals)
+        self.assertEqual(30, len(arrivals))
+
+    def test_routes(self):
+        routes = ['1', '4', '7', '999']
+
+        async def fetch():
+            async with AsyncBusClient(self.transport, concurrency=2) as client:
+                client.url = self.server.bus_url
+                client.route_url = self.server.route_url
+                return (await client.buses(),
+                        await client.buses(routes=routes))
+
+        everything, by_route = asyncio.run(fetch())
+        self.assertIsInstance(everything, Buses)
+        self.assertEqual(routes, list(by_route))
+        self.assertEqual(0, len(by_route['999']))
+        for route in routes:
+            self.assertEqual(1, self.server.requests[ROUTE_PATH + route])
+            self.assertEqual(len(everything.filter(route=route)),
+                             len(by_route[route]))
+            for b in by_route[route]:
+                self.assertEqual(route, b.route)
+
+    def test_concurrency_from_route_cache(self):
+        # Route requests run on the RouteCache's threads, so its
+        # concurrency is the client's: 4 routes, 2 at a time, 2 rounds
+        self.server.latency = 0.1
+        cache = RouteCache(concurrency=2, strategy=ROUTES)
+
+        async def fetch():
+            async with AsyncBusClient(self.transport,
+                                      route_cache=cache) as client:
+                client.route_url = self.server.route_url
+                start = time.perf_counter()
+                await client.buses(routes=['1', '4', '7', '10'])
+                return client.concurrency, time.perf_counter() - start
+
+        concurrency, elapsed = asyncio.run(fetch())
+        self.assertEqual(2, concurrency)
+        self.assertGreaterEqual(elapsed, 0.2)
+        with self.assertRaises(ValueError):
+            AsyncBusClient(self.transport, route_cache=cache, concurrency=4)
+        client = AsyncBusClient(self.transport, concurrency=3)
+        try:
+            self.assertEqual(3, client.route_cache.concurrency)
+        finally:
+            client.close()
+
+    def test_arguments_match_sync_clients(self):
+        host = 'http://localhost:8000'
+        rail = AsyncRailClient('key', self.transport, host)
+        bus = AsyncBusClient(self.transport, host)
+        try:
+            self.assertTrue(rail.url.startswith(host))
+            self.assertTrue(bus.url.startswith(host))
+            self.assertTrue(bus.route_url.startswith(host))
+            with self.assertRaises(TypeError):
+                AsyncRailClient('key', self.transport, host, 2)
+            with self.assertRaises(TypeError):
+                AsyncBusClient(self.transport, host, None, 2)
+        finally:
+            rail.close()
+            bus.close()
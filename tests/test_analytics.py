@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from martapy.analytics import BusAnalytics
+from martapy.bus import Buses
+
+START = datetime(2017, 12, 31, 16, 0, 0)
+
+
+def bus(vehicle, route, minute, adherence, lat=33.75, lon=-84.39,
+        direction='Northbound'):
+    return {
+        'ADHERENCE': str(adherence), 'BLOCKID': '1', 'BLOCK_ABBR': '1-1',
+        'DIRECTION': direction, 'LATITUDE': str(lat), 'LONGITUDE': str(lon),
+        'MSGTIME': (START + timedelta(minutes=minute))
+        .strftime('%m/%d/%Y %I:%M:%S %p'),
+        'ROUTE': route, 'STOPID': '1', 'TIMEPOINT': 'A',
+        'TRIPID': 't' + vehicle, 'VEHICLE': vehicle,
+    }
+
+
+class TestBusAnalytics(TestCase):
+    def setUp(self):
+        self.analytics = BusAnalytics(window=600, bunching_meters=300)
+
+    def test_window(self):
+        a = self.analytics
+        a.update(Buses([bus('1', '110', 0, -2), bus('2', '110', 0, 4),
+                        bus('3', '39', 0, 0)]))
+        self.assertEqual(1.0, a.mean('110'))
+        # Same reports again aren't counted twice
+        self.assertEqual(set(), a.update(Buses(
+            [bus('1', '110', 0, -2), bus('2', '110', 0, 4),
+             bus('3', '39', 0, 0)])))
+        self.assertEqual(2, a.count('110'))
+        a.update(Buses([bus('1', '110', 5, -6), bus('2', '110', 5, 4)]))
+        self.assertEqual(4, a.count('110'))
+        self.assertEqual(-6, a.percentile('110', 0))
+        self.assertEqual(-2, a.percentile('110', 50))
+        self.assertEqual(4, a.percentile('110', 100))
+        # Minute 0 reports fall out of the 10 minute window
+        a.update(Buses([bus('1', '110', 12, 0)]))
+        self.assertEqual(3, a.count('110'))
+        self.assertAlmostEqual(-2 / 3.0, a.mean('110'))
+        self.assertNotIn('39', a.routes)
+        self.assertIsNone(a.mean('39'))
+
+    def test_bunching(self):
+        a = self.analytics
+        a.update(Buses([
+            bus('1', '110', 0, 0, lat=33.750),
+            bus('2', '110', 0, 0, lat=33.752),
+            bus('3', '110', 0, 0, lat=33.800),
+            bus('4', '110', 0, 0, lat=33.7505, direction='Southbound'),
+            bus('5', '39', 0, 0, lat=33.751),
+        ]))
+        pairs = a.bunching('110')
+        self.assertEqual([('2', '1')],
+                         [(ahead.vehicle, behind.vehicle)
+                          for (ahead, behind, _) in pairs])
+        self.assertAlmostEqual(222, pairs[0][2], 0)
+        # Bus 2 moves on and the pair clears
+        a.update(Buses([bus('1', '110', 1, 0, lat=33.750),
+                        bus('2', '110', 1, 0, lat=33.760)]))
+        self.assertEqual([], a.bunching())
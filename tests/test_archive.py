@@ -0,0 +1,149 @@
+import os
+import tempfile
+from unittest import TestCase
+from martapy.archive import (BUS, EMPTY, EMPTY_INT32, NULL, NULL_INT32,
+                             RAIL, VALUE, ArchiveReader, ArchiveWriter,
+                             Segment, encode)
+from martapy.bus import Buses
+from martapy.rail import Arrivals
+from martapy.simulator import bus_feed, rail_feed
+
+
+class TestArchive(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'snapshots.arc')
+        self.arrivals = Arrivals(rail_feed(100))
+        self.buses = Buses(bus_feed(80))
+        with ArchiveWriter(self.path) as archive:
+            archive.write(self.arrivals, captured_at=1000)
+            archive.write(self.buses, captured_at=1010)
+        # Appending to an existing archive
+        with ArchiveWriter(self.path) as archive:
+            archive.write(Arrivals([]), captured_at=1020)
+
+    def test_segments(self):
+        with ArchiveReader(self.path) as archive:
+            segments = list(archive)
+            self.assertEqual([RAIL, BUS, RAIL], [s.kind for s in segments])
+            self.assertEqual([1000, 1010, 1020],
+                             [s.captured_at for s in segments])
+            self.assertEqual([100, 80, 0], [len(s) for s in segments])
+            self.assertEqual([a.waiting_seconds for a in self.arrivals],
+                             segments[0].column('waiting_seconds').tolist())
+            del segments
+
+    def test_records(self):
+        with ArchiveReader(self.path) as archive:
+            rail = next(iter(archive))
+            fields = rail.fields
+            for a, record in zip(self.arrivals, rail.records()):
+                row = dict(zip(fields, record))
+                self.assertEqual(a.station, row['station'])
+                self.assertEqual(a.train_id, row['train_id'])
+                self.assertEqual(a.waiting_seconds, row['waiting_seconds'])
+            del rail
+
+    def test_snapshots(self):
+        with ArchiveReader(self.path) as archive:
+            snapshots = list(archive.snapshots())
+        arrivals = snapshots[0][1]
+        buses = snapshots[1][1]
+        self.assertIsInstance(arrivals, Arrivals)
+        self.assertIsInstance(buses, Buses)
+        for old, new in zip(self.arrivals, arrivals):
+            self.assertEqual(old.to_dict().keys(), new.to_dict().keys())
+            self.assertEqual(
+                [old.station, old.event_time, old.next_arr,
+                 old.waiting_seconds],
+                [new.station, new.event_time, new.next_arr,
+                 new.waiting_seconds])
+        for old, new in zip(self.buses, buses):
+            self.assertEqual(old.msg_time, new.msg_time)
+            self.assertEqual(float(old.latitude), float(new.latitude))
+            for attr in ('adherence', 'route', 'vehicle', 'trip_id'):
+                self.assertEqual(getattr(old, attr), getattr(new, attr))
+        with ArchiveReader(self.path) as archive:
+            self.assertEqual([1010],
+                             [t for (t, _) in archive.snapshots(BUS)])
+
+    def test_missing_values(self):
+        feed = bus_feed(3)
+        feed[0]['ADHERENCE'] = ''
+        feed[1]['ADHERENCE'] = None
+        with ArchiveWriter(self.path) as archive:
+            archive.write(Buses(feed))
+        with ArchiveReader(self.path) as archive:
+            segment = list(archive)[-1]
+            self.assertEqual([EMPTY_INT32, NULL_INT32],
+                             segment.column('adherence').tolist()[:2])
+            self.assertEqual([EMPTY, NULL, VALUE],
+                             segment.flags('adherence').tolist())
+            self.assertEqual(['', None],
+                             [r[0] for r in segment.records()][:2])
+            del segment
+
+    def test_empty_fields_round_trip(self):
+        feed = bus_feed(4)
+        feed[0].update(LATITUDE='', LONGITUDE='', ADHERENCE='')
+        feed[1].update(LATITUDE=None, LONGITUDE=None, ADHERENCE=None)
+        buses = Buses(feed)
+        with ArchiveWriter(self.path) as archive:
+            archive.write(buses)
+        with ArchiveReader(self.path) as archive:
+            restored = list(archive.snapshots(BUS))[-1][1]
+        for old, new in zip(buses, restored):
+            self.assertEqual(
+                [old.adherence, old.latitude, old.longitude],
+                [new.adherence, new.latitude, new.longitude])
+        self.assertEqual(['', '', ''], [restored[0].adherence,
+                                        restored[0].latitude,
+                                        restored[0].longitude])
+        self.assertEqual([None] * 3, [restored[1].adherence,
+                                      restored[1].latitude,
+                                      restored[1].longitude])
+
+    def test_stand_ins_are_values(self):
+        # Real values equal to the missing/empty stand-ins aren't mistaken
+        # for them
+        feed = bus_feed(3)
+        feed[0].update(ADHERENCE=str(EMPTY_INT32), LATITUDE='nan')
+        feed[1].update(ADHERENCE=str(NULL_INT32), LONGITUDE='-inf')
+        buses = Buses(feed)
+        with ArchiveWriter(self.path) as archive:
+            archive.write(buses)
+        with ArchiveReader(self.path) as archive:
+            restored = list(archive.snapshots(BUS))[-1][1]
+        self.assertEqual([str(EMPTY_INT32), str(NULL_INT32)],
+                         [b.adherence for b in restored[:2]])
+        self.assertEqual('nan', restored[0].latitude)
+        self.assertEqual('-inf', restored[1].longitude)
+
+    def test_missing_times(self):
+        row = ('FIVE POINTS STATION', 'RED', 'Airport', 'S', '104027',
+               'Boarding', None, None, None)
+        segment = Segment(encode(RAIL, [row]), 0)
+        self.assertEqual([row], list(segment.records()))
+        self.assertEqual([NULL], segment.flags('next_arr').tolist())
+        with self.assertRaises(KeyError):
+            segment.flags('station')
+
+    def test_truncated(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'SNAP\x01')
+        with ArchiveReader(self.path) as archive:
+            self.assertEqual(3, len(list(archive)))
+
+    def test_not_an_archive(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'[]')
+        with self.assertRaises(ValueError):
+            ArchiveReader(self.path)
+
+    def test_old_version(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(8)
+            f.write(b'\x01\x00')
+        with self.assertRaises(ValueError):
+            ArchiveReader(self.path)
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from requests import HTTPError
+from martapy import BusClient
+from martapy.batch import FLEET, ROUTES, RouteCache
+from martapy.bus import Buses
+from martapy.lazy import LazyBuses
+from martapy.simulator import (BUS_PATH, BUS_ROUTES, ROUTE_PATH, StubServer,
+                               bus_feed)
+from martapy.transport import HTTPTransport
+
+
+class TestRouteCache(TestCase):
+    def setUp(self):
+        self.feed = bus_feed(200)
+        self.server = StubServer(buses=self.feed)
+        self.server.start()
+        self.transport = HTTPTransport(timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def client(self, route_cache=None):
+        return BusClient(self.transport, host=self.server.host,
+                         route_cache=route_cache)
+
+    def route_requests(self):
+        return sum(n for (path, n) in self.server.requests.items()
+                   if path.startswith(ROUTE_PATH))
+
+    def assertRoutes(self, routes, by_route):
+        self.assertEqual(routes, list(by_route))
+        for route, buses in by_route.items():
+            self.assertEqual(sum(1 for b in self.feed
+                                 if b['ROUTE'] == str(route)), len(buses))
+            for b in buses:
+                self.assertEqual(str(route), b.route)
+
+    def test_strategy(self):
+        cache = RouteCache(concurrency=4, fleet_cost=2)
+        self.assertEqual(ROUTES, cache.strategy(8))
+        self.assertEqual(FLEET, cache.strategy(9))
+        cache.route_seconds, cache.fleet_seconds = 0.1, 1.0
+        self.assertEqual(ROUTES, cache.strategy(40))
+        self.assertEqual(FLEET, cache.strategy(41))
+        self.assertEqual(FLEET, RouteCache(strategy=FLEET).strategy(1))
+        with self.assertRaises(ValueError):
+            RouteCache(strategy='all')
+
+    def test_few_routes(self):
+        client = self.client()
+        routes = ['4', 1, '999']
+        by_route = client.buses(routes=routes)
+        self.assertRoutes(routes, by_route)
+        self.assertIsInstance(by_route[1], Buses)
+        self.assertEqual(3, self.route_requests())
+        self.assertEqual(0, self.server.requests[BUS_PATH])
+        # Cached
+        self.assertIs(by_route['4'], client.buses(routes=['4'])['4'])
+        self.assertEqual(3, self.route_requests())
+        self.assertIsNotNone(client.route_cache.route_seconds)
+
+    def test_many_routes(self):
+        client = self.client()
+        routes = BUS_ROUTES[:40]
+        by_route = client.buses(routes=routes)
+        self.assertRoutes(routes, by_route)
+        self.assertEqual(1, self.server.requests[BUS_PATH])
+        self.assertEqual(0, self.route_requests())
+        # Every route in the feed was cached
+        self.assertRoutes(BUS_ROUTES[40:],
+                          client.buses(routes=BUS_ROUTES[40:]))
+        self.assertEqual(1, self.server.requests[BUS_PATH])
+        self.assertEqual(0, self.route_requests())
+
+    def test_lazy(self):
+        client = self.client(RouteCache(strategy=FLEET))
+        by_route = client.buses(routes=['4', '999'], lazy=True)
+        self.assertIsInstance(by_route['4'], LazyBuses)
+        self.assertIsInstance(by_route['999'], LazyBuses)
+        self.assertRoutes(['4', '999'], by_route)
+        # Lazy and built snapshots are cached separately
+        self.assertIsInstance(client.buses(routes=['4'])['4'], Buses)
+
+    def test_shared(self):
+        cache = RouteCache(strategy=ROUTES)
+        self.client(cache).buses(routes=['1', '4'])
+        self.client(cache).buses(routes=['4', '7'])
+        for route in ('1', '4', '7'):
+            self.assertEqual(1, self.server.requests[ROUTE_PATH + route])
+
+    def test_expired(self):
+        client = self.client(RouteCache(ttl=0, strategy=ROUTES))
+        client.buses(routes=['4'])
+        client.buses(routes=['4'])
+        self.assertEqual(2, self.server.requests[ROUTE_PATH + '4'])
+
+    def test_coalesced(self):
+        self.server.latency = 0.1
+        cache = RouteCache(strategy=ROUTES)
+        routes = [['1', '4'], ['4', '7'], ['1', '7'], ['1', '4', '7']]
+        with ThreadPoolExecutor(len(routes)) as pool:
+            results = list(pool.map(
+                lambda r: self.client(cache).buses(routes=r), routes))
+        for r, by_route in zip(routes, results):
+            self.assertRoutes(r, by_route)
+        for route in ('1', '4', '7'):
+            self.assertEqual(1, self.server.requests[ROUTE_PATH + route])
+
+    def test_error(self):
+        client = self.client(RouteCache(strategy=FLEET))
+        client.url = self.server.host + '/missing'
+        with self.assertRaises(HTTPError):
+            client.buses(routes=['4'])
+        self.assertEqual({}, client.route_cache._inflight)
+        self.assertEqual(0, len(client.route_cache.cache))
+
+
+class TestGroupByRoute(TestCase):
+    def test_routes(self):
+        feed = bus_feed(50)
+        for buses in (Buses(feed), LazyBuses(feed)):
+            routes = buses.routes
+            self.assertIs(routes, buses.routes)
+            self.assertEqual(sorted(set(b['ROUTE'] for b in feed)),
+                             list(routes))
+            self.assertEqual(50, sum(len(r) for r in routes.values()))
+            for route, group in routes.items():
+                self.assertIsInstance(group, type(buses))
+                self.assertEqual([b.vehicle for b in buses
+                                  if b.route == route],
+                                 [b.vehicle for b in group])
@@ -1,3 +1,6 @@
+import json
+import pickle
+from datetime import datetime
 from unittest import TestCase
 from martapy import bus
 
@@ -21,3 +24,71 @@ class TestBuses(TestCase):
         buses = self.client.buses(route=111)
         for b in buses:
             self.assertEqual('111', b.route)
+
+
+SAMPLE = [
+    {
+        "ADHERENCE": "-2",
+        "BLOCKID": "52",
+        "BLOCK_ABBR": "110-5",
+        "DIRECTION": "Northbound",
+        "LATITUDE": "33.7713522",
+        "LONGITUDE": "-84.3878721",
+        "MSGTIME": "12/31/2017 4:09:10 PM",
+        "ROUTE": "110",
+        "STOPID": "901230",
+        "TIMEPOINT": "Arts Center Station",
+        "TRIPID": "5591441",
+        "VEHICLE": "1410"
+    },
+    {
+        "ADHERENCE": "0",
+        "BLOCKID": "81",
+        "BLOCK_ABBR": "39-2",
+        "DIRECTION": "Westbound",
+        "LATITUDE": "33.8470411",
+        "LONGITUDE": "-84.3671242",
+        "MSGTIME": "12/31/2017 4:09:14 PM",
+        "ROUTE": "39",
+        "STOPID": "212109",
+        "TIMEPOINT": "Lindbergh Station",
+        "TRIPID": "5592013",
+        "VEHICLE": "1507"
+    },
+]
+
+
+class TestBusesOffline(TestCase):
+    def setUp(self):
+        self.buses = bus.Buses(SAMPLE)
+
+    def test_parse(self):
+        self.assertEqual(2, len(self.buses))
+        b = self.buses[0]
+        self.assertEqual('110', b.route)
+        self.assertEqual(datetime(2017, 12, 31, 16, 9, 10), b.msg_time)
+        self.assertFalse(hasattr(b, '__dict__'))
+
+    def test_json(self):
+        for b, payload in zip(self.buses, SAMPLE):
+            self.assertEqual(payload, json.loads(b.json))
+            self.assertEqual(b.json, str(b))
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            self.buses.append(self.buses[0])
+        with self.assertRaises(TypeError):
+            self.buses[0] = None
+        with self.assertRaises(TypeError):
+            self.buses += []
+        self.assertEqual(2, len(self.buses))
+        b = self.buses[0]
+        for name in ('json', 'msg_time', 'route', 'latitude'):
+            with self.assertRaises(AttributeError):
+                setattr(b, name, None)
+        self.assertIsNotNone(b.msg_time)
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.buses))
+        self.assertIsInstance(copy, bus.Buses)
+        self.assertEqual([b.json for b in self.buses], [b.json for b in copy])
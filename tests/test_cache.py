@@ -0,0 +1,136 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from warnings import catch_warnings, simplefilter
+from martapy import RailClient, instrument
+from martapy.cache import CachedTransport, SQLiteStore, TTLCache
+from martapy.instrument import MetricsRegistry
+from martapy.rail import Arrivals
+from martapy.simulator import rail_feed
+
+
+class CountingTransport:
+    """Stands in for HTTPTransport, counting fetches"""
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    def get(self, url, parse=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise IOError("upstream down")
+        payload = rail_feed(5, seed=self.calls)
+        return parse(payload) if parse is not None else payload
+
+
+class TestTTLCache(TestCase):
+    def test_lru(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a')[1])
+
+    def test_max_age(self):
+        cache = TTLCache(max_age=5)
+        cache.set('a', 1, stored_at=time.time() - 6)
+        self.assertIsNone(cache.get('a'))
+
+
+class TestCachedTransport(TestCase):
+    def setUp(self):
+        self.upstream = CountingTransport()
+
+    def clients(self, transport, n=3):
+        return [RailClient('key', transport=transport) for _ in range(n)]
+
+    def test_shared_across_clients(self):
+        transport = CachedTransport(self.upstream, ttl=60)
+        results = [c.arrivals() for c in self.clients(transport)]
+        self.assertEqual(1, self.upstream.calls)
+        self.assertIsInstance(results[0], Arrivals)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_expiry(self):
+        transport = CachedTransport(self.upstream, ttl=0.05)
+        client = self.clients(transport, 1)[0]
+        first = client.arrivals()
+        time.sleep(0.1)
+        self.assertIsNot(first, client.arrivals())
+        self.assertEqual(2, self.upstream.calls)
+
+    def test_coalescing(self):
+        self.upstream.delay = 0.2
+        transport = CachedTransport(self.upstream, ttl=60)
+        results = []
+        threads = [threading.Thread(target=lambda c=c: results.append(
+            c.arrivals())) for c in self.clients(transport, 8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(1, self.upstream.calls)
+        self.assertEqual(8, len(results))
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_errors_propagate(self):
+        self.upstream.fail = True
+        transport = CachedTransport(self.upstream, ttl=60)
+        with self.assertRaises(IOError):
+            transport.get('url')
+        self.upstream.fail = False
+        self.assertEqual(5, len(transport.get('url')))
+
+    def test_stale_while_revalidate(self):
+        transport = CachedTransport(self.upstream, ttl=0.05, stale_ttl=5)
+        first = transport.get('url', Arrivals)
+        time.sleep(0.1)
+        self.upstream.delay = 0.1
+        # Served stale immediately while the refresh runs
+        self.assertIs(first, transport.get('url', Arrivals))
+        self.assertIs(first, transport.get('url', Arrivals))
+        time.sleep(0.3)
+        self.assertEqual(2, self.upstream.calls)
+        self.assertIsNot(first, transport.get('url', Arrivals))
+
+    def test_background_refresh_error(self):
+        registry = MetricsRegistry()
+        transport = CachedTransport(self.upstream, ttl=0.05, stale_ttl=5)
+        first = transport.get('url', Arrivals)
+        time.sleep(0.1)
+        self.upstream.fail = True
+        with instrument.installed(registry), \
+                catch_warnings(record=True) as w:
+            simplefilter('always')
+            self.assertIs(first, transport.get('url', Arrivals))
+            time.sleep(0.2)
+        self.assertEqual(1, len(w))
+        self.assertIs(RuntimeWarning, w[0].category)
+        self.assertIn('upstream down', str(w[0].message))
+        self.assertEqual(1, registry.counter('cache', kind='bus',
+                                             result='error'))
+        # The stale result is kept for the next try
+        self.upstream.fail = False
+        self.assertIs(first, transport.get('url', Arrivals))
+
+    def test_store(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'cache.db')
+        transport = CachedTransport(self.upstream, ttl=60,
+                                    store=SQLiteStore(path))
+        first = transport.get('url', Arrivals)
+        transport.close()
+        # A second cache (another process, say) reuses the stored payload
+        other = CachedTransport(self.upstream, ttl=60,
+                                store=SQLiteStore(path))
+        second = other.get('url', Arrivals)
+        self.assertEqual(1, self.upstream.calls)
+        self.assertEqual([a.json for a in first], [a.json for a in second])
+        other.close()
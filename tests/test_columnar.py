@@ -0,0 +1,57 @@
+from datetime import datetime
+from unittest import TestCase, skipUnless
+from martapy.bus import Buses
+from martapy import columnar
+from martapy.simulator import bus_feed
+
+
+@skipUnless(columnar.np is not None, "NumPy isn't installed")
+class TestBusColumns(TestCase):
+    def setUp(self):
+        self.buses = Buses(bus_feed(200))
+        self.columns = self.buses.to_columns()
+
+    def test_filter(self):
+        expected = [b for b in self.buses
+                    if b.route in ('1', '4') and b.direction == 'Northbound'
+                    and -5 <= int(b.adherence) <= 0]
+        selected = self.columns.filter(route=['1', '4'],
+                                       direction='Northbound',
+                                       adherence=(-5, 0))
+        self.assertEqual(len(expected), len(selected))
+        self.assertEqual([b.vehicle for b in expected],
+                         [b.vehicle for b in selected.to_buses()])
+        self.assertEqual(0, len(self.columns.filter(route='nope')))
+
+    def test_msg_time(self):
+        cutoff = datetime(2017, 12, 31, 16, 9, 40)
+        selected = self.columns.filter(msg_time=(cutoff, None))
+        self.assertEqual(sum(1 for b in self.buses if b.msg_time >= cutoff),
+                         len(selected))
+
+    def test_bbox(self):
+        box = (33.7, -84.4, 33.8, -84.3)
+        selected = self.columns.bbox(*box)
+        expected = [b for b in self.buses
+                    if box[0] <= float(b.latitude) <= box[2]
+                    and box[1] <= float(b.longitude) <= box[3]]
+        self.assertEqual(len(expected), len(selected))
+
+    def test_aggregates(self):
+        means = self.columns.mean_adherence()
+        counts = self.columns.group_count('route')
+        for route, mean in means.items():
+            values = [int(b.adherence) for b in self.buses
+                      if b.route == route]
+            self.assertAlmostEqual(sum(values) / len(values), mean)
+            self.assertEqual(len(values), counts[route])
+
+    def test_from_json_and_concat(self):
+        other = columnar.BusColumns.from_json(bus_feed(50, seed=3))
+        both = columnar.BusColumns.concat([self.columns, other])
+        self.assertEqual(250, len(both))
+        self.assertEqual(list(self.columns.column('route')) +
+                         list(other.column('route')),
+                         list(both.column('route')))
+        with self.assertRaises(ValueError):
+            both.to_buses()
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from martapy import RailClient
+from martapy.headway import HeadwayEngine, arrival_time
+from martapy.rail import Arrival
+from martapy.tracker import ArrivalTracker
+
+START = datetime(2017, 12, 31, 16, 0, 0)
+# Northbound red line, two minutes apart
+STOPS = ['FIVE POINTS STATION', 'PEACHTREE CENTER STATION',
+         'CIVIC CENTER STATION', 'NORTH AVE STATION']
+
+
+def arrival(train, station, now, at):
+    waiting = int((at - now).total_seconds())
+    return {
+        'DESTINATION': 'North Springs', 'DIRECTION': 'N',
+        'EVENT_TIME': now.strftime('%m/%d/%Y %I:%M:%S %p'),
+        'LINE': 'RED', 'NEXT_ARR': at.strftime('%I:%M:%S %p'),
+        'STATION': station, 'TRAIN_ID': train,
+        'WAITING_SECONDS': str(waiting),
+        'WAITING_TIME': 'Boarding' if waiting <= 0 else
+        '{} min'.format(waiting // 60),
+    }
+
+
+def feed(now, trains):
+    """Predictions at *now* for trains leaving FIVE POINTS at the given
+    times, for the stops they haven't passed yet"""
+    payload = []
+    for train, start in trains.items():
+        for i, station in enumerate(STOPS):
+            at = start + timedelta(minutes=2 * i)
+            if at >= now:
+                payload.append(arrival(train, station, now, at))
+    return payload
+
+
+class TestHeadwayEngine(TestCase):
+    def setUp(self):
+        self.tracker = ArrivalTracker(RailClient('key'))
+        self.engine = HeadwayEngine()
+        self.trains = {'1': START, '2': START + timedelta(minutes=5),
+                       '3': START + timedelta(minutes=12)}
+
+    def poll(self, minutes):
+        now = START + timedelta(minutes=minutes)
+        return self.engine.update(
+            self.tracker.update(feed(now, self.trains)))
+
+    def test_predicted_headways(self):
+        changed = self.poll(0)
+        self.assertEqual(4, len(changed))
+        self.assertEqual((300.0, 420.0),
+                         self.engine.headways(STOPS[1], 'RED', 'N'))
+        self.assertEqual(300.0,
+                         self.engine.next_headway(STOPS[0], 'RED', 'N'))
+        self.assertEqual({('RED', 'N'): (300.0, 420.0)},
+                         self.engine.board(STOPS[2]))
+        self.assertEqual(300.0, self.engine.line_headway('RED', 'N'))
+        self.assertEqual((), self.engine.headways(STOPS[0], 'RED', 'S'))
+
+    def test_trajectory_and_position(self):
+        self.poll(0)
+        self.assertEqual(STOPS, self.engine.trajectory('1').stations)
+        self.poll(3)
+        self.assertEqual(STOPS, self.engine.trajectory('1').stations)
+        last, following, when = self.engine.position('1')
+        self.assertEqual((STOPS[1], STOPS[2]), (last, following))
+        self.assertEqual(START + timedelta(minutes=4), when)
+        self.poll(7)
+        self.assertIsNone(self.engine.trajectory('1'))
+        self.assertEqual(STOPS[0], self.engine.position('2')[0])
+
+    def test_observed_headways_and_dwell(self):
+        self.poll(0)
+        self.poll(1)
+        self.poll(5)
+        self.poll(6)
+        self.assertEqual((300.0,),
+                         self.engine.observed_headways(STOPS[0], 'RED', 'N'))
+        # Both trains were boarding at FIVE POINTS for one poll interval
+        self.assertEqual(60.0, self.engine.dwell(STOPS[0]))
+        self.assertIsNone(self.engine.dwell(STOPS[3]))
+
+    def test_updates_touch_delta_only(self):
+        self.poll(0)
+        self.assertEqual(set(), self.poll(0))
+        self.trains['3'] += timedelta(minutes=1)
+        changed = self.poll(0)
+        self.assertEqual(set((s, 'RED', 'N') for s in STOPS), changed)
+        self.assertEqual((300.0, 480.0),
+                         self.engine.headways(STOPS[0], 'RED', 'N'))
+
+    def test_arrival_time_midnight(self):
+        a = Arrival.from_json(arrival(
+            '1', STOPS[0], datetime(2017, 12, 31, 23, 59),
+            datetime(2018, 1, 1, 0, 3)))
+        self.assertEqual(datetime(2018, 1, 1, 0, 3), arrival_time(a))
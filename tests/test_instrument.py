@@ -0,0 +1,73 @@
+from unittest import TestCase
+from martapy import BusClient, RailClient, instrument
+from martapy.bus import Buses
+from martapy.cache import CachedTransport
+from martapy.instrument import CallbackHook, MetricsRegistry
+from martapy.rail import Arrivals
+from martapy.simulator import StubServer, bus_feed, rail_feed
+from martapy.transport import HTTPTransport
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_disabled(self):
+        self.assertIsNone(instrument.hook)
+        Arrivals(rail_feed(10)).red_line
+        self.assertEqual({'counters': {}, 'timings': {}},
+                         self.registry.snapshot())
+
+    def test_parse_stages(self):
+        with instrument.installed(self.registry):
+            arrivals = Arrivals(rail_feed(50))
+            arrivals.query(line='RED', direction='N')
+            Buses(bus_feed(20))
+        self.assertIsNone(instrument.hook)
+        # Timed parsing builds the same snapshot
+        self.assertEqual([a.json for a in Arrivals(rail_feed(50))],
+                         [a.json for a in arrivals])
+        self.assertEqual(50, self.registry.counter('records', kind='rail'))
+        self.assertEqual(20, self.registry.counter('records', kind='bus'))
+        for stage in ('parse', 'validate', 'timestamp', 'sort',
+                      'station_check', 'filter'):
+            self.assertEqual(1, self.registry.timings(stage, kind='rail')[0],
+                             stage)
+        self.assertEqual(1, self.registry.timings('parse', kind='bus')[0])
+        # Both are part of parse
+        self.assertLess(self.registry.timings('validate', kind='rail')[1] +
+                        self.registry.timings('timestamp', kind='rail')[1],
+                        self.registry.timings('parse', kind='rail')[1])
+        lookups = sum(self.registry.counter('timestamp_cache', kind='rail',
+                                            result=r)
+                      for r in ('hit', 'miss'))
+        self.assertEqual(100, lookups)
+
+    def test_fetch_and_cache(self):
+        events = []
+        with StubServer(rail=rail_feed(30), buses=bus_feed(10)) as server:
+            transport = HTTPTransport()
+            cached = CachedTransport(transport, ttl=60)
+            rail = RailClient('key', transport=cached)
+            rail.base_url = server.rail_url
+            bus = BusClient(transport=transport)
+            bus.url = server.bus_url
+            hook = CallbackHook(lambda *event: events.append(event))
+            with instrument.installed(self.registry):
+                rail.arrivals()
+                rail.arrivals()
+                bus.buses()
+                bus.buses()
+            with instrument.installed(hook):
+                bus.buses()
+            transport.close()
+        r = self.registry
+        self.assertEqual(1, r.counter('cache', kind='rail', result='miss'))
+        self.assertEqual(1, r.counter('cache', kind='rail', result='hit'))
+        self.assertEqual(1, r.timings('fetch', kind='rail')[0])
+        self.assertEqual(2, r.timings('fetch', kind='bus')[0])
+        self.assertEqual(1, r.counter('not_modified', kind='bus'))
+        self.assertGreater(r.counter('bytes', kind='rail'), 0)
+        self.assertIn('martapy_stage_seconds_count{stage="fetch",kind="bus"} 2',
+                      r.render())
+        self.assertIn(('count', 'not_modified', 1, {'kind': 'bus'}), events)
@@ -0,0 +1,124 @@
+import json
+from unittest import TestCase
+from martapy.bus import Buses
+from martapy.lazy import LazyArrivals, LazyBuses
+from martapy.rail import Arrivals
+from martapy.simulator import bus_feed, rail_feed
+
+
+class TestLazyArrivals(TestCase):
+    def setUp(self):
+        self.feed = rail_feed(300)
+        self.eager = Arrivals(self.feed)
+        self.lazy = LazyArrivals(self.feed)
+
+    def json(self, arrivals):
+        return [a.json for a in arrivals]
+
+    def test_len_parses_nothing(self):
+        self.assertEqual(300, len(self.lazy))
+        self.assertEqual(0, self.lazy.materialized)
+
+    def test_same_order(self):
+        self.assertEqual(self.json(self.eager), self.json(self.lazy))
+        self.assertEqual(self.eager[5].json, self.lazy[5].json)
+        self.assertEqual(self.json(self.eager[10:20]),
+                         self.json(self.lazy[10:20]))
+
+    def test_filters_parse_matches_only(self):
+        station = self.eager[0].station
+        board = self.lazy.stations[station].northbound
+        self.assertIsInstance(board, LazyArrivals)
+        self.assertEqual(self.json(self.eager.stations[station]),
+                         self.json(self.lazy.stations[station]))
+        self.assertEqual(len(self.eager.stations[station]),
+                         self.lazy.materialized)
+        self.assertEqual(self.json(self.eager.red_line.southbound),
+                         self.json(self.lazy.red_line.southbound))
+        self.assertEqual(
+            self.json(self.eager.query(line='RED', direction='N')),
+            self.json(self.lazy.query(line='RED', direction='N')))
+        with self.assertRaises(KeyError):
+            self.lazy.query(destination='Airport')
+
+    def test_where(self):
+        for criteria in ({'line': 'RED', 'waiting_seconds__lte': 300},
+                         {'station__in': [self.feed[0]['STATION'],
+                                          self.feed[1]['STATION']]},
+                         {'waiting_time__contains': 'min',
+                          'direction': 'N'},
+                         {'event_time__within': 10, 'line': 'GOLD'},
+                         {'train_id': int(self.feed[0]['TRAIN_ID'])}):
+            found = self.lazy.where(**criteria)
+            self.assertIsInstance(found, LazyArrivals)
+            self.assertEqual(self.json(self.eager.where(**criteria)),
+                             self.json(found), criteria)
+        with self.assertRaises(KeyError):
+            self.lazy.where(colour='red')
+        with self.assertRaises(ValueError):
+            self.lazy.where(waiting_seconds__contains='1')
+
+    def test_where_parses_candidates_only(self):
+        station = self.feed[0]['STATION']
+        self.lazy.where(station=station, waiting_seconds__gt=0)
+        self.assertEqual(len(self.eager.by_station(station)),
+                         self.lazy.materialized)
+
+    def test_shared_objects(self):
+        first = self.lazy.red_line[0]
+        self.assertIs(first, self.lazy.query(line='RED')[0])
+        materialized = self.lazy.materialize()
+        self.assertIsInstance(materialized, Arrivals)
+        self.assertTrue(any(a is first for a in materialized))
+        self.assertEqual(300, self.lazy.materialized)
+
+    def test_validated_on_access(self):
+        lazy = LazyArrivals([dict(self.feed[0], EXTRA='x')])
+        self.assertEqual(1, len(lazy.red_line) + len(lazy.blue_line) +
+                         len(lazy.gold_line) + len(lazy.green_line))
+        with self.assertRaises(KeyError):
+            lazy[0]
+
+
+class TestLazyBuses(TestCase):
+    def setUp(self):
+        self.feed = bus_feed(200)
+        self.eager = Buses(self.feed)
+        self.lazy = LazyBuses(self.feed)
+
+    def test_filter(self):
+        route = self.feed[0]['ROUTE']
+        expected = [b.json for b in self.eager
+                    if b.route == route and b.direction == 'Northbound']
+        found = self.lazy.filter(route=route, direction='Northbound')
+        self.assertIsInstance(found, LazyBuses)
+        self.assertEqual(0, self.lazy.materialized)
+        self.assertEqual(expected, [b.json for b in found])
+        self.assertEqual(len(expected), self.lazy.materialized)
+        with self.assertRaises(KeyError):
+            self.lazy.filter(colour='red')
+
+    def test_same_as_eager(self):
+        route = int(self.feed[0]['ROUTE'])
+        for criteria in ({'route': route},
+                         {'route__in': [route, '7', 'nope']},
+                         {'adherence': -3},
+                         {'adherence__lt': -5, 'direction': 'Eastbound'},
+                         {'latitude__range': (33.7, 33.8)},
+                         {'msg_time__within': 20},
+                         {'route': None, 'vehicle': self.feed[3]['VEHICLE']}):
+            expected = [b.json for b in self.eager.filter(**criteria)]
+            self.assertTrue(expected, criteria)
+            self.assertEqual(expected,
+                             [b.json for b in self.lazy.filter(**criteria)],
+                             criteria)
+            self.assertEqual(expected,
+                             [b.json for b in self.lazy.where(**dict(
+                                 (k, v) for (k, v) in criteria.items()
+                                 if v is not None))], criteria)
+
+    def test_materialize(self):
+        buses = self.lazy.materialize()
+        self.assertIsInstance(buses, Buses)
+        self.assertEqual([json.loads(b.json) for b in self.eager],
+                         [json.loads(b.json) for b in buses])
@@ -0,0 +1,51 @@
+import json
+from unittest import TestCase, skipUnless
+from martapy import columnar
+from martapy.bus import Buses
+from martapy.parallel import (FIELDS, BusBatchParser, decode_chunk,
+                              encode_chunk)
+from martapy.simulator import bus_feed
+
+
+class TestBusBatchParser(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = BusBatchParser(processes=2, chunks_per_process=2)
+        cls.feeds = [bus_feed(40, seed=i) for i in range(7)]
+        cls.bodies = [json.dumps(f).encode() for f in cls.feeds]
+        cls.serial = Buses(b for f in cls.feeds for b in f)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parser.close()
+
+    def test_round_trip(self):
+        values, codes = encode_chunk(self.bodies)
+        self.assertLess(len(values), len(self.serial) * len(FIELDS) / 2)
+        rebuilt = decode_chunk(values, codes)
+        self.assertEqual([b.json for b in self.serial],
+                         [b.json for b in rebuilt])
+        self.assertEqual([b.msg_time for b in self.serial],
+                         [b.msg_time for b in rebuilt])
+
+    def test_parse(self):
+        for payloads in (self.bodies, self.feeds):
+            buses = self.parser.parse(payloads)
+            self.assertIsInstance(buses, Buses)
+            self.assertEqual([b.json for b in self.serial],
+                             [b.json for b in buses])
+        self.assertEqual(0, len(self.parser.parse([])))
+
+    def test_errors(self):
+        with self.assertRaises(KeyError):
+            self.parser.parse([b'[{"NOPE": 1}]'])
+        with self.assertRaises(ValueError):
+            self.parser.parse([b'not json'])
+
+    @skipUnless(columnar.np is not None, "NumPy isn't installed")
+    def test_columns(self):
+        columns = self.parser.columns(self.bodies)
+        self.assertEqual(len(self.serial), len(columns))
+        self.assertEqual(
+            sorted(set(b.route for b in self.serial)),
+            sorted(columns.categories['route']))
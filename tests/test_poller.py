@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from unittest import TestCase
+from warnings import catch_warnings, simplefilter
+from martapy.poller import Poller
+
+
+class Source:
+    """Fetch function returning a new object per call unless told not to"""
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.repeat = False
+        self.last = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise IOError("down")
+        if not self.repeat or self.last is None:
+            self.last = [self.calls]
+        return self.last
+
+
+class TestPoller(TestCase):
+    def setUp(self):
+        self.source = Source()
+        self.poller = Poller(self.source, interval=1, max_interval=8,
+                             backoff=2, jitter=0)
+
+    def test_fan_out(self):
+        seen = [[], []]
+        for s in seen:
+            self.poller.subscribe(s.append)
+        self.poller.poll()
+        self.poller.poll()
+        self.assertEqual(seen[0], seen[1])
+        self.assertEqual(2, len(seen[0]))
+        self.assertIs(seen[0][1], seen[1][1])
+
+    def test_cancel(self):
+        seen = []
+        subscription = self.poller.subscribe(seen.append)
+        self.poller.poll()
+        subscription.cancel()
+        self.poller.poll()
+        self.assertEqual(1, len(seen))
+
+    def test_backoff(self):
+        errors = []
+        self.poller.subscribe(None, on_error=errors.append)
+        self.source.fail = True
+        self.assertEqual([2, 4, 8, 8], [self.poller.poll() for _ in range(4)])
+        self.assertEqual(4, len(errors))
+        self.source.fail = False
+        self.assertEqual(1, self.poller.poll())
+        self.assertIsNone(self.poller.error)
+
+    def test_adaptive(self):
+        seen = []
+        self.poller.subscribe(seen.append)
+        self.source.repeat = True
+        delays = [self.poller.poll() for _ in range(4)]
+        self.assertEqual([1, 1.5, 2.25, 3.375], delays)
+        self.assertEqual(1, len(seen))
+
+    def test_thread(self):
+        poller = Poller(self.source, interval=0.01, jitter=0.5)
+        done = threading.Event()
+        seen = []
+
+        def callback(result):
+            seen.append(result)
+            if len(seen) == 3:
+                done.set()
+
+        poller.subscribe(callback)
+        with poller:
+            self.assertTrue(done.wait(5))
+        self.assertFalse(poller.running)
+
+    def test_failing_subscriber(self):
+        poller = Poller(self.source, interval=0.01, jitter=0)
+        done = threading.Event()
+        seen = []
+
+        def bad(result):
+            raise ValueError("bad subscriber")
+
+        def good(result):
+            seen.append(result)
+            if len(seen) == 3:
+                done.set()
+
+        poller.subscribe(bad, on_error=bad)
+        poller.subscribe(good)
+        with catch_warnings(record=True) as w:
+            simplefilter('always')
+            with poller:
+                self.assertTrue(done.wait(5))
+                self.assertTrue(poller.running)
+        self.assertGreaterEqual(len(seen), 3)
+        self.assertIn("bad subscriber", str(w[0].message))
+        self.assertIsNone(poller.error)
+
+    def test_async_updates(self):
+        poller = Poller(self.source, interval=0.01, jitter=0)
+
+        async def consume():
+            results = []
+            async for result in poller.updates():
+                results.append(result)
+                if len(results) == 3:
+                    break
+            return results
+
+        with poller:
+            results = asyncio.run(consume())
+        self.assertEqual(3, len(results))
+        self.assertEqual([], poller._subscriptions)
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest import TestCase
+from martapy import query
+from martapy.bus import Buses
+from martapy.rail import Arrivals
+from martapy.simulator import bus_feed, rail_feed
+
+
+class TestBusQueries(TestCase):
+    def setUp(self):
+        self.buses = Buses(bus_feed(500))
+
+    def brute(self, test):
+        return [b.vehicle for b in self.buses if test(b)]
+
+    def vehicles(self, buses):
+        self.assertIsInstance(buses, Buses)
+        return [b.vehicle for b in buses]
+
+    def test_ranges_and_sets(self):
+        expected = self.brute(lambda b: int(b.adherence) < -5 and
+                              b.route in ('1', '4'))
+        self.assertTrue(expected)
+        self.assertEqual(expected, self.vehicles(
+            self.buses.where(adherence__lt=-5, route__in=[1, '4'])))
+        expected = self.brute(lambda b: -2 <= int(b.adherence) <= 2 and
+                              float(b.latitude) > 33.8)
+        # The second range query on these fields goes through the index
+        for _ in range(3):
+            self.assertEqual(expected, self.vehicles(self.buses.where(
+                adherence__range=(-2, 2), latitude__gt=33.8)))
+        self.assertIn('adherence', self.buses._query_cache['indexes'])
+
+    def test_within(self):
+        newest = max(b.msg_time for b in self.buses)
+        expected = self.brute(
+            lambda b: b.msg_time >= newest - timedelta(seconds=20))
+        self.assertEqual(expected, self.vehicles(
+            self.buses.where(msg_time__within=20)))
+        self.assertEqual(expected, self.vehicles(
+            self.buses.where(msg_time__within=timedelta(seconds=20))))
+
+    def test_filter(self):
+        expected = self.brute(lambda b: b.direction == 'Westbound' and
+                              b.route == '1')
+        self.assertEqual(expected, self.vehicles(
+            self.buses.filter(direction='Westbound', route='1')))
+        self.assertEqual([], self.vehicles(self.buses.filter(route='nope')))
+        self.assertEqual([], self.vehicles(
+            Buses([]).filter(direction='Westbound', route='1')))
+        self.assertEqual(self.brute(lambda b: int(b.adherence) >= 5),
+                         self.vehicles(self.buses.filter(adherence__gte=5)))
+
+    def test_errors(self):
+        with self.assertRaises(KeyError):
+            self.buses.where(colour='red')
+        with self.assertRaises(ValueError):
+            self.buses.where(route__like='1')
+        with self.assertRaises(ValueError):
+            self.buses.where(route__within=5)
+        for field in ('adherence', 'latitude', 'msg_time'):
+            with self.assertRaises(ValueError):
+                self.buses.where(**{field + '__contains': '1'})
+        with self.assertRaises(ValueError):
+            Arrivals(rail_feed(10)).where(waiting_seconds__contains='1')
+        self.assertEqual(
+            [b for b in self.buses if '1' in b.route],
+            list(self.buses.where(route__contains=1)))
+
+    def test_compiled_once(self):
+        query.compile_scan.cache_clear()
+        self.buses.where(route='1', adherence__ne=0)
+        self.buses.where(route='4', adherence__ne=3)
+        self.assertEqual(1, query.compile_scan.cache_info().misses)
+
+
+class TestArrivalQueries(TestCase):
+    def setUp(self):
+        self.arrivals = Arrivals(rail_feed(500))
+
+    def test_where(self):
+        expected = [a for a in self.arrivals
+                    if a.line == 'RED' and 0 <= a.waiting_seconds <= 300]
+        found = self.arrivals.where(line='RED', waiting_seconds__range=(0, 300))
+        self.assertIsInstance(found, Arrivals)
+        self.assertEqual([id(a) for a in expected], [id(a) for a in found])
+        expected = [a for a in self.arrivals
+                    if a.waiting_time in ('Boarding', 'Arriving')]
+        self.assertEqual(expected, list(self.arrivals.where(
+            waiting_time__in={'Boarding', 'Arriving'})))
+        self.assertEqual(
+            [a for a in self.arrivals if 'PARK' in a.station],
+            list(self.arrivals.where(station__contains='PARK')))
+
+    def test_within_indexed(self):
+        # RED arrivals are all a minute older than the newest arrival
+        feed = rail_feed(40)
+        for record in feed:
+            record['EVENT_TIME'] = ('12/31/2017 4:08:00 PM'
+                                    if record['LINE'] == 'RED'
+                                    else '12/31/2017 4:10:00 PM')
+        arrivals = Arrivals(feed)
+        self.assertEqual([], list(arrivals.where(event_time__within=30)
+                                  .where(line='RED')))
+        self.assertEqual([], list(arrivals.where(line='RED',
+                                                 event_time__within=30)))
+        self.assertEqual(
+            [a for a in arrivals if a.line == 'RED'],
+            list(arrivals.where(line='RED', event_time__within=120)))
@@ -0,0 +1,173 @@
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from warnings import catch_warnings
+from martapy.rail import Arrivals
+from martapy.stations import resolver, station_list
+
+
+SAMPLE = [
+    {
+        "DESTINATION": "North Springs",
+        "DIRECTION": "N",
+        "EVENT_TIME": "12/31/2017 4:09:10 PM",
+        "LINE": "RED",
+        "NEXT_ARR": "04:12:10 PM",
+        "STATION": "FIVE POINTS STATION",
+        "TRAIN_ID": "104026",
+        "WAITING_SECONDS": "-45",
+        "WAITING_TIME": "Boarding"
+    },
+    {
+        "DESTINATION": "Airport",
+        "DIRECTION": "S",
+        "EVENT_TIME": "12/31/2017 4:09:12 PM",
+        "LINE": "RED",
+        "NEXT_ARR": "04:15:40 PM",
+        "STATION": "FIVE POINTS STATION",
+        "TRAIN_ID": "104027",
+        "WAITING_SECONDS": "270",
+        "WAITING_TIME": "5 min"
+    },
+    {
+        "DESTINATION": "Doraville",
+        "DIRECTION": "N",
+        "EVENT_TIME": "12/31/2017 4:09:14 PM",
+        "LINE": "GOLD",
+        "NEXT_ARR": "04:10:40 PM",
+        "STATION": "LENOX STATION",
+        "TRAIN_ID": "305112",
+        "WAITING_SECONDS": "30",
+        "WAITING_TIME": "Arriving"
+    },
+    {
+        "DESTINATION": "North Springs",
+        "DIRECTION": "N",
+        "EVENT_TIME": "12/31/2017 4:09:10 PM",
+        "LINE": "RED",
+        "NEXT_ARR": "04:14:10 PM",
+        "STATION": "PEACHTREE CENTER STATION",
+        "TRAIN_ID": "104026",
+        "WAITING_SECONDS": "75",
+        "WAITING_TIME": "1 min"
+    },
+]
+
+
+class TestArrivalsOffline(TestCase):
+    def setUp(self):
+        self.r = Arrivals(SAMPLE)
+
+    def test_sorted(self):
+        times = [a.next_arr for a in self.r]
+        self.assertEqual(sorted(times), times)
+
+    def test_chain_shares_objects(self):
+        red_north = self.r.red_line.northbound
+        self.assertIsInstance(red_north, Arrivals)
+        self.assertEqual(2, len(red_north))
+        for a in red_north:
+            self.assertEqual("RED", a.line)
+            self.assertEqual("N", a.direction)
+            self.assertTrue(any(a is b for b in self.r))
+
+    def test_from_arrival_objects(self):
+        rebuilt = Arrivals(list(self.r))
+        self.assertEqual([id(a) for a in self.r], [id(a) for a in rebuilt])
+
+    def test_empty_filter(self):
+        self.assertEqual(0, len(self.r.blue_line.southbound))
+
+    def test_query(self):
+        q = self.r.query(line='RED', direction='N',
+                         station='FIVE POINTS STATION')
+        self.assertEqual(1, len(q))
+        self.assertEqual('104026', q[0].train_id)
+        self.assertEqual(0, len(self.r.query(line='RED', station='LENOX')))
+        with self.assertRaises(KeyError):
+            self.r.query(destination='Airport')
+
+    def test_index(self):
+        # Built per attribute on first use, then reused
+        self.assertEqual({}, self.r._index)
+        self.r.query(line='RED')
+        self.assertEqual(['line'], list(self.r._index))
+        index = self.r.index
+        self.assertEqual(sorted(Arrivals.indexed_attributes), sorted(index))
+        self.assertIs(index['line'], self.r.index['line'])
+        for values in index.values():
+            for positions in values.values():
+                self.assertIsInstance(positions, tuple)
+                self.assertEqual(sorted(positions), list(positions))
+        self.assertEqual([a for a in self.r if a.line == 'RED'],
+                         [self.r.arrivals[i] for i in index['line']['RED']])
+        # Results keep next_arr order whichever criterion is most selective
+        q = self.r.query(direction='N', line='RED')
+        self.assertEqual([a for a in self.r
+                          if a.line == 'RED' and a.direction == 'N'], list(q))
+
+    def test_groupings(self):
+        trains = self.r.trains
+        self.assertEqual(['104026', '104027', '305112'], list(trains))
+        self.assertEqual(['FIVE POINTS STATION', 'PEACHTREE CENTER STATION'],
+                         [a.station for a in trains['104026']])
+        self.assertIs(trains, self.r.trains)
+        self.assertEqual(2, len(self.r.stations['FIVE POINTS STATION']))
+
+    def test_compact_records(self):
+        a = self.r.query(waiting_time='Boarding')[0]
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertEqual(-45, a.waiting_seconds)
+        self.assertIn(json.loads(a.json), SAMPLE)
+        self.assertIs(self.r[1].line, self.r[2].line)
+
+    def test_by_station(self):
+        self.assertEqual(2, len(self.r.by_station('5 points')))
+        self.assertEqual(1, len(self.r.by_station('Peachtree Ctr')))
+        with catch_warnings(record=True) as w:
+            self.assertEqual(0, len(self.r.by_station('north')))
+        self.assertIn('more than one station', str(w[0].message))
+
+    def test_immutable(self):
+        for mutate in (lambda: self.r.append(self.r[0]), self.r.sort,
+                       self.r.clear, lambda: self.r.__delitem__(0)):
+            with self.assertRaises(TypeError):
+                mutate()
+        self.assertEqual(4, len(self.r))
+        self.assertIs(self.r, self.r.arrivals)
+
+    def test_read_only_records(self):
+        a = self.r.red_line[0]
+        for name, value in (('json', json.dumps(SAMPLE[0])),
+                            ('direction', 'S'), ('line', 'GOLD'),
+                            ('waiting_seconds', 0)):
+            with self.assertRaises(AttributeError):
+                setattr(a, name, value)
+        with self.assertRaises(AttributeError):
+            del a.station
+        self.assertEqual(['RED'], list(self.r.red_line.index['line']))
+        self.assertEqual('N', a.direction)
+        copy = pickle.loads(pickle.dumps(a))
+        self.assertEqual(a.json, copy.json)
+        with self.assertRaises(AttributeError):
+            copy.line = 'GOLD'
+
+    def test_pickle(self):
+        copy = pickle.loads(pickle.dumps(self.r.red_line))
+        self.assertIsInstance(copy, Arrivals)
+        self.assertEqual([a.json for a in self.r.red_line],
+                         [a.json for a in copy])
+
+    def test_new_stations(self):
+        self.assertEqual((), self.r.new_stations)
+        feed = [dict(a, STATION='TEST NEW STATION') for a in SAMPLE]
+        with catch_warnings(record=True) as w:
+            with ThreadPoolExecutor(4) as pool:
+                snapshots = list(pool.map(Arrivals, [feed] * 8))
+        self.assertEqual(1, len(w))
+        for snapshot in snapshots:
+            self.assertEqual(('TEST NEW STATION',), snapshot.new_stations)
+        self.assertNotIn('TEST NEW STATION', station_list)
+        self.assertIn('TEST NEW STATION', resolver)
+        self.assertEqual(4, len(snapshots[0].by_station('test new')))
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import TestCase
+from martapy import BusClient, RailClient
+from martapy.batch import ROUTES, RouteCache
+from martapy.replay import RecordingTransport, ReplayTransport, load
+from martapy.simulator import StubServer, bus_feed, rail_feed
+from martapy.transport import HTTPTransport
+
+START = datetime(2017, 12, 31, 16, 0, 0)
+
+
+def feeds(n, step=60):
+    """n successive rail and bus payloads, *step* seconds apart"""
+    return [(rail_feed(20, seed=i, start=START + timedelta(seconds=i * step)),
+             bus_feed(30, seed=i, start=START + timedelta(seconds=i * step)))
+            for i in range(n)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplay(TestCase):
+    def setUp(self):
+        self.feeds = feeds(4)
+        self.recordings = []
+        for rail, buses in reversed(self.feeds):
+            self.recordings.append({'url': RailClient.base_url,
+                                    'payload': rail})
+            self.recordings.append({'url': BusClient.url, 'payload': buses})
+
+    def test_record(self):
+        path = os.path.join(tempfile.mkdtemp(), 'feeds.jsonl')
+        with StubServer(rail=self.feeds[0][0]) as server:
+            transport = HTTPTransport()
+            client = RailClient('key', RecordingTransport(path, transport))
+            client.base_url = server.rail_url
+            first = client.arrivals()
+            client.arrivals()
+            server.set_payloads(self.feeds[1][0], [])
+            client.arrivals()
+            transport.close()
+        recorded = load(path)
+        self.assertEqual(2, len(recorded))
+        self.assertEqual(len(first), len(recorded[0]['payload']))
+
+    def test_in_order(self):
+        transport = ReplayTransport(self.recordings)
+        self.assertEqual(['bus', 'rail'], transport.endpoints())
+        client = RailClient('key', transport=transport)
+        times = [max(a.event_time for a in client.arrivals())
+                 for _ in range(4)]
+        self.assertEqual(sorted(times), times)
+        with self.assertRaises(EOFError):
+            client.arrivals()
+        transport.rewind()
+        self.assertEqual(20, len(client.arrivals()))
+
+    def test_loop(self):
+        transport = ReplayTransport([f[0] for f in self.feeds], loop=True)
+        client = RailClient('key', transport=transport)
+        self.assertEqual(9, len([client.arrivals() for _ in range(9)]))
+
+    def test_accelerated(self):
+        clock = FakeClock()
+        transport = ReplayTransport(self.recordings, speed=60, clock=clock)
+        client = BusClient(transport=transport)
+        first = client.buses()
+        self.assertIs(first, client.buses())
+        # 60x: one recorded minute per real second
+        clock.now = 2.0
+        second = client.buses()
+        self.assertIsNot(first, second)
+        self.assertGreater(max(b.msg_time for b in second),
+                           max(b.msg_time for b in first))
+        clock.now = 100
+        self.assertEqual(max(b.msg_time for b in client.buses()),
+                         max(b.msg_time for b in
+                             BusClient(transport=ReplayTransport(
+                                 [self.feeds[-1][1]])).buses()))
+
+    def test_route_from_all_buses(self):
+        transport = ReplayTransport(self.recordings)
+        buses = BusClient(transport=transport).buses(route='1')
+        self.assertGreater(len(buses), 0)
+        for b in buses:
+            self.assertEqual('1', b.route)
+
+    def test_routes_and_all_buses(self):
+        transport = ReplayTransport(self.recordings)
+        client = BusClient(transport=transport)
+        # Each route, like the all-bus feed, starts at the first snapshot
+        for route in ('1', '4', '7'):
+            self.assertEqual(
+                [b['VEHICLE'] for b in self.feeds[0][1]
+                 if b['ROUTE'] == route],
+                [b.vehicle for b in client.buses(route=route)])
+        for _, buses in self.feeds:
+            self.assertEqual([b['VEHICLE'] for b in buses],
+                             [b.vehicle for b in client.buses()])
+        # Route '4' moves on to the second snapshot on its own
+        self.assertEqual(len([b for b in self.feeds[1][1]
+                              if b['ROUTE'] == '4']),
+                         len(client.buses(route='4')))
+        with self.assertRaises(EOFError):
+            client.buses()
+
+    def test_route_cache(self):
+        transport = ReplayTransport(self.recordings)
+        client = BusClient(transport=transport,
+                           route_cache=RouteCache(ttl=0, strategy=ROUTES))
+        for _, buses in self.feeds:
+            by_route = client.buses(routes=['1', '4', '7'])
+            for route in by_route:
+                self.assertEqual(
+                    sorted(b['VEHICLE'] for b in buses
+                           if b['ROUTE'] == route),
+                    sorted(b.vehicle for b in by_route[route]))
+        self.assertEqual(len(self.feeds[0][1]), len(client.buses()))
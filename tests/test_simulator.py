@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from martapy import BusClient, RailClient
+from martapy.simulator import (BUS_PATH, RAIL_LINES, RAIL_PATH, Simulator,
+                               StubServer, bus_feed, rail_feed, waiting_time)
+from martapy.stations import station_list
+from martapy.transport import HTTPTransport
+
+START = datetime(2018, 1, 2, 8, 0, 0)
+
+
+class TestSimulator(TestCase):
+    def setUp(self):
+        self.sim = Simulator(trains=20, buses=90, routes=30, start=START,
+                             speed=0)
+        self.sim.start()
+        self.transport = HTTPTransport(timeout=5)
+        self.rail = RailClient('key', transport=self.transport,
+                               host=self.sim.host)
+        self.bus = BusClient(transport=self.transport, host=self.sim.host)
+
+    def tearDown(self):
+        self.transport.close()
+        self.sim.stop()
+
+    def test_host(self):
+        self.assertEqual(self.sim.host + RAIL_PATH + '?apikey=key',
+                         self.rail.url)
+        self.assertEqual(self.sim.host + BUS_PATH, self.bus.url)
+        self.assertEqual(self.sim.route_url, self.bus.route_url)
+        with self.assertRaises(ValueError):
+            BusClient(host='localhost')
+
+    def test_arrivals(self):
+        arrivals = self.rail.arrivals()
+        self.assertTrue(arrivals)
+        self.assertEqual((), arrivals.new_stations)
+        self.assertEqual(20, len(arrivals.trains))
+        for a in arrivals:
+            self.assertIn(a.station, station_list)
+            self.assertEqual(START, a.event_time)
+            self.assertEqual(waiting_time(a.waiting_seconds), a.waiting_time)
+            self.assertEqual((START + timedelta(seconds=a.waiting_seconds))
+                             .time(), a.next_arr)
+            self.assertLessEqual(a.waiting_seconds, self.sim.horizon)
+        lines = dict((line, (forward, back))
+                     for (line, forward, back, _) in RAIL_LINES)
+        for train in arrivals.trains.values():
+            # One direction and destination per train
+            self.assertEqual(1, len(set((a.direction, a.destination)
+                                        for a in train)))
+            self.assertIn(train[0].direction, lines[train[0].line])
+
+    def test_buses(self):
+        buses = self.bus.buses()
+        self.assertEqual(90, len(buses))
+        self.assertEqual(30, len(set(b.route for b in buses)))
+        self.assertEqual(90, len(set(b.vehicle for b in buses)))
+        for b in buses:
+            self.assertLessEqual(b.msg_time, START)
+            self.assertGreater(b.msg_time, START - timedelta(
+                seconds=self.sim.report_every))
+            self.assertLess(abs(float(b.latitude) - 33.75), 0.3)
+        route = buses[0].route
+        by_route = self.bus.buses(route=route)
+        self.assertEqual(3, len(by_route))
+        self.assertEqual({route}, set(b.route for b in by_route))
+        self.assertEqual([], list(self.bus.buses(route='nope')))
+
+    def test_time_evolves(self):
+        arrivals = self.rail.arrivals()
+        buses = self.bus.buses()
+        # Same feed until the next update
+        self.sim.advance(self.sim.interval - 1)
+        self.assertIs(arrivals, self.rail.arrivals())
+        self.assertEqual(1, self.sim.not_modified)
+        self.sim.advance(61 - self.sim.interval)
+        later = self.rail.arrivals()
+        self.assertEqual(START + timedelta(seconds=60), later[0].event_time)
+        moved = self.bus.buses()
+        self.assertEqual(len(buses), len(moved))
+        for before, after in zip(buses, moved):
+            self.assertEqual(before.vehicle, after.vehicle)
+            self.assertEqual(before.msg_time + timedelta(seconds=60),
+                             after.msg_time)
+        self.assertNotEqual([b.latitude for b in buses],
+                            [b.latitude for b in moved])
+
+    def test_deterministic(self):
+        other = Simulator(trains=20, buses=90, routes=30, start=START,
+                          speed=0)
+        try:
+            self.assertEqual(other.arrivals(), self.sim.arrivals())
+            self.assertEqual(other.buses(), self.sim.buses())
+        finally:
+            other._httpd.server_close()
+
+
+class TestStubServer(TestCase):
+    def test_fixed_feeds(self):
+        self.assertEqual(rail_feed(20), rail_feed(20))
+        self.assertNotEqual(bus_feed(20), bus_feed(20, seed=1))
+        transport = HTTPTransport(timeout=5)
+        with StubServer(rail=rail_feed(20), buses=bus_feed(30)) as server:
+            try:
+                rail = RailClient('key', transport, host=server.host)
+                bus = BusClient(transport, host=server.host)
+                self.assertEqual(20, len(rail.arrivals()))
+                self.assertEqual(30, len(bus.buses()))
+                self.assertEqual(0, len(bus.buses(route='nope')))
+                server.set_payloads([], [])
+                self.assertEqual(0, len(bus.buses()))
+            finally:
+                transport.close()
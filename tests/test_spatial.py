@@ -0,0 +1,57 @@
+from unittest import TestCase
+from martapy.bus import Buses
+from martapy.simulator import bus_feed
+from martapy.spatial import distance, haversine
+
+
+class TestSpatialIndex(TestCase):
+    def setUp(self):
+        self.buses = Buses(bus_feed(500))
+        self.points = [(33.75, -84.39), (33.5, -84.64), (34.2, -84.0),
+                       (33.0, -85.0)]
+
+    def brute(self, lat, lon):
+        return sorted(self.buses, key=lambda b: (distance(lat, lon, b),
+                                                 id(b)))
+
+    def test_haversine(self):
+        self.assertAlmostEqual(111195, haversine(33, -84, 34, -84), 0)
+        self.assertAlmostEqual(haversine(33.75, -84.39, 33.64, -84.45),
+                               haversine(33.64, -84.45, 33.75, -84.39))
+
+    def test_nearest(self):
+        for cell_size in (100, 500, 5000):
+            index = self.buses.spatial_index(cell_size)
+            for lat, lon in self.points:
+                expected = self.brute(lat, lon)
+                for k in (1, 5, 30):
+                    self.assertEqual(expected[:k],
+                                     list(index.nearest(lat, lon, k)))
+        self.assertEqual(500, len(index.nearest(33.75, -84.39, 1000)))
+
+    def test_within(self):
+        index = self.buses.spatial_index()
+        self.assertIs(index, self.buses.spatial_index())
+        for lat, lon in self.points:
+            for meters in (300, 2000, 15000):
+                expected = [b for b in self.brute(lat, lon)
+                            if distance(lat, lon, b) <= meters]
+                self.assertEqual(expected, list(index.within(lat, lon,
+                                                             meters)))
+
+    def test_empty(self):
+        index = Buses([]).spatial_index()
+        self.assertEqual(0, len(index.nearest(33.75, -84.39, 3)))
+        self.assertEqual(0, len(index.within(33.75, -84.39, 1000)))
+
+    def test_unusable_positions(self):
+        feed = bus_feed(6)
+        feed[0]['LATITUDE'] = 'nan'
+        feed[1]['LONGITUDE'] = 'inf'
+        feed[2]['LATITUDE'] = ''
+        buses = Buses(feed)
+        index = buses.spatial_index()
+        self.assertEqual(3, len(index.nearest(33.75, -84.39, 10)))
+        self.assertEqual(set(b.vehicle for b in buses[3:]),
+                         set(b.vehicle for b in
+                             index.within(33.75, -84.39, 10 ** 6)))
@@ -0,0 +1,38 @@
+from unittest import TestCase
+from martapy.stations import StationResolver, normalize, resolver, station_list
+
+
+class TestStations(TestCase):
+    def test_normalize(self):
+        self.assertEqual('FIVE POINTS', normalize('5 Points Station'))
+        self.assertEqual('NORTH AVE', normalize('north avenue'))
+        self.assertEqual('EDGEWOOD CANDLER PARK',
+                         normalize('Edgewood/Candler Park'))
+
+    def test_every_station_resolves_to_itself(self):
+        for s in station_list:
+            self.assertEqual(s, resolver.resolve(s))
+            self.assertEqual(s, resolver.resolve(s.lower()))
+
+    def test_partial_and_alias(self):
+        self.assertEqual('FIVE POINTS STATION', resolver.resolve('points'))
+        self.assertEqual('PEACHTREE CENTER STATION',
+                         resolver.resolve('peachtree ctr'))
+        self.assertEqual('HAMILTON E HOLMES STATION',
+                         resolver.resolve('H.E. Holmes'))
+        self.assertEqual('OMNI DOME STATION', resolver.resolve('GWCC'))
+
+    def test_unknown_and_ambiguous(self):
+        with self.assertRaises(KeyError):
+            resolver.resolve('nowhere')
+        with self.assertRaises(ValueError):
+            resolver.resolve('east')
+        self.assertEqual(['EAST LAKE STATION', 'EAST POINT STATION'],
+                         resolver.candidates('east'))
+
+    def test_add(self):
+        r = StationResolver(['LENOX STATION'])
+        self.assertNotIn('NEW STATION', r)
+        r.add('NEW STATION', ['NEWBIE'])
+        self.assertIn('NEW STATION', r)
+        self.assertEqual('NEW STATION', r.resolve('newbie'))
@@ -0,0 +1,87 @@
+import json
+from unittest import TestCase
+from martapy import BusClient, RailClient
+from martapy.bus import Buses
+from martapy.rail import Arrivals
+from martapy.simulator import StubServer, bus_feed, rail_feed
+from martapy.tracker import ArrivalTracker, BusTracker, Delta
+from martapy.transport import HTTPTransport
+
+
+def copy(payload):
+    return json.loads(json.dumps(payload))
+
+
+class TestArrivalTracker(TestCase):
+    def setUp(self):
+        self.tracker = ArrivalTracker(RailClient('key'))
+        self.feed = rail_feed(200)
+
+    def test_first_update(self):
+        keys = set((a['TRAIN_ID'], a['STATION']) for a in self.feed)
+        # The fixture repeats some keys
+        self.assertLess(len(keys), 200)
+        delta = self.tracker.update(self.feed)
+        self.assertEqual(200, len(delta.added))
+        self.assertFalse(delta.updated or delta.removed)
+        self.assertIsInstance(self.tracker.snapshot, Arrivals)
+        self.assertEqual(200, len(self.tracker.snapshot))
+
+    def test_changes(self):
+        self.tracker.update(self.feed)
+        before = set(id(a) for a in self.tracker.snapshot)
+        feed = copy(self.feed)
+        feed[0]['WAITING_TIME'] = 'Boarding'
+        removed = feed.pop()
+        feed.append(dict(removed, TRAIN_ID='new'))
+        delta = self.tracker.update(feed)
+        self.assertEqual(['new'], [a.train_id for a in delta.added])
+        self.assertEqual([self.feed[0]['TRAIN_ID']],
+                         [a.train_id for a in delta.updated])
+        self.assertEqual('Boarding', delta.updated[0].waiting_time)
+        self.assertEqual([removed['TRAIN_ID']],
+                         [a.train_id for a in delta.removed])
+        # Every other record kept its object
+        after = set(id(a) for a in self.tracker.snapshot)
+        self.assertEqual(198, len(before & after))
+        self.assertEqual('new', json.loads(delta.json)['added'][0]['TRAIN_ID'])
+
+    def test_duplicate_keys(self):
+        a = self.feed[0]
+        self.assertEqual(2, len(self.tracker.update([a, dict(a)]).added))
+        delta = self.tracker.update([dict(a)])
+        self.assertEqual((0, 0, 1), (len(delta.added), len(delta.updated),
+                                     len(delta.removed)))
+        self.assertEqual(1, len(self.tracker.update([a, dict(a)]).added))
+
+    def test_deltas_add_up(self):
+        size = 0
+        for seed in range(5):
+            feed = rail_feed(200, seed=seed)
+            delta = self.tracker.update(feed)
+            size += len(delta.added) - len(delta.removed)
+            self.assertEqual(200, size)
+            self.assertEqual(200, len(self.tracker.snapshot))
+
+    def test_unchanged(self):
+        self.tracker.update(self.feed)
+        self.assertFalse(self.tracker.update(self.feed))
+        self.assertFalse(self.tracker.update(copy(self.feed)))
+
+
+class TestBusTracker(TestCase):
+    def test_poll(self):
+        with StubServer(buses=bus_feed(30)) as server:
+            transport = HTTPTransport()
+            client = BusClient(transport)
+            client.url = server.bus_url
+            client.route_url = server.route_url
+            tracker = BusTracker(client)
+            self.assertEqual(30, len(tracker.poll().added))
+            self.assertIsInstance(tracker.snapshot, Buses)
+            self.assertIsInstance(tracker.poll(), Delta)
+            self.assertEqual(1, server.not_modified)
+            route = BusTracker(client, route='1')
+            for b in route.poll().added:
+                self.assertEqual('1', b.route)
+            transport.close()
@@ -0,0 +1,95 @@
+import json
+from unittest import TestCase
+from requests import HTTPError
+from martapy import BusClient, RailClient
+from martapy.bus import Bus, Buses
+from martapy.rail import Arrivals
+from martapy.simulator import (BUS_PATH, RAIL_PATH, StubServer, bus_feed,
+                               rail_feed)
+from martapy.transport import HTTPTransport, iter_array
+
+
+class TestHTTPTransport(TestCase):
+    def setUp(self):
+        self.server = StubServer(rail=rail_feed(50), buses=bus_feed(40))
+        self.server.start()
+        self.transport = HTTPTransport(timeout=5)
+        self.rail = RailClient('key', transport=self.transport)
+        self.rail.base_url = self.server.rail_url
+        self.bus = BusClient(transport=self.transport)
+        self.bus.url = self.server.bus_url
+        self.bus.route_url = self.server.route_url
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_fetch(self):
+        arrivals = self.rail.arrivals()
+        self.assertIsInstance(arrivals, Arrivals)
+        self.assertEqual(50, len(arrivals))
+        buses = self.bus.buses()
+        self.assertIsInstance(buses, Buses)
+        self.assertEqual(40, len(buses))
+        route = buses[0].route
+        for b in self.bus.buses(route=route):
+            self.assertEqual(route, b.route)
+
+    def test_not_modified(self):
+        first = self.rail.arrivals()
+        second = self.rail.arrivals()
+        self.assertIs(first, second)
+        self.assertEqual(2, self.server.requests[RAIL_PATH])
+        self.assertEqual(1, self.server.not_modified)
+
+        self.server.set_payloads(rail_feed(10, seed=1), bus_feed(40))
+        third = self.rail.arrivals()
+        self.assertIsNot(first, third)
+        self.assertEqual(10, len(third))
+
+    def test_unconditional(self):
+        transport = HTTPTransport(conditional=False)
+        client = BusClient(transport=transport)
+        client.url = self.server.bus_url
+        self.assertIsNot(client.buses(), client.buses())
+        self.assertEqual(0, self.server.not_modified)
+        self.assertEqual(2, self.server.requests[BUS_PATH])
+        transport.close()
+
+    def test_error(self):
+        self.rail.base_url = self.server.host + '/missing?{api_key}'
+        with self.assertRaises(HTTPError):
+            self.rail.arrivals()
+
+    def test_stream(self):
+        streamed = self.bus.iter_buses()
+        first = next(streamed)
+        self.assertIsInstance(first, Bus)
+        buses = Buses(streamed)
+        self.assertEqual(39, len(buses))
+        self.assertEqual([b.json for b in self.bus.buses()][1:],
+                         [b.json for b in buses])
+        route = first.route
+        for b in self.bus.iter_buses(route=route):
+            self.assertEqual(route, b.route)
+
+
+class TestIterArray(TestCase):
+    def chunked(self, text, size):
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def test_chunks(self):
+        values = [{'a': '[1, "]"}', 'b': [1.5, -2e3]}, [], 'x,]', 12345,
+                  True, None, {'nested': {'c': '\\"'}}]
+        text = json.dumps(values, indent=1)
+        for size in (1, 2, 3, 7, 64, len(text)):
+            self.assertEqual(values,
+                             list(iter_array(self.chunked(text, size))))
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_array([' [', ' ] '])))
+
+    def test_invalid(self):
+        for text in ('{"a": 1}', '[1, 2', '[1 2]', '[1,]', '[1] 2', ''):
+            with self.assertRaises(ValueError):
+                list(iter_array(self.chunked(text, 2)))
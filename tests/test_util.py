@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from martapy._util import (CLOCK_FORMAT, TIMESTAMP_FORMAT, parse_clock,
+                           parse_timestamp)
+
+
+class TestTimeParsing(TestCase):
+    def test_matches_strptime(self):
+        t = datetime(2017, 1, 1)
+        while t < datetime(2017, 1, 2):
+            for value in (t.strftime(TIMESTAMP_FORMAT),
+                          t.strftime("%-m/%-d/%Y %-I:%M:%S %p"),
+                          t.strftime("%m/%d/%Y %I:%M:%S %p").lower()):
+                self.assertEqual(datetime.strptime(value, TIMESTAMP_FORMAT),
+                                 parse_timestamp(value))
+            value = t.strftime(CLOCK_FORMAT)
+            self.assertEqual(datetime.strptime(value, CLOCK_FORMAT).time(),
+                             parse_clock(value))
+            t += timedelta(seconds=37)
+
+    def test_fallback(self):
+        # Off the fast path, but strptime still accepts it
+        value = '12/31/2017  4:09:10 PM'
+        self.assertEqual(datetime.strptime(value, TIMESTAMP_FORMAT),
+                         parse_timestamp(value))
+
+    def test_invalid(self):
+        for value in ('', '2/30/2017 4:09:10 PM', '12/31/2017 0:09:10 PM',
+                      '12/31/2017 4:09:60 PM', '12/31/17 4:09:10 PM',
+                      '12/31/2017 4:09:10',
+                      '12/31/2017 +4:09:10 PM', '12/31/2017 4:09:10 XM'):
+            with self.assertRaises(ValueError):
+                parse_timestamp(value)
+        for value in ('13:00:00 PM', '4:9 PM', '04:12:10'):
+            with self.assertRaises(ValueError):
+                parse_clock(value)
+
+    def test_memoized(self):
+        value = '12/31/2017 4:09:10 PM'
+        self.assertIs(parse_timestamp(value), parse_timestamp(value))